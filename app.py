@@ -14,27 +14,77 @@
 
 import os
 import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, flash, session, g, jsonify, Response
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, send_from_directory
 from flask_login import LoginManager, login_user, login_required, logout_user, UserMixin, current_user
 from flask_babel import Babel, gettext as _
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 import docker
 import psutil
 import json
-import threading
 import time
 import requests
 import subprocess
-import platform
 import logging
-from logging.handlers import RotatingFileHandler
+import atexit
+import mimetypes
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 
 # 导入配置系统 / Import configuration system
 from config import get_config, validate_config
+from logging_setup import setup_logging
+from db import ConnectionManager
+from user_cache import MISSING, TTLCache
+from security import HasherBusy, PasswordHasher, RateLimiter, client_subnet
+from user_io import export_users, parse_users, validate_users
+from user_query import create_user_indexes, page_users
 
 # 导入工具函数 / Import utility functions
-from utils import get_filebrowser_token, reset_filebrowser_admin_password, create_filebrowser_user
+from utils import get_filebrowser_token, reset_filebrowser_admin_password, create_filebrowser_user, sync_filebrowser_users
+from utils import set_filebrowser_http, get_cached_filebrowser_token, get_filebrowser_user_scope
+
+# 导入Docker状态缓存 / Import Docker state cache
+from docker_state import DockerStateCache
+
+# 导入资源采样器 / Import resource sampler
+from monitor import ResourceSampler
+from metrics_store import MetricsStore, parse_duration
+
+# 导入SSE广播器 / Import SSE broadcaster
+from event_stream import EventBroadcaster
+
+# 导入后台任务调度器 / Import background job scheduler
+from jobs import JobScheduler, JobQueueFull
+
+# 导入镜像拉取进度解析 / Import image pull progress parser
+from image_pull import PullCoordinator
+
+# 导入容器日志流式读取 / Import streaming container log reader
+from container_logs import (STREAMS, format_cursor, format_entry, gzip_stream, iter_container_logs, iter_positions,
+                            parse_cursor, parse_time, read_page)
+
+# 导入日志全文索引 / Import log full-text index
+from log_index import LogIndexer
+
+# 导入空闲镜像预拉取器 / Import idle-time image prefetcher
+from prefetch import ImagePrefetcher, parse_window
+
+# 导入容器统计采集器 / Import container stats collector
+from container_stats import ContainerStatsCollector
+from cgroup_stats import CgroupStatsReader, CgroupStatsCollector
+
+# 导入反向代理流式转发工具 / Import streaming reverse proxy helpers
+from proxy_stream import forward_request_headers, forward_response_headers, iter_response, request_body
+from upstream import UpstreamPool
+from asset_cache import AssetCache, UncachedResponse
+
+# 导入静态文件指纹 / Import static file fingerprinting
+from static_files import StaticFingerprinter
+
+# 导入数据目录直接下载工具 / Import direct data directory download helpers
+from downloads import (OutsideScope, RangeNotSatisfiable, file_validators, if_range_matches, iter_file_range,
+                       iter_multipart, multipart_length, parse_ranges, resolve_download, scope_root)
 
 # ================= 配置初始化 =================
 # Configuration initialization
@@ -61,6 +111,45 @@ app.config['SESSION_COOKIE_HTTPONLY'] = config.SESSION_COOKIE_HTTPONLY
 app.config['SESSION_COOKIE_SAMESITE'] = config.SESSION_COOKIE_SAMESITE
 app.config['WTF_CSRF_ENABLED'] = config.WTF_CSRF_ENABLED
 app.config['WTF_CSRF_TIME_LIMIT'] = config.WTF_CSRF_TIME_LIMIT
+# 由前端 Web 服务器（nginx/Apache）发送静态文件 / Let a front web server (nginx/Apache) send static files
+app.config['USE_X_SENDFILE'] = config.STATIC_X_SENDFILE
+
+# ================= 本地静态文件 =================
+# Local static files
+static_fingerprints = StaticFingerprinter(app.static_folder)
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """
+    url_for('static', ...) 自动附加内容指纹 ?v=<hash>。
+    Append the content fingerprint ?v=<hash> to url_for('static', ...).
+    """
+    if endpoint == 'static' and 'v' not in values:
+        version = static_fingerprints.version(values.get('filename', ''))
+        if version:
+            values['v'] = version
+
+def serve_static(filename):
+    """
+    从磁盘发送本地静态文件，文件交给 WSGI 服务器的 wsgi.file_wrapper：只有实现了 sendfile 的服务器（如 gunicorn）
+    才不经 Python 复制，Werkzeug 开发服务器（app.run）按块读取；STATIC_X_SENDFILE 开启时由前端 nginx/Apache 发送。
+    Send a local static file from disk through the WSGI server's wsgi.file_wrapper; only servers that implement it with
+    sendfile (such as gunicorn) skip the copy through Python, while Werkzeug's development server (app.run) reads it in
+    chunks. With STATIC_X_SENDFILE a front nginx/Apache sends the file instead.
+    带正确指纹的地址内容不会变化，长期缓存；其他请求短期缓存并支持条件请求。
+    Fingerprinted URLs never change content and are cached long-term; other requests get a short max-age and conditional responses.
+    """
+    version = request.args.get('v')
+    immutable = bool(version) and version == static_fingerprints.version(filename)
+    max_age = config.STATIC_IMMUTABLE_MAX_AGE if immutable else config.STATIC_MAX_AGE
+    response = send_from_directory(app.static_folder, filename, max_age=max_age, conditional=True)
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+# 替换 Flask 内置的静态文件视图，保留 'static' 端点名 / Replace Flask's built-in static view, keeping the 'static' endpoint
+app.view_functions['static'] = serve_static
 
 # ================= 日志配置 =================
 # Logging configuration
@@ -70,18 +159,8 @@ if not app.debug and not app.testing:
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir)
     
-    # 配置日志处理器 / Configure log handler
-    file_handler = RotatingFileHandler(
-        config.LOG_FILE, 
-        maxBytes=config.LOG_MAX_SIZE, 
-        backupCount=config.LOG_BACKUP_COUNT
-    )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(getattr(logging, config.LOG_LEVEL.upper()))
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(getattr(logging, config.LOG_LEVEL.upper()))
+    # 异步日志管道：请求线程只入队，后台线程写文件 / Async pipeline: request threads enqueue, a background thread writes
+    setup_logging(app, config)
     app.logger.info('NAS Manager startup')
 
 # ================= 国际化相关 =================
@@ -119,9 +198,93 @@ except Exception as e:
     app.logger.error(f'Failed to initialize Docker client: {e}')
     client = None
 
+# SSE广播器，资源样本与容器状态变化由单一生产者推送 / SSE broadcaster fed by a single producer
+event_broadcaster = EventBroadcaster(
+    queue_size=config.SSE_CLIENT_QUEUE_SIZE,
+    heartbeat_interval=config.SSE_HEARTBEAT_INTERVAL,
+    max_clients=config.SSE_MAX_CLIENTS
+)
+
+def publish_container_event(action, cid, container):
+    """
+    将容器状态变化推送给所有SSE订阅者。
+    Push a container state change to all SSE subscribers.
+    """
+    event_broadcaster.publish('container', {
+        'action': action,
+        'id': cid,
+        'name': container.name if container else None,
+        'status': container.status if container else None,
+        'version': docker_state.version
+    })
+
+# Docker状态缓存，由事件流增量更新 / Docker state cache, updated incrementally from the event stream
+docker_state = DockerStateCache(app, client, resync_interval=config.DOCKER_STATE_RESYNC_INTERVAL) if client else None
+if docker_state:
+    docker_state.add_listener(publish_container_event)
+    docker_state.start()
+
+def create_container_stats_collector():
+    """
+    按 CONTAINER_STATS_BACKEND 选择容器统计后端。
+    Select the container stats backend according to CONTAINER_STATS_BACKEND.
+    - cgroup: 直接读取 cgroup v2 文件 / read cgroup v2 files directly
+    - docker: 每个容器一个 Docker stats 流 / one Docker stats stream per container
+    - auto: cgroup 可读且能找到容器目录时使用 cgroup，否则使用 Docker API
+    Returns:
+        采集器实例或None
+    """
+    if not docker_state or not config.CONTAINER_STATS_ENABLED:
+        return None
+    docker_collector = lambda: ContainerStatsCollector(app, client, docker_state)
+    backend = config.CONTAINER_STATS_BACKEND
+    if backend in ('auto', 'cgroup'):
+        reader = CgroupStatsReader(config.CGROUP_ROOT)
+        if reader.available():
+            running = {c.id for c in docker_state.containers() if c.status == 'running'}
+            found = set(reader.discover())
+            if backend == 'cgroup' or not running or running & found:
+                app.logger.info(f'容器统计使用 cgroup 后端 / Container stats use cgroup backend: {config.CGROUP_ROOT}')
+                return CgroupStatsCollector(app, docker_state, reader, fallback_factory=docker_collector)
+        app.logger.info('cgroup 不可读，容器统计使用 Docker API / cgroup unreadable, container stats use Docker API')
+    return docker_collector()
+
+# 容器统计采集器 / Container stats collector
+container_stats = create_container_stats_collector()
+if container_stats:
+    container_stats.start()
+
+# 资源采样器，后台按 MONITOR_INTERVAL 采样 / Resource sampler, samples in background every MONITOR_INTERVAL
+resource_sampler = ResourceSampler(app, interval=config.MONITOR_INTERVAL, history_size=config.MONITOR_HISTORY_SIZE)
+# 多分辨率指标历史：原始间隔保留1小时，1分钟保留1天，15分钟保留30天
+# Multi-resolution metrics history: raw for 1 hour, 1 minute for 1 day, 15 minutes for 30 days
+metrics_store = MetricsStore(
+    app,
+    config.METRICS_HISTORY_FILE,
+    tiers=((config.MONITOR_INTERVAL, 3600), (60, 86400), (900, 30 * 86400)),
+    flush_interval=config.METRICS_FLUSH_INTERVAL
+)
+resource_sampler.add_listener(metrics_store.record_snapshot)
+resource_sampler.add_listener(lambda snapshot: event_broadcaster.publish('resource', snapshot))
+if config.MONITOR_ENABLED:
+    resource_sampler.start()
+    metrics_store.start()
+    atexit.register(metrics_store.stop)
+else:
+    # 监控关闭时首页直接调用 cpu_percent(None)，首次调用只返回 0.0，启动时先建立基准
+    # With monitoring off the index calls cpu_percent(None) directly; its first call only returns 0.0, so prime it at startup
+    psutil.cpu_percent(interval=None)
+
 # 数据库配置 / Database configuration
 DATABASE = config.DATABASE_PATH
 
+# 数据库连接管理：每线程复用连接，WAL 模式 / Connection manager: per-thread reusable connections in WAL mode
+db_manager = ConnectionManager(
+    DATABASE,
+    timeout=config.DATABASE_BUSY_TIMEOUT,
+    cached_statements=config.DATABASE_CACHED_STATEMENTS
+)
+
 # ================= 用户模型 =================
 class User(UserMixin):
     """
@@ -151,20 +314,17 @@ class User(UserMixin):
 # ================= 数据库操作相关 =================
 def get_db():
     """
-    获取当前请求上下文的 SQLite 数据库连接。
-    Get SQLite database connection for current request context.
-    若无连接则新建并绑定到 Flask g 对象。
-    If no connection exists, create new one and bind to Flask g object.
+    获取当前线程的 SQLite 数据库连接。
+    Get the SQLite database connection for the current thread.
+    连接由 db_manager 按线程复用，已启用 WAL 与调优 pragma。
+    Connections are reused per thread by db_manager, with WAL and tuned pragmas enabled.
     Returns:
         sqlite3.Connection: 数据库连接对象 / Database connection object
     注意事项 / Notes:
-        - 每个请求结束后会自动关闭连接 / Connection will be closed automatically after each request
+        - 请求结束时会回滚未提交的事务，连接保留复用 / Uncommitted transactions are rolled back at the end of each request; the connection is kept for reuse
         - 数据库文件名由配置指定 / Database file name is specified by configuration
     """
-    db = getattr(g, '_database', None)
-    if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-    return db
+    return db_manager.connection()
 
 def query_db(query, args=(), one=False):
     """
@@ -205,6 +365,7 @@ def init_db():
         except sqlite3.OperationalError:
             # 字段已存在，忽略错误
             pass
+        create_user_indexes(db)
         db.commit()
         # 创建初始管理员 / Create initial admin
         admin = query_db('SELECT * FROM users WHERE username = ?', ('admin',), one=True)
@@ -222,29 +383,36 @@ def init_db():
 @app.teardown_appcontext
 def close_connection(exception):
     """
-    请求结束时自动关闭数据库连接。
-    Automatically close database connection at end of request.
+    请求结束时释放数据库连接：回滚未提交的事务，连接保留给本线程复用。
+    Release the database connection at end of request: roll back uncommitted work and keep the connection for reuse.
     Args:
         exception: 异常对象（可为None） / Exception object (can be None)
     """
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+    db_manager.release()
+
+# 登录用户缓存：用户变更处显式失效，TTL 限制多进程部署下的过期时间
+# Logged-in user cache: invalidated explicitly on user changes, TTL bounds staleness across processes
+user_cache = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
 
 @login_manager.user_loader
 def load_user(user_id):
     """
     Flask-Login 用户加载回调。
     Flask-Login user loading callback.
+    优先从 user_cache 读取，未命中时查询数据库（不存在的用户也会被缓存）。
+    Served from user_cache when possible; misses query the database (unknown users are cached too).
     Args:
         user_id (str): 用户ID / User ID
     Returns:
         User/None: 用户对象或None / User object or None
     """
-    user = query_db('SELECT * FROM users WHERE id = ?', (user_id,), one=True)
-    if user:
-        return User(user[0], user[1], user[2], user[3])
-    return None
+    cached = user_cache.get(user_id)
+    if cached is not MISSING:
+        return cached
+    row = query_db('SELECT * FROM users WHERE id = ?', (user_id,), one=True)
+    user = User(row[0], row[1], row[2], row[3]) if row else None
+    user_cache.set(user_id, user)
+    return user
 
 @app.route('/set_language/<lang>')
 def set_language(lang):
@@ -260,6 +428,23 @@ def set_language(lang):
         session['lang'] = lang
     return redirect(request.referrer or url_for('index'))
 
+# 密码哈希线程池与登录限流 / Password hashing pool and login throttling
+password_hasher = PasswordHasher(max_workers=config.PASSWORD_HASH_WORKERS, max_pending=config.PASSWORD_HASH_QUEUE)
+login_ip_limiter = RateLimiter(config.LOGIN_IP_RATE, config.LOGIN_IP_BURST)
+login_user_limiter = RateLimiter(config.LOGIN_USER_RATE, config.LOGIN_USER_BURST)
+
+def throttled(template, retry_after, message=None):
+    """
+    返回限流响应（429，带 Retry-After）。
+    Return a throttled response (429 with Retry-After).
+    Args:
+        template (str): 要渲染的模板
+        retry_after (int): 建议重试秒数
+        message (str): 提示信息
+    """
+    flash(message or _('尝试过于频繁，请稍后再试'))
+    return render_template(template), 429, {'Retry-After': str(retry_after)}
+
 # ================= 用户注册/登录/登出 =================
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -275,6 +460,10 @@ def register():
         username = request.form['username']
         password = request.form['password']
         
+        allowed, retry_after = login_ip_limiter.allow(request.remote_addr)
+        if not allowed:
+            return throttled('register.html', retry_after)
+        
         # 验证输入 / Validate input
         if not username or not password:
             flash(_('用户名和密码不能为空'))
@@ -292,10 +481,15 @@ def register():
             return redirect(url_for('register'))
         
         # 创建用户 / Create user
+        try:
+            password_hash = password_hasher.generate(password)
+        except HasherBusy:
+            return throttled('register.html', 1, _('系统繁忙，请稍后再试'))
         db = get_db()
-        db.execute('INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)',
-                   (username, generate_password_hash(password), 0))
+        cur = db.execute('INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)',
+                   (username, password_hash, 0))
         db.commit()
+        user_cache.invalidate(cur.lastrowid)
         
         # 注册主系统用户后，同步 filebrowser
         # After registering main system user, sync with filebrowser
@@ -321,11 +515,28 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
+        # 每次尝试消耗IP令牌；用户名令牌按（用户名, 客户端网段）计，在校验密码（KDF）之前检查、只在失败时消耗，
+        # 耗尽后直接拒绝而不再计算哈希；他人从其他网段耗尽令牌不会锁住用户本人
+        # Every attempt costs an IP token; the username bucket is keyed by (username, client subnet), peeked before
+        # the password KDF runs and spent only on failure, so a drained bucket is rejected without hashing while
+        # someone draining it from another subnet cannot lock the owner out
+        ip_allowed, ip_retry = login_ip_limiter.allow(request.remote_addr)
+        if not ip_allowed:
+            return throttled('login.html', ip_retry)
+        user_key = (username.lower(), client_subnet(request.remote_addr))
+        user_allowed, user_retry = login_user_limiter.check(user_key)
+        if not user_allowed:
+            return throttled('login.html', user_retry)
         user = query_db('SELECT * FROM users WHERE username = ?', (username,), one=True)
-        if user and check_password_hash(user[2], password):
+        try:
+            valid = bool(user) and password_hasher.check(user[2], password)
+        except HasherBusy:
+            return throttled('login.html', 1, _('系统繁忙，请稍后再试'))
+        if valid:
             user_obj = User(user[0], user[1], user[2], user[3])
             login_user(user_obj)
             return redirect(url_for('index'))
+        login_user_limiter.allow(user_key)
         flash(_('用户名或密码错误'))
     return render_template('login.html')
 
@@ -362,7 +573,7 @@ def admin_required(f):
     return decorated_function
 
 # 导入工具函数
-from utils import get_container_stats, safe_container_operation
+from utils import get_container_stats, safe_container_operation, bulk_container_operation, parse_bulk_timeout, BULK_ACTIONS
 
 # ================= 首页/容器管理 =================
 @app.route('/')
@@ -374,10 +585,14 @@ def index():
     Returns:
         Response: 渲染首页模板
     """
-    containers = client.containers.list(all=True)  # 获取所有容器
-    images = client.images.list()  # 获取所有镜像
-    cpu = psutil.cpu_percent(interval=0.5)  # 获取CPU使用率
-    mem = psutil.virtual_memory()  # 获取内存信息
+    containers = docker_state.containers() if docker_state else []  # 从状态缓存获取所有容器
+    images = docker_state.images() if docker_state else []  # 从状态缓存获取所有镜像
+    if config.MONITOR_ENABLED:
+        snapshot = resource_sampler.latest()  # 读取后台采样的最新数据
+        cpu, mem = snapshot['cpu'], snapshot['mem']
+    else:
+        cpu = psutil.cpu_percent(interval=None)  # 非阻塞获取CPU使用率
+        mem = psutil.virtual_memory()  # 获取内存信息
     # 为每个容器自动生成 web_url（优先常见 Web 端口）
     web_ports = [80, 443, 3000, 5000, 6881, 8080, 8081, 8096, 9000, 9091, 32400]
     for c in containers:
@@ -490,6 +705,55 @@ def remove_container(cid):
     flash(msg)
     return redirect(url_for('index'))
 
+@app.route('/api/container_stats')
+@login_required
+def api_container_stats():
+    """
+    批量获取所有运行中容器的资源统计（来自后台流式订阅，不阻塞）。
+    Get resource stats of all running containers at once (from background streaming subscriptions, non-blocking).
+    Returns:
+        JSON: {'status': 'success', 'stats': {容器ID: 统计结果}}
+    """
+    if not container_stats:
+        return jsonify({'status': 'error', 'message': '容器统计不可用'}), 503
+    return jsonify({'status': 'success', 'stats': container_stats.snapshot()})
+
+# 批量容器操作线程池 / Thread pool for bulk container operations
+bulk_executor = ThreadPoolExecutor(max_workers=config.BULK_MAX_WORKERS, thread_name_prefix='bulk-container')
+
+@app.route('/api/containers/bulk', methods=['POST'])
+@login_required
+def api_containers_bulk():
+    """
+    批量启动/停止/重启/删除容器，在有界线程池上并行执行。
+    Bulk start/stop/restart/remove containers in parallel on a bounded thread pool.
+    请求体 / Request body:
+        {"ids": [容器ID...], "action": "start|stop|restart|remove", "timeout": 10}
+        timeout 为 0..BULK_CONTAINER_TIMEOUT_MAX 的整数，否则返回 400
+    Returns:
+        JSON: {'status': 'success', 'results': [{'id', 'status', 'message', 'elapsed'}]}
+    注意事项:
+        - remove 仅管理员可用
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    action = data.get('action')
+    if not isinstance(ids, list) or not ids or not all(isinstance(cid, str) for cid in ids):
+        return jsonify({'status': 'error', 'message': 'ids 必须为非空的容器ID列表'}), 400
+    if action not in BULK_ACTIONS:
+        return jsonify({'status': 'error', 'message': f'不支持的操作: {action}'}), 400
+    if action == 'remove' and not current_user.is_admin:
+        return jsonify({'status': 'error', 'message': _('需要管理员权限')}), 403
+    if not client:
+        return jsonify({'status': 'error', 'message': 'Docker不可用'}), 503
+    try:
+        timeout = parse_bulk_timeout(data.get('timeout', config.BULK_CONTAINER_TIMEOUT), config.BULK_CONTAINER_TIMEOUT_MAX)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    results = bulk_container_operation(app, client, bulk_executor, ids, action, timeout=timeout,
+                                       max_workers=config.BULK_MAX_WORKERS)
+    return jsonify({'status': 'success', 'results': results})
+
 # 导入工具函数
 from utils import retry_operation
 
@@ -550,15 +814,205 @@ def remove_image(iid):
 @login_required
 def logs(cid):
     """
-    查看指定容器的最近100行日志。
+    容器日志页面，日志由 /api/containers/<cid>/logs 流式加载。
+    Container log page; logs are streamed from /api/containers/<cid>/logs.
     Args:
         cid (str): 容器ID
     Returns:
         Response: 渲染日志模板
     """
     c = client.containers.get(cid)
-    logs = c.logs(tail=100).decode(errors='ignore')
-    return render_template('logs.html', logs=logs, container=c)
+    return render_template('logs.html', container=c)
+
+def parse_log_query(args):
+    """
+    解析日志查询参数。
+    Parse log query parameters.
+    Args:
+        args: request.args
+    Returns:
+        dict: streams/since/until/tail
+    Raises:
+        ValueError: 参数无效
+    """
+    stream = args.get('stream', 'all')
+    if stream != 'all' and stream not in STREAMS:
+        raise ValueError(f'Invalid stream: {stream}')
+    tail = args.get('tail', 'all')
+    if tail != 'all':
+        tail = int(tail)
+        if tail < 0:
+            raise ValueError(f'Invalid tail: {tail}')
+    return {
+        'streams': STREAMS if stream == 'all' else (stream,),
+        'since': parse_time(args.get('since')),
+        'until': parse_time(args.get('until')),
+        'tail': tail
+    }
+
+@app.route('/api/containers/<cid>/logs')
+@login_required
+def api_container_logs(cid):
+    """
+    流式输出容器日志，逐行发送，内存占用与日志量无关。
+    Stream container logs line by line; memory use does not depend on log volume.
+    参数 / Query parameters:
+        follow: 1 表示持续跟随新日志
+        since/until: Unix时间戳、ISO时间或相对时长（如 1h）
+        tail: 每个流的末尾行数，默认 all
+        stream: all/stdout/stderr
+        format: sse（跟随时默认）或 text（分块纯文本）
+    Returns:
+        Response: text/event-stream 的 log 事件 {stream, time, line}，或 text/plain 分块输出
+    """
+    try:
+        query = parse_log_query(request.args)
+        # 断线重连时从最后一条日志之后继续：事件 ID 是其后的游标，重读该微秒并跳过已发送的行
+        # Resume after the last delivered line on reconnect: the event ID is the cursor after it, so that microsecond
+        # is read again and the lines already sent are skipped
+        resume = parse_cursor(request.headers.get('Last-Event-ID'))
+        if resume:
+            query['since'], query['tail'] = resume[0] / 1e6, 'all'
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    follow = request.args.get('follow', '').lower() in ('1', 'true', 'yes')
+    fmt = request.args.get('format', 'sse' if follow else 'text')
+    try:
+        c = client.containers.get(cid)
+    except docker.errors.NotFound:
+        return jsonify({'status': 'error', 'message': '容器不存在'}), 404
+    entries = iter_container_logs(c, follow=follow, idle_timeout=config.SSE_HEARTBEAT_INTERVAL, **query)
+    labelled = len(query['streams']) > 1
+
+    def generate_sse():
+        yield f'retry: {int(config.SSE_HEARTBEAT_INTERVAL * 1000)}\n\n'
+        try:
+            for position, entry in iter_positions(entries):
+                if entry is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                if resume and position < resume:
+                    continue
+                cursor = format_cursor((position[0], position[1] + 1))
+                yield f"id: {cursor}\n" + EventBroadcaster.format_event('log', entry)
+            yield EventBroadcaster.format_event('end', {})
+        except Exception as e:
+            app.logger.error(f'日志流中断 / Log stream failed: {cid}: {e}')
+            yield EventBroadcaster.format_event('error', {'message': str(e)})
+
+    def generate_text():
+        try:
+            for entry in entries:
+                if entry is not None:
+                    yield f"{entry['stream']}: {entry['line']}\n" if labelled else entry['line'] + '\n'
+        except Exception as e:
+            app.logger.error(f'日志流中断 / Log stream failed: {cid}: {e}')
+
+    if fmt == 'sse':
+        return Response(generate_sse(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    return Response(generate_text(), mimetype='text/plain',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/containers/<cid>/logs/export')
+@login_required
+def api_container_logs_export(cid):
+    """
+    以 gzip 压缩流下载容器日志，边读边压缩，不在内存中缓存日志。
+    Download container logs as a gzip stream, compressed on the fly without buffering the logs in memory.
+    参数 / Query parameters:
+        since/until: Unix时间戳、ISO时间或相对时长（如 7d）
+        stream: all/stdout/stderr
+    Returns:
+        Response: application/gzip 附件，每行格式为 "ISO时间 流 内容"
+    """
+    try:
+        query = parse_log_query(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    try:
+        c = client.containers.get(cid)
+    except docker.errors.NotFound:
+        return jsonify({'status': 'error', 'message': '容器不存在'}), 404
+    lines = (format_entry(entry) for entry in iter_container_logs(c, **query))
+    filename = f"{c.name}-logs-{time.strftime('%Y%m%d%H%M%S')}.txt.gz"
+    return Response(gzip_stream(lines), mimetype='application/gzip', headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/containers/<cid>/logs/page')
+@login_required
+def api_container_logs_page(cid):
+    """
+    按时间游标分页读取容器日志。
+    Page through container logs by time cursor.
+    参数 / Query parameters:
+        cursor: 上一页返回的 older/newer 游标（"<时间戳>:<序号>"），缺省为最新（older）或最早（newer）
+        direction: older（默认）或 newer
+        limit: 每页行数，默认200，最多1000
+        since/until/stream: 同 /api/containers/<cid>/logs
+    Returns:
+        JSON: {'status': 'success', 'entries': [...], 'older': 游标, 'newer': 游标}
+    """
+    try:
+        query = parse_log_query(request.args)
+        cursor = request.args.get('cursor') or None
+        parse_cursor(cursor)
+        limit = min(max(int(request.args.get('limit', 200)), 1), 1000)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    direction = request.args.get('direction', 'older')
+    if direction not in ('older', 'newer'):
+        return jsonify({'status': 'error', 'message': f'Invalid direction: {direction}'}), 400
+    try:
+        c = client.containers.get(cid)
+    except docker.errors.NotFound:
+        return jsonify({'status': 'error', 'message': '容器不存在'}), 404
+    page = read_page(c, query['streams'], cursor, limit, direction, query['since'], query['until'])
+    return jsonify(dict(page, status='success'))
+
+# 跨容器日志全文索引 / Cross-container log full-text index
+log_indexer = None
+if config.LOG_INDEX_ENABLED and docker_state:
+    log_indexer = LogIndexer(
+        app,
+        config.LOG_INDEX_FILE,
+        docker_state.containers,
+        interval=config.LOG_INDEX_INTERVAL,
+        retention_lines=config.LOG_INDEX_RETENTION_LINES,
+        retention_seconds=config.LOG_INDEX_RETENTION_DAYS * 86400
+    )
+    log_indexer.start()
+
+@app.route('/api/logs/search')
+@login_required
+def api_logs_search():
+    """
+    跨容器搜索已索引的日志。
+    Search indexed logs across containers.
+    参数 / Query parameters:
+        q: 搜索词（多个词同时匹配）
+        container: 容器名或ID前缀
+        since/until: Unix时间戳、ISO时间或相对时长（如 1h）
+        limit: 最大返回条数，默认100，最多1000
+    Returns:
+        JSON: {'status': 'success', 'results': [{container_id, container, stream, time, line}]}
+    """
+    if not log_indexer:
+        return jsonify({'status': 'error', 'message': '日志索引未启用'}), 503
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'status': 'error', 'message': '缺少搜索词'}), 400
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    results = log_indexer.search(q, container=request.args.get('container') or None, since=since, until=until, limit=limit)
+    return jsonify({'status': 'success', 'results': results})
 
 # ================= 用户管理（仅管理员） =================
 @app.route('/users')
@@ -566,12 +1020,122 @@ def logs(cid):
 @admin_required
 def users():
     """
-    用户管理页面，仅管理员可用。
+    用户管理页面，仅管理员可用；用户列表由页面通过 /api/users 分页加载。
     Returns:
         Response: 渲染用户管理模板
     """
-    users = query_db('SELECT id, username, is_admin FROM users')
-    return render_template('users.html', users=users)
+    return render_template('users.html')
+
+@app.route('/api/users')
+@login_required
+@admin_required
+def api_users():
+    """
+    分页查询用户。
+    Page through users.
+    参数 / Query parameters:
+        q: 用户名前缀
+        sort: id（默认）、username 或 is_admin
+        order: asc（默认）或 desc
+        cursor: 上一页返回的 next_cursor
+        limit: 每页条数，默认50，最多200
+    Returns:
+        JSON: {'status', 'users', 'next_cursor', 'total'}
+    """
+    try:
+        page = page_users(get_db(), q=request.args.get('q', '').strip(),
+                          sort=request.args.get('sort', 'id'), order=request.args.get('order', 'asc'),
+                          cursor=request.args.get('cursor') or None, limit=request.args.get('limit', 50))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', **page})
+
+@app.route('/api/users/export')
+@login_required
+@admin_required
+def api_users_export():
+    """
+    导出用户表。
+    Export the users table.
+    参数 / Query parameters:
+        format: csv（默认）或 json
+        include_hashes: 1 表示包含密码哈希（用于迁移）
+    Returns:
+        Response: 流式附件
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'json'):
+        return jsonify({'status': 'error', 'message': f'不支持的格式: {fmt}'}), 400
+    include_hashes = request.args.get('include_hashes', '').lower() in ('1', 'true', 'yes')
+    rows = get_db().execute('SELECT id, username, is_admin, password_hash FROM users ORDER BY id')
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/json'
+    return Response(export_users(rows, fmt, include_hashes), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="users-{time.strftime("%Y%m%d%H%M%S")}.{fmt}"'
+    })
+
+# 导入用户时同步 FileBrowser 的线程池，与批量容器操作的线程池分开，大批导入不会拖慢容器启停
+# Thread pool for FileBrowser sync during user import, separate from the bulk container pool so large imports never stall container start/stop
+filebrowser_sync_executor = ThreadPoolExecutor(max_workers=config.USER_IMPORT_SYNC_WORKERS,
+                                               thread_name_prefix='filebrowser-sync')
+
+@app.route('/api/users/import', methods=['POST'])
+@login_required
+@admin_required
+def api_users_import():
+    """
+    批量导入用户（CSV 或 JSON），字段为 username、password 或 password_hash、is_admin。
+    Bulk import users from CSV or JSON with username, password or password_hash, and is_admin fields.
+    - 先整体校验，有错误时不写入 / Everything is validated first; nothing is written on errors
+    - 已存在的用户名跳过 / Existing usernames are skipped
+    - 一个事务内 executemany 写入 / Rows are written with executemany in one transaction
+    - 带明文密码的用户分批并发同步到 FileBrowser，共用一个管理员 token
+      Users with plaintext passwords are synced to FileBrowser in concurrent batches under one admin token
+    Returns:
+        JSON: {'status', 'created', 'skipped', 'filebrowser': {'synced', 'failed', 'not_synced'}}
+    """
+    upload = request.files.get('file')
+    if upload:
+        data, filename = upload.read().decode('utf-8', errors='replace'), upload.filename or ''
+    else:
+        data, filename = request.get_data(as_text=True), ''
+    fmt = request.args.get('format') or ('json' if filename.lower().endswith('.json') or request.mimetype == 'application/json' else 'csv')
+    try:
+        rows = parse_users(data, fmt)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    db = get_db()
+    existing = {row[0] for row in db.execute('SELECT username FROM users')}
+    create, skipped, errors = validate_users(rows, existing, config.PASSWORD_MIN_LENGTH)
+    if errors:
+        return jsonify({'status': 'error', 'message': '导入数据有误，未写入任何用户', 'errors': errors}), 400
+    try:
+        hashes = iter(password_hasher.generate_many([row['password'] for row in create if row['password']]))
+    except HasherBusy:
+        return jsonify({'status': 'error', 'message': '系统繁忙，请稍后再试'}), 429
+    params = [(row['username'], next(hashes) if row['password'] else row['password_hash'], int(row['is_admin'])) for row in create]
+    try:
+        with db:
+            db.executemany('INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)', params)
+    except sqlite3.IntegrityError as e:
+        return jsonify({'status': 'error', 'message': f'导入失败: {e}'}), 409
+    user_cache.clear()
+    app.logger.info(f'Admin {current_user.username} imported {len(params)} users')
+
+    to_sync = [row for row in create if row['password']]
+    synced, failed = [], []
+    if to_sync:
+        synced, failed = sync_filebrowser_users(app, FILEBROWSER_URL, get_admin_password(), to_sync,
+                                                filebrowser_sync_executor, batch_size=config.USER_IMPORT_BATCH_SIZE)
+    return jsonify({
+        'status': 'success',
+        'created': len(params),
+        'skipped': skipped,
+        'filebrowser': {
+            'synced': len(synced),
+            'failed': failed,
+            'not_synced': [row['username'] for row in create if not row['password']]
+        }
+    })
 
 @app.route('/set_admin/<uid>')
 @login_required
@@ -587,6 +1151,7 @@ def set_admin(uid):
     db = get_db()
     db.execute('UPDATE users SET is_admin = 1 WHERE id = ?', (uid,))
     db.commit()
+    user_cache.invalidate(uid)
     flash(_('已设为管理员'))
     return redirect(url_for('users'))
 
@@ -613,6 +1178,7 @@ def unset_admin(uid):
     else:
         db.execute('UPDATE users SET is_admin = 0 WHERE id = ?', (uid,))
         db.commit()
+        user_cache.invalidate(uid)
         flash(_('已取消管理员'))
     
     return redirect(url_for('users'))
@@ -651,6 +1217,8 @@ def delete_user(username):
     try:
         db.execute('DELETE FROM users WHERE username = ?', (username,))
         db.commit()
+        user_cache.invalidate_where(lambda user: user.username == username)
+        download_scopes.invalidate(username)
         # 同步删除 filebrowser 用户
         try:
             # 获取管理员密码用于认证
@@ -696,9 +1264,7 @@ def appstore():
     with open('apps.json', 'r', encoding='utf-8') as f:
         apps = json.load(f)
     # 获取所有已安装APP的名称（小写）
-    installed_names = set()
-    for c in client.containers.list(all=True):
-        installed_names.add(c.name.lower())
+    installed_names = docker_state.container_names() if docker_state else set()
     return render_template('appstore_fixed.html', apps=apps, installed_names=installed_names)
 
 # 导入工具函数
@@ -706,64 +1272,201 @@ from utils import create_filebrowser_user, delete_filebrowser_user, reset_filebr
 
 # 获取管理员密码辅助函数
 def get_admin_password():
-    db = sqlite3.connect(DATABASE)
-    cur = db.execute('SELECT password_hash FROM users WHERE username = ? AND is_admin = 1', (FILEBROWSER_ADMIN,))
-    row = cur.fetchone()
-    db.close()
+    row = db_manager.connection().execute('SELECT password_hash FROM users WHERE username = ? AND is_admin = 1', (FILEBROWSER_ADMIN,)).fetchone()
     if row:
         return row[0]
     return None
 
-# 全局进度字典
-install_progress = {}
+# 后台任务调度器（安装等） / Background job scheduler (installs etc.)
+job_scheduler = JobScheduler(
+    app,
+    max_workers=config.JOB_MAX_WORKERS,
+    max_queue=config.JOB_QUEUE_SIZE,
+    history_limit=config.JOB_HISTORY_LIMIT
+)
+# 任务事件含提交者与参数，只推送给提交者与管理员 / Job events carry owner and params, so only the owner and admins receive them
+job_scheduler.add_listener(lambda job: event_broadcaster.publish('job', job.to_dict(), owner=job.owner))
+job_scheduler.start()
 
-def pull_image_with_progress(image, user_id):
+# 镜像拉取协调器：相同镜像的并发安装共享一次拉取 / Pull coordinator: concurrent installs of one image share a single pull
+image_puller = PullCoordinator(app, lambda image: client.api.pull(image, stream=True, decode=True))
+
+def image_present(image):
+    """
+    本地是否已有镜像。
+    Whether the image is already present locally.
+    """
     try:
-        install_progress[user_id] = 'pulling'
-        for line in client.api.pull(image, stream=True, decode=True):
-            pass  # 只做拉取，不更新百分比
-        install_progress[user_id] = 90  # APP源拉取完成
-    except Exception as e:
-        install_progress[user_id] = -1
-        raise e
+        client.images.get(image)
+        return True
+    except docker.errors.ImageNotFound:
+        return False
+
+def load_app_catalog():
+    """
+    读取应用商店目录。
+    Load the app store catalog.
+    """
+    with open('apps.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+# 空闲镜像预拉取器：预拉取标记为warm的目录镜像，与安装共享拉取协调器
+# Idle-time prefetcher for catalog images marked warm; shares the pull coordinator with installs
+image_prefetcher = ImagePrefetcher(
+    app,
+    load_app_catalog,
+    image_present,
+    image_puller.pull,
+    is_busy=job_scheduler.active,
+    window=parse_window(config.PREFETCH_WINDOW),
+    idle_seconds=config.PREFETCH_IDLE_SECONDS,
+    interval=config.PREFETCH_INTERVAL
+)
+if config.PREFETCH_ENABLED and client:
+    image_prefetcher.start()
+
+# 不计为交互请求的端点（静态资源、后台推送与轮询） / Endpoints not counted as interactive (static, push and polling)
+PASSIVE_ENDPOINTS = {'static', 'api_events', 'api_resource', 'api_container_stats', 'api_install_progress'}
+
+@app.before_request
+def record_interactive_activity():
+    """
+    记录交互请求，使预拉取暂停。
+    Record interactive requests so that prefetching pauses.
+    """
+    if request.endpoint not in PASSIVE_ENDPOINTS:
+        image_prefetcher.touch()
+
+@app.route('/api/prefetch')
+@login_required
+@admin_required
+def api_prefetch():
+    """
+    查询镜像预拉取状态。
+    Query the image prefetcher status.
+    """
+    return jsonify(dict(image_prefetcher.status(), enabled=config.PREFETCH_ENABLED))
+
+def pull_image_with_progress(image, job):
+    """
+    拉取镜像并按实际字节数更新任务进度（0-90%），包含速率与预计剩余时间。
+    Pull an image, updating job progress (0-90%) from real byte counts, including rate and ETA.
+    同一镜像已在拉取时挂接到进行中的拉取，共享其进度与结果；等待期间任务仍可取消。
+    If the same image is already being pulled, attach to that pull and share its progress and result; the job stays cancellable while waiting.
+    本地已有镜像（如已被预拉取）时直接跳过拉取。
+    The pull is skipped when the image is already present locally, e.g. after a prefetch.
+    Args:
+        image (str): 镜像名
+        job (Job): 安装任务
+    """
+    if image_present(image):
+        job.update(progress=90, stage='pulling', message=f'{image} 已在本地 / already present')
+        return
+    job.update(stage='pulling', message=f'pull {image}')
+
+    def on_progress(progress):
+        job.update(progress=int(progress.fraction() * 90), **progress.to_dict())
+
+    result = image_puller.pull(image, on_progress=on_progress, check_cancelled=job.check_cancelled)
+    job.update(progress=90, **result)  # APP源拉取完成
 
 @app.route('/api/install_app', methods=['POST'])
 @login_required
 @admin_required
 def install_app():
+    """
+    提交APP安装任务。
+    Submit an app install job.
+    Returns:
+        JSON: {'status': 'ok', 'job_id': 任务ID}；队列已满时返回429
+    """
     data = request.json
     image = data['image']
     name = data['name']
     ports = data.get('ports', {})
     env = data.get('env', {})
     volumes = data.get('volumes', {})
-    user_id = str(current_user.get_id())
-    install_progress[user_id] = 0
 
-    def do_install():
-        try:
-            pull_image_with_progress(image, user_id)
-            # 创建APP阶段进度递增
-            for p in range(91, 100):
-                install_progress[user_id] = p
-                time.sleep(0.05)
-            client.containers.run(
-                image, name=name, ports=ports, environment=env, volumes=volumes, detach=True
-            )
-            install_progress[user_id] = 100
-        except Exception as e:
-            install_progress[user_id] = -1
+    def do_install(job):
+        pull_image_with_progress(image, job)
+        job.check_cancelled()
+        job.update(progress=95, stage='creating')
+        client.containers.run(
+            image, name=name, ports=ports, environment=env, volumes=volumes, detach=True
+        )
 
-    t = threading.Thread(target=do_install)
-    t.start()
-    return jsonify({'status': 'ok'})
+    try:
+        job = job_scheduler.submit('install', str(current_user.get_id()), do_install, {'image': image, 'name': name})
+    except JobQueueFull:
+        return jsonify({'status': 'error', 'msg': _('安装任务过多，请稍后再试')}), 429
+    return jsonify({'status': 'ok', 'job_id': job.id})
+
+def get_visible_job(job_id):
+    """
+    获取当前用户可见的任务（管理员可见全部）。
+    Get a job visible to the current user (admins see all jobs).
+    Returns:
+        Job/None: 任务对象或None
+    """
+    job = job_scheduler.get(job_id)
+    if job and (current_user.is_admin or job.owner == str(current_user.get_id())):
+        return job
+    return None
 
 @app.route('/api/install_progress')
 @login_required
 def api_install_progress():
-    user_id = str(current_user.get_id())
-    progress = install_progress.get(user_id, 0)
-    return jsonify({'progress': progress})
+    """
+    查询安装任务进度；未指定 job_id 时返回当前用户最近的安装任务。
+    Query install job progress; without job_id, returns the current user's latest install job.
+    Returns:
+        JSON: 任务状态，含 progress/status/stage/error
+    """
+    job_id = request.args.get('job_id')
+    if job_id:
+        job = get_visible_job(job_id)
+    else:
+        jobs = job_scheduler.list(owner=str(current_user.get_id()), kind='install')
+        job = jobs[0] if jobs else None
+    if not job:
+        return jsonify({'progress': 0, 'status': None})
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs')
+@login_required
+def api_jobs():
+    """
+    列出任务（管理员可见全部，普通用户仅见自己的）。
+    List jobs (admins see all, other users only their own).
+    """
+    owner = None if current_user.is_admin else str(current_user.get_id())
+    return jsonify({'status': 'success', 'jobs': [j.to_dict() for j in job_scheduler.list(owner=owner)]})
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def api_job(job_id):
+    """
+    查询单个任务及其状态历史。
+    Get a single job with its status history.
+    """
+    job = get_visible_job(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': '任务不存在'}), 404
+    return jsonify({'status': 'success', 'job': job.to_dict(with_history=True)})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+def api_cancel_job(job_id):
+    """
+    取消任务。
+    Cancel a job.
+    """
+    job = get_visible_job(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': '任务不存在'}), 404
+    if not job_scheduler.cancel(job_id):
+        return jsonify({'status': 'error', 'message': '任务已结束'}), 409
+    return jsonify({'status': 'success', 'job': job.to_dict()})
 
 # ================= 应用商店管理 =================
 @app.route('/api/add_app', methods=['POST'])
@@ -801,7 +1504,8 @@ def add_app():
             'category_en': data['category_en'],
             'default_ports': data.get('default_ports', {}),
             'env': data.get('env', []),
-            'volumes': data.get('volumes', [])
+            'volumes': data.get('volumes', []),
+            'warm': bool(data.get('warm', False))
         }
         
         # 添加到apps.json / Add to apps.json
@@ -890,7 +1594,8 @@ def update_app():
                     'category_en': data.get('category_en', app.get('category_en')),
                     'default_ports': data.get('default_ports', app.get('default_ports', {})),
                     'env': data.get('env', app.get('env', [])),
-                    'volumes': data.get('volumes', app.get('volumes', []))
+                    'volumes': data.get('volumes', app.get('volumes', [])),
+                    'warm': bool(data.get('warm', app.get('warm', False)))
                 })
                 app_found = True
                 break
@@ -921,10 +1626,7 @@ def get_apps():
             apps = json.load(f)
         
         # 获取已安装的APP名称 / Get installed app names
-        installed_names = set()
-        if client:
-            for c in client.containers.list(all=True):
-                installed_names.add(c.name.lower())
+        installed_names = docker_state.container_names() if docker_state else set()
         
         # 为每个APP添加安装状态 / Add installation status for each app
         for app in apps:
@@ -946,10 +1648,7 @@ def sync_filebrowser_admin():
     if not wait_filebrowser_ready(app, FILEBROWSER_URL):
         app.logger.warning("filebrowser API 未就绪，跳过同步")
         return
-    db = sqlite3.connect(DATABASE)
-    cur = db.execute('SELECT username, password_hash FROM users WHERE is_admin = 1 ORDER BY id LIMIT 1')
-    row = cur.fetchone()
-    db.close()
+    row = db_manager.connection().execute('SELECT username, password_hash FROM users WHERE is_admin = 1 ORDER BY id LIMIT 1').fetchone()
     if row:
             username, password_hash = row
             # 尝试使用默认密码登录，如果失败则重置
@@ -991,9 +1690,63 @@ def filemanager():
 def filemanager_auto_login():
     return render_template('filemanager_auto_login.html')
 
-# 先定义/static/路径的路由
-@app.route('/static/<path:path>', methods=['GET'])
-# 再定义/filemanager/路径的路由
+# 代理访问日志类别 / Proxy access log category
+proxy_logger = app.logger.getChild('proxy')
+
+# FileBrowser 上游共享连接池，代理与 utils 中的管理接口共用
+# Shared FileBrowser upstream pool, used by the proxy and the utils helpers
+filebrowser_upstream = UpstreamPool(
+    pool_size=config.FILEBROWSER_POOL_SIZE,
+    connect_timeout=config.FILEBROWSER_CONNECT_TIMEOUT,
+    read_timeout=config.FILEBROWSER_READ_TIMEOUT
+)
+set_filebrowser_http(filebrowser_upstream)
+atexit.register(filebrowser_upstream.close)
+
+# FileBrowser 静态资源缓存 / FileBrowser static asset cache
+asset_cache = None
+if config.ASSET_CACHE_ENABLED:
+    asset_cache = AssetCache(
+        lambda path, headers: filebrowser_upstream.get(f'http://127.0.0.1:{config.FILEBROWSER_PORT}{path}',
+                                                       headers=headers, stream=True),
+        cache_dir=config.ASSET_CACHE_DIR,
+        max_memory=config.ASSET_CACHE_MEMORY_MB * 1024 * 1024,
+        revalidate_after=config.ASSET_CACHE_REVALIDATE
+    )
+
+def cached_asset_response(asset):
+    """
+    用缓存的静态资源应答，If-None-Match 命中时返回 304。
+    Answer with a cached static asset, returning 304 when If-None-Match matches.
+    Args:
+        asset (CachedAsset): 缓存的资源
+    Returns:
+        Response: 资源或 304 响应
+    """
+    encoding, body = asset.select(request.headers.get('Accept-Encoding'))
+    headers = {
+        'ETag': asset.variant_etag(encoding),
+        'Cache-Control': f'public, max-age={config.ASSET_CACHE_MAX_AGE}',
+        'Vary': 'Accept-Encoding'
+    }
+    if asset.matches(request.headers.get('If-None-Match')):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, headers=headers, content_type=asset.content_type)
+
+@app.route('/api/filebrowser/pool')
+@login_required
+@admin_required
+def api_filebrowser_pool():
+    """
+    查询FileBrowser上游连接池指标。
+    Query FileBrowser upstream connection pool metrics.
+    """
+    return jsonify(dict(filebrowser_upstream.stats(), asset_cache=asset_cache.stats() if asset_cache else None))
+
+# FileBrowser（包括其 /static/ 资源）只通过 /filemanager/ 前缀代理，/static/ 由本地静态文件视图处理
+# FileBrowser, including its /static/ assets, is proxied only under /filemanager/; /static/ is served locally
 @app.route('/filemanager/', defaults={'path': ''}, methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS'])
 @app.route('/filemanager/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS'])
 def filemanager_proxy(path):
@@ -1001,45 +1754,190 @@ def filemanager_proxy(path):
     文件管理器代理，转发请求到FileBrowser容器。
     File manager proxy, forward requests to FileBrowser container.
     """
-    # 处理/static/路径的请求
-    if request.path.startswith('/static/'):
-        # 直接使用/static/路径
-        url = f'http://127.0.0.1:{config.FILEBROWSER_PORT}{request.path}'
-        app.logger.info(f'转发静态资源请求到: {url}')
-    else:
-        # 处理/filemanager/路径的请求
-        if not path.startswith('/'):
-            path = f'/{path}'
-        url = f'http://127.0.0.1:{config.FILEBROWSER_PORT}{path}'
-    
-    # 复制所有请求头，保留原始Host头
-    headers = dict(request.headers)
+    if not path.startswith('/'):
+        path = f'/{path}'
+    url = f'http://127.0.0.1:{config.FILEBROWSER_PORT}{path}'
+
+    # FileBrowser 静态资源优先从缓存应答 / FileBrowser static assets are answered from the cache first
+    if asset_cache is not None and request.method in ('GET', 'HEAD') and path.startswith('/static/'):
+        key = f'{path}?{request.query_string.decode()}' if request.query_string else path
+        try:
+            asset = asset_cache.get(key)
+        except OSError as e:
+            app.logger.warning(f'静态资源缓存取回失败 / Asset cache fetch failed for {key}: {e}')
+            asset = None
+        if isinstance(asset, UncachedResponse):
+            # 不可缓存的响应已经取回，直接转发而不再请求一次 / Already fetched but uncacheable: relay it instead of asking again
+            return relay_upstream_response(asset.response, asset.iter_body())
+        if asset is not None:
+            return cached_asset_response(asset)
     
-    # 添加X-Forwarded-*头，帮助FileBrowser正确识别请求来源
-    headers['X-Forwarded-For'] = request.remote_addr
-    headers['X-Forwarded-Proto'] = request.scheme
-    headers['X-Forwarded-Host'] = request.host
+    # 复制请求头（保留原始Host头，去掉逐跳头），添加X-Forwarded-*头帮助FileBrowser识别请求来源
+    # Copy request headers (keeping Host, dropping hop-by-hop) and add X-Forwarded-* so FileBrowser sees the origin
+    headers = forward_request_headers(request.headers, {
+        'X-Forwarded-For': request.remote_addr,
+        'X-Forwarded-Proto': request.scheme,
+        'X-Forwarded-Host': request.host
+    })
     
-    app.logger.info(f'转发请求到: {url}')
-    app.logger.info(f'请求头: {headers}')
-    resp = requests.request(
-        method=request.method,
-        url=url,
-        headers=headers,
-        data=request.get_data(),
-        cookies=request.cookies,
-        allow_redirects=False,
-        stream=True
+    started = time.monotonic()
+    try:
+        # 上传与下载都按块流式转发，内存占用与文件大小无关
+        # Uploads and downloads are both streamed in chunks, so memory stays flat regardless of file size
+        # Cookie 随原始请求头转发，共享会话本身不保存 Cookie / Cookies travel in the forwarded headers; the shared session keeps none
+        resp = filebrowser_upstream.request(
+            method=request.method,
+            url=url,
+            headers=headers,
+            data=request_body(request, config.PROXY_CHUNK_SIZE),
+            allow_redirects=False,
+            stream=True
+        )
+    except requests.RequestException as e:
+        proxy_logger.warning(f'{request.method} {request.path} -> upstream error: {e}',
+                             extra={'fields': {'method': request.method, 'path': request.path, 'error': str(e)}})
+        return jsonify({'status': 'error', 'message': 'FileBrowser 不可用 / FileBrowser unavailable'}), 502
+    # 每个请求一条访问日志（耗时为收到响应头的时间），由采样/限速过滤器控制写入量
+    # One sampled, rate-limited access line per request; duration is time to response headers
+    duration_ms = int((time.monotonic() - started) * 1000)
+    proxy_logger.log(
+        logging.WARNING if resp.status_code >= 500 else logging.INFO,
+        f'{request.method} {request.path} -> {resp.status_code} {duration_ms}ms',
+        extra={'fields': {'method': request.method, 'path': request.path, 'status': resp.status_code, 'duration_ms': duration_ms}}
     )
-    app.logger.info(f'响应状态码: {resp.status_code}')
-    app.logger.info(f'响应头: {resp.headers}')
     
-    # 只排除必要的响应头
-    excluded_headers = ['transfer-encoding', 'connection']
-    response_headers = [(name, value) for (name, value) in resp.raw.headers.items() if name.lower() not in excluded_headers]
-    response = Response(resp.content, resp.status_code, response_headers)
+    return relay_upstream_response(resp, iter_response(resp, config.PROXY_CHUNK_SIZE))
+
+def relay_upstream_response(resp, body):
+    """
+    把上游流式响应转发给客户端。
+    Relay a streaming upstream response to the client.
+    Args:
+        resp: requests 的流式响应
+        body: 响应体块的迭代器
+    Returns:
+        Response: 流式响应
+    """
+    response = Response(body, resp.status_code, forward_response_headers(resp.raw.headers), direct_passthrough=True)
+    # 客户端中途断开或响应体未被读取时也释放上游连接 / Release the upstream connection even if the body is never consumed
+    response.call_on_close(resp.close)
     return response
 
+# ================= 数据目录直接下载 =================
+# Direct downloads from the data directory
+
+# 用户 FileBrowser scope 缓存 / Cache of users' FileBrowser scopes
+download_scopes = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.DOWNLOAD_SCOPE_TTL)
+
+def user_download_root(username):
+    """
+    获取用户可下载的本地根目录，与其 FileBrowser scope 一致。
+    Get the local root a user may download from, matching their FileBrowser scope.
+    Args:
+        username (str): 用户名
+    Returns:
+        str/None: 根目录，无法查询 scope 时为 None
+    Raises:
+        OutsideScope: scope 越出数据目录
+    """
+    scope = download_scopes.get(username)
+    if scope is MISSING:
+        token = get_cached_filebrowser_token(app, FILEBROWSER_URL, 'admin', get_admin_password())
+        scope = get_filebrowser_user_scope(app, FILEBROWSER_URL, token, username) if token else None
+        if scope is None:
+            return None
+        download_scopes.set(username, scope)
+    return scope_root(config.FILEBROWSER_DATA_DIR, scope)
+
+def file_range_body(path, start, length, size):
+    """
+    文件区间的响应体。
+    Body for a file range.
+    区间一直到文件末尾时（完整下载与播放器常用的 bytes=N-）交给服务器的 wsgi.file_wrapper：
+    只有用 sendfile 实现它的服务器（如 gunicorn）才不经 Python 复制，Werkzeug 开发服务器（app.run）仍按块读取；
+    并非所有服务器都会按 Content-Length 截断 file_wrapper，因此中间区间按块读取。
+    Ranges that run to the end of the file (full downloads and the bytes=N- requests players use) go to the
+    server's wsgi.file_wrapper; only servers that implement it with sendfile (such as gunicorn) skip the copy
+    through Python, and Werkzeug's development server (app.run) still reads in chunks. Not every server stops a
+    file_wrapper at Content-Length, so ranges in the middle of the file are read in chunks.
+    """
+    if request.method == 'HEAD':
+        return iter(())
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper is None or start + length != size:
+        return iter_file_range(path, start, length, config.DOWNLOAD_CHUNK_SIZE)
+    f = open(path, 'rb')
+    f.seek(start)
+    return file_wrapper(f, config.DOWNLOAD_CHUNK_SIZE)
+
+@app.route('/download/<path:relpath>')
+def download_file(relpath):
+    """
+    从数据目录直接下载文件，不经过 FileBrowser 与反向代理。
+    Download a file straight from the data directory, bypassing FileBrowser and the reverse proxy.
+    - 路径限定在用户的 FileBrowser scope 内 / Paths are confined to the user's FileBrowser scope
+    - 支持 Range/206、If-Range 与多段 multipart/byteranges / Supports Range/206, If-Range and multipart/byteranges
+    - 参数 download=1/true 时以附件下载，否则（含 download=0）内联，便于播放器拖动
+      download=1/true forces an attachment; anything else, including download=0, is inline for media players
+    Args:
+        relpath (str): 相对于 scope 的文件路径
+    Returns:
+        Response: 文件内容、206 分段、304 或错误
+    """
+    # 下载地址常由播放器与下载工具直接请求，未登录时返回 401 而不是重定向到登录页
+    # Players and download tools fetch these URLs directly, so answer 401 instead of redirecting to the login page
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'error', 'message': '请先登录 / Login required'}), 401
+    try:
+        root = user_download_root(current_user.username)
+        if root is None:
+            return jsonify({'status': 'error', 'message': '无法获取文件访问范围 / Cannot determine file scope'}), 503
+        path = resolve_download(root, relpath)
+    except OutsideScope:
+        return jsonify({'status': 'error', 'message': '无权访问该路径 / Path outside your scope'}), 403
+    except FileNotFoundError:
+        return jsonify({'status': 'error', 'message': '文件不存在 / File not found'}), 404
+
+    st = os.stat(path)
+    size = st.st_size
+    etag, last_modified = file_validators(st)
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    disposition = 'attachment' if request.args.get('download', '').lower() in ('1', 'true', 'yes') else 'inline'
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': etag,
+        'Last-Modified': last_modified,
+        'Cache-Control': 'private, no-cache',
+        'Content-Disposition': f"{disposition}; filename*=UTF-8''{quote(os.path.basename(path))}"
+    }
+    if request.if_none_match and request.if_none_match.contains_weak(etag.strip('"')):
+        return Response(status=304, headers=headers)
+
+    ranges = None
+    if if_range_matches(request.headers.get('If-Range'), etag, st.st_mtime):
+        try:
+            ranges = parse_ranges(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+
+    if ranges is None:
+        headers['Content-Length'] = str(size)
+        return Response(file_range_body(path, 0, size, size), 200, headers,
+                        content_type=content_type, direct_passthrough=True)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        headers['Content-Length'] = str(end - start + 1)
+        return Response(file_range_body(path, start, end - start + 1, size), 206, headers,
+                        content_type=content_type, direct_passthrough=True)
+    boundary = os.urandom(12).hex()
+    headers['Content-Length'] = str(multipart_length(ranges, size, content_type, boundary))
+    body = iter(()) if request.method == 'HEAD' else iter_multipart(
+        path, ranges, size, content_type, boundary, config.DOWNLOAD_CHUNK_SIZE)
+    return Response(body, 206, headers, content_type=f'multipart/byteranges; boundary={boundary}',
+                    direct_passthrough=True)
+
 # ================= 程序入口 =================
 def ensure_filebrowser_running():
     """
@@ -1118,18 +2016,21 @@ def change_password():
         
         # 验证原密码 / Validate old password
         user = query_db('SELECT * FROM users WHERE id = ?', (current_user.id,), one=True)
-        if user and check_password_hash(user[2], old):
+        try:
+            valid = bool(user) and password_hasher.check(user[2], old)
+            new_hash = password_hasher.generate(new) if valid else None
+        except HasherBusy:
+            return throttled('change_password.html', 1, _('系统繁忙，请稍后再试'))
+        if valid:
             # 更新密码 / Update password
             db = get_db()
-            db.execute('UPDATE users SET password_hash = ? WHERE id = ?', (generate_password_hash(new), current_user.id))
+            db.execute('UPDATE users SET password_hash = ? WHERE id = ?', (new_hash, current_user.id))
             db.commit()
+            user_cache.invalidate(current_user.id)
             
             # 同步 filebrowser 管理员密码 / Sync filebrowser admin password
             # 先获取当前管理员密码
-            db = sqlite3.connect(DATABASE)
-            cur = db.execute('SELECT password_hash FROM users WHERE username = ?', ('admin',))
-            admin_row = cur.fetchone()
-            db.close()
+            admin_row = db.execute('SELECT password_hash FROM users WHERE username = ?', ('admin',)).fetchone()
             admin_password = new if current_user.username == 'admin' else 'admin'
             
             create_filebrowser_user(app, FILEBROWSER_URL, current_user.username, new, admin_password, is_admin=True)
@@ -1144,68 +2045,71 @@ def change_password():
 
 @app.route('/api/resource')
 def api_resource():
-    cpu = psutil.cpu_percent(interval=0.2)
-    mem = psutil.virtual_memory()
-    disks = []
-    for part in psutil.disk_partitions(all=True):
-        try:
-            usage = psutil.disk_usage(part.mountpoint)
-            if usage.total < 100*1024*1024:
-                continue
-            disks.append({
-                'device': part.device,
-                'mountpoint': part.mountpoint,
-                'fstype': part.fstype,
-                'total': usage.total,
-                'used': usage.used,
-                'free': usage.free,
-                'percent': usage.percent
-            })
-        except Exception as e:
-            print(f'Error for {part.device}:', e)
-            continue
-    # RAID信息同前
-    raid = []
-    import platform
-    system = platform.system().lower()
-    if system == 'windows':
-        try:
-            import wmi
-            c = wmi.WMI()
-            for disk in c.Win32_DiskDrive():
-                raid.append({
-                    'name': disk.Caption,
-                    'level': getattr(disk, 'SCSIBus', ''),
-                    'status': disk.Status
-                })
-        except Exception:
-            pass
-    else:
-        try:
-            if os.path.exists('/proc/mdstat'):
-                with open('/proc/mdstat') as f:
-                    lines = f.readlines()
-                for line in lines:
-                    if line.startswith('md'):
-                        arr = line.split()
-                        raid.append({
-                            'name': arr[0],
-                            'level': arr[3] if len(arr)>3 else '',
-                            'status': arr[-1] if arr else ''
-                        })
-        except Exception:
-            pass
-    print('disks:', disks)
-    return jsonify({
-        'cpu': cpu,
-        'mem': {
-            'percent': mem.percent,
-            'used': mem.used,
-            'total': mem.total
-        },
-        'disks': disks,
-        'raid': raid
-    }) 
+    """
+    资源监控API，直接返回后台采样器的最新样本。
+    Resource monitoring API, returns the latest sample from the background sampler.
+    Query:
+        history: 为真时附带环形缓冲区中的近期样本 / include recent samples from the ring buffer when true
+        since: 仅返回时间戳大于该值的历史样本 / only return history samples newer than this timestamp
+    Returns:
+        JSON: 包含 cpu/mem/disks/raid 的JSON响应；监控关闭时返回503
+    """
+    if not config.MONITOR_ENABLED:
+        return jsonify({'status': 'error', 'message': '资源监控已禁用'}), 503
+    snapshot = resource_sampler.latest()
+    if request.args.get('history', '').lower() not in ('1', 'true', 'yes'):
+        return jsonify(snapshot)
+    try:
+        since = float(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since 必须是时间戳'}), 400
+    return jsonify(dict(snapshot, history=resource_sampler.history.items(since=since)))
+
+@app.route('/api/events')
+@login_required
+def api_events():
+    """
+    SSE推送通道，推送资源样本(resource)、容器状态变化(container)与任务进度(job，仅本人与管理员)。
+    SSE push channel for resource samples (resource), container state changes (container) and job progress (job, owner and admins only).
+    Returns:
+        Response: text/event-stream 流；连接数已满时返回503
+    """
+    subscriber = event_broadcaster.subscribe(str(current_user.get_id()), current_user.is_admin)
+    if subscriber is None:
+        return jsonify({'status': 'error', 'message': '推送连接数已达上限'}), 503
+    initial = [('resource', resource_sampler.latest())] if config.MONITOR_ENABLED else []
+    response = Response(
+        event_broadcaster.stream(subscriber, initial),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # 客户端在首个数据块前断开时生成器不会启动，其 finally 不会执行，这里保证释放连接名额
+    # If the client leaves before the first chunk the generator never starts and its finally never runs; always free the slot
+    response.call_on_close(lambda: event_broadcaster.unsubscribe(subscriber))
+    return response
+
+@app.route('/api/resource/history')
+@login_required
+def api_resource_history():
+    """
+    资源历史API，按区间与步长返回多分辨率指标历史。
+    Resource history API, returns multi-resolution metrics history by range and step.
+    Query Args:
+        range: 区间长度，秒数或带 s/m/h/d 后缀，默认 1h
+        step: 输出步长，格式同 range，默认为所选层级步长
+    Returns:
+        JSON: 列式时间序列 {'timestamps': [...], 'cpu': [...], ...}
+    """
+    if not config.MONITOR_ENABLED:
+        return jsonify({'status': 'error', 'message': '资源监控已禁用'}), 503
+    try:
+        range_seconds = parse_duration(request.args.get('range', '1h'))
+        step = parse_duration(request.args['step']) if request.args.get('step') else None
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if range_seconds <= 0 or range_seconds > 30 * 86400:
+        return jsonify({'status': 'error', 'message': 'range 必须在 (0, 30d] 之间'}), 400
+    return jsonify(metrics_store.query(range_seconds, step))
 
 # ================= 壁纸管理 API =================
 @app.route('/api/upload_wallpaper', methods=['POST'])
@@ -1283,7 +2187,9 @@ def api_wallpaper_list():
         current_wallpaper = wallpapers[0] if wallpapers else None
     return jsonify({
         'wallpapers': wallpapers,
-        'current': current_wallpaper
+        'current': current_wallpaper,
+        # 带指纹的地址，可长期缓存 / Fingerprinted URLs that can be cached long-term
+        'urls': {wp: url_for('static', filename=f'wallpapers/{wp}') for wp in wallpapers}
     })
 
 @app.route('/api/set_wallpaper', methods=['POST'])
@@ -0,0 +1,418 @@
+# =============================================================================
+# 文件名: asset_cache.py
+# 功能:   FileBrowser 静态资源（JS/CSS/字体/图片）的内存 + 磁盘缓存
+# 说明:   以路径与上游 ETag 为键缓存资源内容，首次取回时预压缩 gzip/brotli 变体；
+#         条件请求（If-None-Match）在本地直接返回 304；
+#         超过重新验证间隔后带 If-None-Match 询问上游，内容未变时只刷新时间；
+#         不可缓存的响应（非200、过大、禁止缓存）交给调用方直接转发，不再重复请求上游，
+#         并在重新验证间隔内记住，期间不经过缓存；
+#         brotli 为可选依赖，未安装时只提供 gzip
+# =============================================================================
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # 可选依赖 / Optional dependency
+    brotli = None
+
+
+# 值得压缩的内容类型 / Content types worth compressing
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml',
+                      'image/svg+xml', 'application/wasm', 'font/ttf', 'font/otf', 'application/manifest+json')
+
+# 小于此大小的资源不压缩 / Assets smaller than this are not compressed
+MIN_COMPRESS_SIZE = 1024
+
+# 编码名 -> 变体文件后缀 / Encoding name -> variant file suffix
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# 最多记住的不可缓存路径数 / Max number of remembered uncacheable paths
+MAX_UNCACHEABLE = 4096
+
+
+class CachedAsset:
+    """
+    一个缓存的静态资源及其压缩变体。
+    A cached static asset and its compressed variants.
+    """
+
+    def __init__(self, path, etag, content_type, body, variants=None, checked_at=0.0):
+        """
+        Args:
+            path: 上游路径
+            etag: 上游 ETag（带引号）
+            content_type: 内容类型
+            body: 原始内容
+            variants: {编码: 压缩内容}
+            checked_at: 上次与上游确认的时间（单调时钟）
+        """
+        self.path = path
+        self.etag = etag
+        self.content_type = content_type
+        self.body = body
+        self.variants = variants or {}
+        self.checked_at = checked_at
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(data) for data in self.variants.values())
+
+    def variant_etag(self, encoding):
+        """
+        每种编码使用不同的 ETag（强 ETag 只能对应一种表示）。
+        Each encoding gets its own ETag, since a strong ETag identifies exactly one representation.
+        """
+        if not encoding:
+            return self.etag
+        weak, tag = ('W/', self.etag[2:]) if self.etag.startswith('W/') else ('', self.etag)
+        return f'{weak}{tag[:-1]}-{encoding}"'
+
+    def matches(self, if_none_match):
+        """
+        判断 If-None-Match 是否命中任一变体（弱比较）。
+        Check whether If-None-Match matches any variant, using weak comparison.
+        """
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        if '*' in tags:
+            return True
+        tags = {tag[2:] if tag.startswith('W/') else tag for tag in tags}
+        own = {self.variant_etag(encoding) for encoding in (None, *self.variants)}
+        return any((tag[2:] if tag.startswith('W/') else tag) in tags for tag in own)
+
+    def select(self, accept_encoding):
+        """
+        按 Accept-Encoding 选择变体。
+        Choose a variant according to Accept-Encoding.
+        Returns:
+            tuple: (编码或None, 内容)
+        """
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                return encoding, self.variants[encoding]
+        return None, self.body
+
+
+class UncachedResponse:
+    """
+    不可缓存的上游响应，由调用方原样转发，避免再次请求上游。
+    An uncacheable upstream response for the caller to relay as is, so upstream is not asked twice.
+    """
+
+    def __init__(self, response, prefix=(), rest=()):
+        """
+        Args:
+            response: 上游流式响应
+            prefix: 判断是否可缓存时已读取的内容块
+            rest: 剩余内容块的迭代器
+        """
+        self.response = response
+        self.status_code = response.status_code
+        self._prefix = list(prefix)
+        self._rest = rest
+
+    def iter_body(self):
+        """
+        依次产出已读取与剩余的内容，结束时关闭上游响应。
+        Yield the chunks already read and then the rest, closing the upstream response at the end.
+        """
+        try:
+            yield from self._prefix
+            yield from self._rest
+        finally:
+            self.close()
+
+    def close(self):
+        self.response.close()
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q=') and q[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        if name.strip():
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _compressible(content_type):
+    return (content_type or '').split(';')[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress_variants(body, content_type):
+    """
+    为可压缩的资源生成 gzip/brotli 变体，只保留比原文小的。
+    Build gzip/brotli variants for compressible assets, keeping only those smaller than the original.
+    Returns:
+        dict: {编码: 压缩内容}
+    """
+    if len(body) < MIN_COMPRESS_SIZE or not _compressible(content_type):
+        return {}
+    variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+class AssetCache:
+    """
+    静态资源缓存：内存 LRU（按字节数限制）+ 磁盘持久化。
+    Static asset cache: an in-memory LRU bounded by bytes, persisted to disk.
+    """
+
+    def __init__(self, fetch, cache_dir=None, max_memory=32 * 1024 * 1024, max_asset_size=5 * 1024 * 1024,
+                 revalidate_after=300, clock=time.monotonic):
+        """
+        Args:
+            fetch: fetch(path, headers) -> 流式 requests 响应，用于从上游取回资源
+            cache_dir: 磁盘缓存目录，None 表示只用内存
+            max_memory: 内存缓存的最大字节数
+            max_asset_size: 可缓存资源的最大字节数，更大的资源不缓存
+            revalidate_after: 多少秒后向上游重新验证
+            clock: 单调时钟函数（便于测试）
+        """
+        self.fetch = fetch
+        self.cache_dir = cache_dir
+        self.max_memory = max_memory
+        self.max_asset_size = max_asset_size
+        self.revalidate_after = revalidate_after
+        self.clock = clock
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._path_locks = [threading.Lock() for _ in range(64)]
+        self._uncacheable = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, path):
+        """
+        获取资源，必要时从磁盘加载或从上游取回。
+        Get an asset, loading it from disk or fetching it upstream when needed.
+        Args:
+            path: 上游路径（如 /static/js/app.js）
+        Returns:
+            CachedAsset: 缓存的资源
+            UncachedResponse: 刚取回但不可缓存（非200、过大或上游禁止缓存）的响应，调用方负责转发并关闭
+            None: 该路径最近被判定为不可缓存，调用方直接代理
+        Raises:
+            OSError: 上游不可用且没有缓存副本（requests 异常也是 OSError）
+        """
+        asset = self._from_memory(path)
+        if asset is not None and self.clock() - asset.checked_at < self.revalidate_after:
+            self._count_hit()
+            return asset
+        if self._recently_uncacheable(path):
+            return None
+        with self._path_lock(path):
+            asset = self._from_memory(path) or self._from_disk(path)
+            if asset is not None and self.clock() - asset.checked_at < self.revalidate_after:
+                self._remember(asset)
+                self._count_hit()
+                return asset
+            if self._recently_uncacheable(path):
+                return None
+            with self._lock:
+                self.misses += 1
+            try:
+                return self._refresh(path, asset)
+            except OSError:
+                # 上游不可用时继续使用过期副本 / Keep serving the stale copy while upstream is unavailable
+                if asset is None:
+                    raise
+                return asset
+
+    def stats(self):
+        """
+        缓存指标。
+        Cache metrics.
+        """
+        with self._lock:
+            return {'entries': len(self._memory), 'memory_bytes': self._memory_size,
+                    'hits': self.hits, 'misses': self.misses}
+
+    def _count_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def _recently_uncacheable(self, path):
+        with self._lock:
+            marked = self._uncacheable.get(path)
+            if marked is None:
+                return False
+            if self.clock() - marked < self.revalidate_after:
+                return True
+            del self._uncacheable[path]
+            return False
+
+    def _mark_uncacheable(self, path):
+        with self._lock:
+            self._uncacheable[path] = self.clock()
+            self._uncacheable.move_to_end(path)
+            while len(self._uncacheable) > MAX_UNCACHEABLE:
+                self._uncacheable.popitem(last=False)
+
+    def _path_lock(self, path):
+        # 分段锁：同一路径只由一个线程取回，锁的数量固定 / Striped locks: one fetch per path, with a fixed number of locks
+        return self._path_locks[hash(path) % len(self._path_locks)]
+
+    def _from_memory(self, path):
+        with self._lock:
+            asset = self._memory.get(path)
+            if asset is not None:
+                self._memory.move_to_end(path)
+            return asset
+
+    def _remember(self, asset):
+        with self._lock:
+            old = self._memory.pop(asset.path, None)
+            if old is not None:
+                self._memory_size -= old.size
+            if asset.size > self.max_memory:
+                return
+            self._memory[asset.path] = asset
+            self._memory_size += asset.size
+            while self._memory_size > self.max_memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= evicted.size
+
+    def _refresh(self, path, cached):
+        headers = {'Accept-Encoding': 'identity'}
+        if cached is not None:
+            headers['If-None-Match'] = cached.etag
+        resp = self.fetch(path, headers)
+        try:
+            if resp.status_code == 304 and cached is not None:
+                cached.checked_at = self.clock()
+                self._remember(cached)
+                self._write_meta(cached)
+                return cached
+            body, chunks, rest = self._read_body(resp)
+            if body is None:
+                self._forget(path)
+                self._mark_uncacheable(path)
+                # 响应交给调用方转发，由其负责关闭 / Hand the response to the caller, which now owns closing it
+                relayed, resp = UncachedResponse(resp, chunks, rest), None
+                return relayed
+            content_type = resp.headers.get('Content-Type', 'application/octet-stream')
+            # 上游未提供 ETag 时用内容摘要生成 / Derive an ETag from the content when upstream has none
+            etag = resp.headers.get('ETag') or f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            if cached is not None and cached.etag == etag:
+                variants = cached.variants
+            else:
+                variants = compress_variants(body, content_type)
+            asset = CachedAsset(path, etag, content_type, body, variants, self.clock())
+        finally:
+            if resp is not None:
+                resp.close()
+        self._remember(asset)
+        self._write_disk(asset)
+        return asset
+
+    def _read_body(self, resp):
+        """
+        读取可缓存的响应体。
+        Read a cacheable response body.
+        Returns:
+            tuple: (内容或None, 已读取的块, 剩余块的迭代器)；内容为 None 表示不可缓存
+        """
+        # 读取未解码的原始内容，不可缓存时可原样转发 / Read the raw, undecoded bytes so they can be relayed unchanged
+        source = resp.raw.stream(64 * 1024, decode_content=False)
+        if resp.status_code != 200:
+            return None, (), source
+        cache_control = resp.headers.get('Cache-Control', '').lower()
+        encoding = resp.headers.get('Content-Encoding', 'identity').lower()
+        if ('no-store' in cache_control or 'private' in cache_control or encoding != 'identity'
+                or int(resp.headers.get('Content-Length') or 0) > self.max_asset_size):
+            return None, (), source
+        chunks, size = [], 0
+        for chunk in source:
+            size += len(chunk)
+            chunks.append(chunk)
+            if size > self.max_asset_size:
+                return None, chunks, source
+        return b''.join(chunks), chunks, source
+
+    def _forget(self, path):
+        with self._lock:
+            old = self._memory.pop(path, None)
+            if old is not None:
+                self._memory_size -= old.size
+        if self.cache_dir:
+            base = self._disk_base(path)
+            for suffix in ('.json', '', '.gz', '.br'):
+                try:
+                    os.remove(base + suffix)
+                except FileNotFoundError:
+                    pass
+
+    # ---------- 磁盘缓存 / Disk cache ----------
+
+    def _disk_base(self, path):
+        return os.path.join(self.cache_dir, hashlib.sha256(path.encode()).hexdigest())
+
+    def _write_file(self, filename, data):
+        # 先写临时文件再原子替换，读者不会看到半个文件 / Write then atomically replace so readers never see partial files
+        tmp = f'{filename}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, filename)
+
+    def _write_meta(self, asset):
+        if not self.cache_dir:
+            return
+        meta = {'path': asset.path, 'etag': asset.etag, 'content_type': asset.content_type,
+                'encodings': sorted(asset.variants), 'checked_at': time.time()}
+        try:
+            self._write_file(self._disk_base(asset.path) + '.json', json.dumps(meta).encode())
+        except OSError:
+            pass
+
+    def _write_disk(self, asset):
+        if not self.cache_dir:
+            return
+        base = self._disk_base(asset.path)
+        try:
+            self._write_file(base, asset.body)
+            for encoding, suffix in ENCODINGS:
+                if encoding in asset.variants:
+                    self._write_file(base + suffix, asset.variants[encoding])
+            self._write_meta(asset)
+        except OSError:
+            pass
+
+    def _from_disk(self, path):
+        if not self.cache_dir:
+            return None
+        base = self._disk_base(path)
+        try:
+            with open(base + '.json', 'rb') as f:
+                meta = json.load(f)
+            if meta.get('path') != path:
+                return None
+            with open(base, 'rb') as f:
+                body = f.read()
+            variants = {}
+            for encoding, suffix in ENCODINGS:
+                if encoding in meta.get('encodings', ()):
+                    with open(base + suffix, 'rb') as f:
+                        variants[encoding] = f.read()
+        except (OSError, ValueError):
+            return None
+        # 磁盘记录的是墙钟时间，换算成单调时钟 / The disk stores wall time; convert it to the monotonic clock
+        age = max(0.0, time.time() - meta.get('checked_at', 0))
+        return CachedAsset(path, meta['etag'], meta['content_type'], body, variants, self.clock() - age)
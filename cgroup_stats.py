@@ -0,0 +1,308 @@
+# =============================================================================
+# 文件名: cgroup_stats.py
+# 功能:   直接读取 cgroup v2 文件的容器资源统计
+# 说明:   一次遍历 /sys/fs/cgroup 读取所有容器的 cpu.stat、memory.current、
+#         io.stat 与 pids.current，避免 Docker stats API 的守护进程开销；
+#         网络流量从容器内进程的 /proc/<pid>/net/dev 读取（宿主机 PID 命名空间不可见时为 None）；
+#         cgroup 与 /proc 根目录可配置，便于在伪造的 sysfs 目录上测试
+# =============================================================================
+
+import os
+import re
+import threading
+import time
+
+import psutil
+
+
+# 匹配 systemd 驱动 (docker-<id>.scope) 与 cgroupfs 驱动 (docker/<id>) 的目录名
+# Matches directory names for the systemd driver (docker-<id>.scope) and the cgroupfs driver (docker/<id>)
+CONTAINER_DIR_RE = re.compile(r'^(?:docker-)?([0-9a-f]{64})(?:\.scope)?$')
+
+
+def _read_int(path):
+    with open(path) as f:
+        value = f.read().strip()
+    return None if value == 'max' else int(value)
+
+
+def _read_keyed(path):
+    result = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 2:
+                result[parts[0]] = int(parts[1])
+    return result
+
+
+def _read_io(path):
+    read_bytes = write_bytes = 0
+    with open(path) as f:
+        for line in f:
+            for field in line.split()[1:]:
+                key, _, value = field.partition('=')
+                if key == 'rbytes':
+                    read_bytes += int(value)
+                elif key == 'wbytes':
+                    write_bytes += int(value)
+    return read_bytes, write_bytes
+
+
+def _read_net_dev(path):
+    # 跳过两行表头与回环接口 / Skip the two header lines and the loopback interface
+    rx_bytes = tx_bytes = 0
+    with open(path) as f:
+        for line in f.readlines()[2:]:
+            name, _, fields = line.partition(':')
+            fields = fields.split()
+            if name.strip() == 'lo' or len(fields) < 9:
+                continue
+            rx_bytes += int(fields[0])
+            tx_bytes += int(fields[8])
+    return rx_bytes, tx_bytes
+
+
+class CgroupStatsReader:
+    """
+    cgroup v2 容器统计读取器。
+    cgroup v2 container stats reader.
+    """
+
+    def __init__(self, root='/sys/fs/cgroup', max_depth=3, proc_root='/proc', rediscover_interval=30.0,
+                 clock=time.monotonic):
+        """
+        Args:
+            root: cgroup v2 挂载点
+            max_depth: 查找容器目录的最大深度
+            proc_root: procfs 挂载点（读取网络流量）
+            rediscover_interval: 有容器目录未找到时，两次重新遍历的最小间隔(秒)
+            clock: 单调时钟函数（便于测试）
+        """
+        self.root = root
+        self.max_depth = max_depth
+        self.proc_root = proc_root
+        self.rediscover_interval = rediscover_interval
+        self.clock = clock
+        self._paths = {}
+        self._discovered_at = None
+        self._previous = {}
+        self._lock = threading.Lock()
+
+    def available(self):
+        """
+        判断 cgroup v2 层级是否存在且可读。
+        Check whether a readable cgroup v2 hierarchy exists.
+        """
+        return os.access(os.path.join(self.root, 'cgroup.controllers'), os.R_OK)
+
+    def discover(self):
+        """
+        遍历 cgroup 树，建立容器ID到 cgroup 目录的映射。
+        Walk the cgroup tree and map container IDs to their cgroup directories.
+        Returns:
+            dict: {容器ID: cgroup目录}
+        """
+        paths = {}
+        pending = [(self.root, 0)]
+        while pending:
+            directory, depth = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                match = CONTAINER_DIR_RE.match(entry.name)
+                if match:
+                    paths[match.group(1)] = entry.path
+                elif depth + 1 < self.max_depth:
+                    pending.append((entry.path, depth + 1))
+        with self._lock:
+            self._paths = paths
+            self._discovered_at = self.clock()
+        return paths
+
+    def invalidate(self):
+        """
+        容器启动后调用，下一次 read_all 立即重新遍历而不等待 rediscover_interval。
+        Call after a container starts so the next read_all rediscovers without waiting for rediscover_interval.
+        """
+        with self._lock:
+            self._discovered_at = None
+
+    def read_net(self, path):
+        """
+        读取容器网络命名空间的收发字节数（不含回环接口）。
+        Read the received/sent bytes of a container's network namespace, excluding loopback.
+        Returns:
+            tuple: (net_rx, net_tx)，无法读取时为 (None, None)
+        """
+        try:
+            with open(os.path.join(path, 'cgroup.procs')) as f:
+                pid = f.readline().strip()
+            if pid:
+                return _read_net_dev(os.path.join(self.proc_root, pid, 'net', 'dev'))
+        except (OSError, ValueError):
+            pass
+        return None, None
+
+    def read(self, cid, path, now=None):
+        """
+        读取单个容器的 CPU、内存、I/O、网络与进程数。
+        Read CPU, memory, I/O, network and pid counts for one container.
+        Raises:
+            OSError: cgroup 文件不可读
+        """
+        now = time.monotonic() if now is None else now
+        usage_usec = _read_keyed(os.path.join(path, 'cpu.stat')).get('usage_usec', 0)
+        mem_current = _read_int(os.path.join(path, 'memory.current'))
+        try:
+            mem_limit = _read_int(os.path.join(path, 'memory.max'))
+        except OSError:
+            mem_limit = None
+        if not mem_limit:
+            mem_limit = psutil.virtual_memory().total
+        try:
+            inactive = _read_keyed(os.path.join(path, 'memory.stat')).get('inactive_file', 0)
+        except OSError:
+            inactive = 0
+        try:
+            blk_read, blk_write = _read_io(os.path.join(path, 'io.stat'))
+        except OSError:
+            blk_read = blk_write = 0
+        try:
+            pids = _read_int(os.path.join(path, 'pids.current'))
+        except OSError:
+            pids = 0
+        net_rx, net_tx = self.read_net(path)
+        mem_usage = max(0, mem_current - inactive)
+
+        with self._lock:
+            previous = self._previous.get(cid)
+            self._previous[cid] = (now, usage_usec, mem_usage)
+        cpu_percent = 0.0
+        mem_delta = 0
+        if previous:
+            elapsed = now - previous[0]
+            if elapsed > 0:
+                cpu_percent = (usage_usec - previous[1]) / (elapsed * 1e6) * 100.0
+            mem_delta = mem_usage - previous[2]
+        return {
+            'cpu_percent': round(max(0.0, cpu_percent), 2),
+            'mem_usage': mem_usage,
+            'mem_limit': mem_limit,
+            'mem_percent': round(mem_usage * 100.0 / mem_limit, 2) if mem_limit else 0.0,
+            'mem_delta': mem_delta,
+            'blk_read': blk_read,
+            'blk_write': blk_write,
+            'net_rx': net_rx,
+            'net_tx': net_tx,
+            'pids': pids or 0,
+            'timestamp': time.time()
+        }
+
+    def read_all(self, container_ids=None):
+        """
+        一次遍历读取所有（或指定）容器的统计。
+        Read stats for all (or the given) containers in one pass.
+        Args:
+            container_ids: 需要读取的容器ID集合，为空则读取所有发现的容器
+        Returns:
+            dict: {容器ID: 统计结果}
+        """
+        with self._lock:
+            paths = dict(self._paths)
+            discovered_at = self._discovered_at
+        # 容器目录缺失时（容器刚启动或不在 cgroup v2 下）按间隔重新遍历，避免每次读取都遍历整棵树
+        # Rediscover at most once per interval when directories are missing (a fresh container, or one outside cgroup v2)
+        # rather than walking the whole tree on every read
+        due = discovered_at is None or self.clock() - discovered_at >= self.rediscover_interval
+        if container_ids is not None and due and not set(container_ids) <= set(paths):
+            paths = self.discover()
+        results = {}
+        now = time.monotonic()
+        for cid, path in paths.items():
+            if container_ids is not None and cid not in container_ids:
+                continue
+            try:
+                results[cid] = self.read(cid, path, now)
+            except FileNotFoundError:
+                # 容器已退出，cgroup 目录被移除 / Container exited and its cgroup was removed
+                continue
+        with self._lock:
+            for cid in set(self._previous) - set(results):
+                self._previous.pop(cid, None)
+        return results
+
+
+class CgroupStatsCollector:
+    """
+    基于 cgroup 的容器统计采集器，接口与 ContainerStatsCollector 一致。
+    cgroup-based container stats collector exposing the same interface as ContainerStatsCollector.
+    - snapshot() 按需读取，min_interval 内复用上次结果 / snapshot() reads on demand, reusing results within min_interval
+    - 读取失败时切换到 fallback（Docker API）采集器 / Switches to the fallback (Docker API) collector when reads fail
+    """
+
+    def __init__(self, app, docker_state, reader, fallback_factory=None, min_interval=1.0):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            docker_state: DockerStateCache 实例（提供运行中容器及名称）
+            reader: CgroupStatsReader 实例
+            fallback_factory: 返回 Docker API 采集器的函数
+            min_interval: 两次读取 cgroup 的最小间隔(秒)
+        """
+        self.app = app
+        self.docker_state = docker_state
+        self.reader = reader
+        self.fallback_factory = fallback_factory
+        self.min_interval = min_interval
+        self.fallback = None
+        self._cache = {}
+        self._cached_at = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        建立容器目录映射，并在容器启动时让读取器重新遍历。
+        Build the container directory map and have the reader rediscover when a container starts.
+        """
+        self.reader.discover()
+        self.docker_state.add_listener(self._on_container_event)
+
+    def _on_container_event(self, action, cid, container):
+        if action in ('start', 'restart', 'resync'):
+            self.reader.invalidate()
+
+    def snapshot(self):
+        """
+        获取所有运行中容器的最新统计。
+        Get the latest stats of every running container.
+        Returns:
+            dict: {容器ID: 统计结果}
+        """
+        if self.fallback:
+            return self.fallback.snapshot()
+        with self._lock:
+            if time.monotonic() - self._cached_at < self.min_interval:
+                return {cid: dict(stats) for cid, stats in self._cache.items()}
+            names = {c.id: c.name for c in self.docker_state.containers() if c.status == 'running'}
+            try:
+                stats = self.reader.read_all(set(names))
+            except OSError as e:
+                self.app.logger.warning(f'读取 cgroup 统计失败，改用 Docker API / cgroup stats unreadable, falling back to Docker API: {e}')
+                return self._switch_to_fallback()
+            for cid, item in stats.items():
+                item['name'] = names.get(cid, '')
+            self._cache = stats
+            self._cached_at = time.monotonic()
+            return {cid: dict(item) for cid, item in stats.items()}
+
+    def _switch_to_fallback(self):
+        if not self.fallback_factory:
+            return {}
+        self.fallback = self.fallback_factory()
+        self.fallback.start()
+        return self.fallback.snapshot()
@@ -4,6 +4,7 @@ Configuration file for the embedded lightweight NAS management software.
 """
 
 import os
+import re
 from datetime import timedelta
 
 
@@ -21,6 +22,8 @@ class Config:
     # 数据库配置 / Database configuration
     DATABASE_PATH = os.environ.get('DATABASE_PATH', 'users.db')
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE_PATH}'
+    DATABASE_BUSY_TIMEOUT = float(os.environ.get('DATABASE_BUSY_TIMEOUT', 5))  # 等待写锁秒数 / seconds to wait for the write lock
+    DATABASE_CACHED_STATEMENTS = int(os.environ.get('DATABASE_CACHED_STATEMENTS', 256))  # 每连接语句缓存 / per-connection statement cache
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # 会话配置 / Session configuration
@@ -32,13 +35,36 @@ class Config:
     # Docker配置 / Docker configuration
     DOCKER_HOST = os.environ.get('DOCKER_HOST', 'unix:///var/run/docker.sock')
     DOCKER_TIMEOUT = int(os.environ.get('DOCKER_TIMEOUT', 30))
+    DOCKER_STATE_RESYNC_INTERVAL = int(os.environ.get('DOCKER_STATE_RESYNC_INTERVAL', 300))  # 秒，0为关闭 / seconds, 0 disables
+    BULK_MAX_WORKERS = int(os.environ.get('BULK_MAX_WORKERS', 8))  # 批量容器操作并发数 / bulk operation concurrency
+    BULK_CONTAINER_TIMEOUT = int(os.environ.get('BULK_CONTAINER_TIMEOUT', 10))  # 单容器停止超时(秒) / per-container stop timeout (seconds)
+    BULK_CONTAINER_TIMEOUT_MAX = int(os.environ.get('BULK_CONTAINER_TIMEOUT_MAX', 300))  # 请求可指定的最大超时(秒) / largest timeout a request may ask for (seconds)
+    CONTAINER_STATS_ENABLED = os.environ.get('CONTAINER_STATS_ENABLED', 'True').lower() == 'true'
+    CONTAINER_STATS_BACKEND = os.environ.get('CONTAINER_STATS_BACKEND', 'auto')  # auto/cgroup/docker
+    CGROUP_ROOT = os.environ.get('CGROUP_ROOT', '/sys/fs/cgroup')
     
     # 文件管理器配置 / File manager configuration
     FILEBROWSER_PORT = int(os.environ.get('FILEBROWSER_PORT', 8088))
+    PROXY_CHUNK_SIZE = int(os.environ.get('PROXY_CHUNK_SIZE', 65536))  # 文件管理器代理的流式分块大小（字节） / Streaming chunk size of the file manager proxy (bytes)
+    FILEBROWSER_POOL_SIZE = int(os.environ.get('FILEBROWSER_POOL_SIZE', 16))  # 上游keep-alive连接池大小 / upstream keep-alive pool size
+    FILEBROWSER_CONNECT_TIMEOUT = float(os.environ.get('FILEBROWSER_CONNECT_TIMEOUT', 3))  # 上游连接超时(秒) / upstream connect timeout (seconds)
+    FILEBROWSER_READ_TIMEOUT = float(os.environ.get('FILEBROWSER_READ_TIMEOUT', 60))  # 上游读取超时(秒) / upstream read timeout (seconds)
+    ASSET_CACHE_ENABLED = os.environ.get('ASSET_CACHE_ENABLED', 'True').lower() == 'true'  # 缓存FileBrowser静态资源 / cache FileBrowser static assets
+    ASSET_CACHE_DIR = os.environ.get('ASSET_CACHE_DIR', './asset_cache')
+    ASSET_CACHE_MEMORY_MB = int(os.environ.get('ASSET_CACHE_MEMORY_MB', 32))  # 内存缓存上限(MB) / in-memory limit (MB)
+    ASSET_CACHE_MAX_AGE = int(os.environ.get('ASSET_CACHE_MAX_AGE', 3600))  # 浏览器缓存时间(秒) / browser Cache-Control max-age (seconds)
+    ASSET_CACHE_REVALIDATE = int(os.environ.get('ASSET_CACHE_REVALIDATE', 300))  # 向上游重新验证的间隔(秒) / upstream revalidation interval (seconds)
+    
+    # 本地静态文件配置 / Local static file configuration
+    STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 300))  # 无指纹地址的缓存时间(秒) / max-age for unfingerprinted URLs (seconds)
+    STATIC_IMMUTABLE_MAX_AGE = int(os.environ.get('STATIC_IMMUTABLE_MAX_AGE', 31536000))  # 带指纹地址的缓存时间(秒) / max-age for fingerprinted URLs (seconds)
+    STATIC_X_SENDFILE = os.environ.get('STATIC_X_SENDFILE', 'False').lower() == 'true'  # 由nginx/Apache发送文件 / let nginx/Apache send files
     FILEBROWSER_IMAGE = os.environ.get('FILEBROWSER_IMAGE', 'filebrowser/filebrowser:latest')
     FILEBROWSER_DATA_DIR = os.environ.get('FILEBROWSER_DATA_DIR', '/DATA')
     FILEBROWSER_CONFIG_DIR = os.environ.get('FILEBROWSER_CONFIG_DIR', './filebrowser/config')
     FILEBROWSER_DB_DIR = os.environ.get('FILEBROWSER_DB_DIR', './filebrowser/database')
+    DOWNLOAD_CHUNK_SIZE = int(os.environ.get('DOWNLOAD_CHUNK_SIZE', 262144))  # 直接下载的读取块大小（字节） / read size of direct downloads (bytes)
+    DOWNLOAD_SCOPE_TTL = int(os.environ.get('DOWNLOAD_SCOPE_TTL', 300))  # 用户FileBrowser scope缓存时间(秒) / cache time of users' FileBrowser scopes (seconds)
     
     # 应用配置 / Application configuration
     APP_PORT = int(os.environ.get('APP_PORT', 5000))
@@ -50,10 +76,25 @@ class Config:
     LOG_FILE = os.environ.get('LOG_FILE', 'app.log')
     LOG_MAX_SIZE = int(os.environ.get('LOG_MAX_SIZE', 10 * 1024 * 1024))  # 10MB
     LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # json/text
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))  # 异步日志队列长度 / async log queue size
+    LOG_CATEGORY_LEVELS = os.environ.get('LOG_CATEGORY_LEVELS', '')  # 如 proxy=WARNING,docker=DEBUG / e.g. proxy=WARNING,docker=DEBUG
+    LOG_PROXY_SAMPLE_RATE = float(os.environ.get('LOG_PROXY_SAMPLE_RATE', 1.0))  # 代理访问日志保留比例 / proxy access log sample rate
+    LOG_PROXY_RATE_LIMIT = int(os.environ.get('LOG_PROXY_RATE_LIMIT', 20))  # 每秒最多条数，0不限 / records per second, 0 = unlimited
     
     # 安全配置 / Security configuration
     PASSWORD_MIN_LENGTH = int(os.environ.get('PASSWORD_MIN_LENGTH', 12))
     SESSION_PROTECTION = 'strong'
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))  # 登录用户缓存秒数 / seconds a loaded user is cached
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))  # 登录用户缓存条目数 / cached users
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 密码哈希线程数 / password hashing threads
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))  # 同时进行的哈希任务上限 / max in-flight hashing tasks
+    LOGIN_IP_RATE = float(os.environ.get('LOGIN_IP_RATE', 0.2))  # 每IP每秒补充的登录次数 / login attempts refilled per second per IP
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 10))
+    LOGIN_USER_RATE = float(os.environ.get('LOGIN_USER_RATE', 0.05))  # 每（用户名, 客户端网段）每秒补充的失败次数 / failed logins refilled per second per (username, client subnet)
+    LOGIN_USER_BURST = int(os.environ.get('LOGIN_USER_BURST', 5))
+    USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', 20))  # 每批并发同步到FileBrowser的用户数 / users synced to FileBrowser per concurrent batch
+    USER_IMPORT_SYNC_WORKERS = int(os.environ.get('USER_IMPORT_SYNC_WORKERS', 4))  # 同步FileBrowser用户的线程数 / threads syncing users to FileBrowser
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = 3600  # 1小时 / 1 hour
     
@@ -66,11 +107,37 @@ class Config:
     # 资源监控配置 / Resource monitoring configuration
     MONITOR_INTERVAL = int(os.environ.get('MONITOR_INTERVAL', 2))  # 秒 / seconds
     MONITOR_ENABLED = os.environ.get('MONITOR_ENABLED', 'True').lower() == 'true'
+    MONITOR_HISTORY_SIZE = int(os.environ.get('MONITOR_HISTORY_SIZE', 300))  # 环形缓冲区样本数 / ring buffer samples
+    METRICS_HISTORY_FILE = os.environ.get('METRICS_HISTORY_FILE', 'metrics_history.bin')
+    METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 300))  # 秒 / seconds
+    
+    # SSE推送配置 / Server-Sent Events configuration
+    SSE_HEARTBEAT_INTERVAL = int(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15))  # 秒 / seconds
+    SSE_CLIENT_QUEUE_SIZE = int(os.environ.get('SSE_CLIENT_QUEUE_SIZE', 32))
+    SSE_MAX_CLIENTS = int(os.environ.get('SSE_MAX_CLIENTS', 50))
     
     # 应用商店配置 / App store configuration
     APP_STORE_CONFIG_FILE = os.environ.get('APP_STORE_CONFIG_FILE', 'apps.json')
     APP_STORE_ENABLED = os.environ.get('APP_STORE_ENABLED', 'True').lower() == 'true'
     
+    # 后台任务配置 / Background job configuration
+    JOB_MAX_WORKERS = int(os.environ.get('JOB_MAX_WORKERS', 2))
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 20))
+    JOB_HISTORY_LIMIT = int(os.environ.get('JOB_HISTORY_LIMIT', 100))
+    
+    # 镜像预拉取配置 / Image prefetch configuration
+    PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', 'False').lower() == 'true'
+    PREFETCH_WINDOW = os.environ.get('PREFETCH_WINDOW', '01:00-06:00')  # HH:MM-HH:MM，空表示全天 / empty means all day
+    PREFETCH_IDLE_SECONDS = int(os.environ.get('PREFETCH_IDLE_SECONDS', 300))  # 秒 / seconds
+    PREFETCH_INTERVAL = int(os.environ.get('PREFETCH_INTERVAL', 300))  # 秒 / seconds
+    
+    # 日志全文索引配置 / Log full-text index configuration
+    LOG_INDEX_ENABLED = os.environ.get('LOG_INDEX_ENABLED', 'False').lower() == 'true'
+    LOG_INDEX_FILE = os.environ.get('LOG_INDEX_FILE', 'log_index.db')
+    LOG_INDEX_INTERVAL = int(os.environ.get('LOG_INDEX_INTERVAL', 60))  # 秒 / seconds
+    LOG_INDEX_RETENTION_LINES = int(os.environ.get('LOG_INDEX_RETENTION_LINES', 100000))  # 每个容器 / per container
+    LOG_INDEX_RETENTION_DAYS = int(os.environ.get('LOG_INDEX_RETENTION_DAYS', 7))
+    
     # 备份配置 / Backup configuration
     BACKUP_ENABLED = os.environ.get('BACKUP_ENABLED', 'False').lower() == 'true'
     BACKUP_DIR = os.environ.get('BACKUP_DIR', './backups')
@@ -177,6 +244,7 @@ class DockerConfig(ProductionConfig):
     # Docker环境数据目录
     # Docker data directories
     DATABASE_PATH = '/app/data/users.db'
+    METRICS_HISTORY_FILE = '/app/data/metrics_history.bin'
     FILEBROWSER_DATA_DIR = '/app/data'
     FILEBROWSER_CONFIG_DIR = '/app/filebrowser/config'
     FILEBROWSER_DB_DIR = '/app/filebrowser/database'
@@ -241,16 +309,49 @@ def validate_config(config_obj):
     
     if not (1 <= config_obj.FILEBROWSER_PORT <= 65535):
         raise ValueError(f'Invalid FILEBROWSER_PORT: {config_obj.FILEBROWSER_PORT}')
+    if config_obj.PROXY_CHUNK_SIZE < 1024:
+        raise ValueError(f'Invalid PROXY_CHUNK_SIZE: {config_obj.PROXY_CHUNK_SIZE}')
+    if config_obj.FILEBROWSER_POOL_SIZE < 1:
+        raise ValueError(f'Invalid FILEBROWSER_POOL_SIZE: {config_obj.FILEBROWSER_POOL_SIZE}')
+    if config_obj.FILEBROWSER_CONNECT_TIMEOUT <= 0 or config_obj.FILEBROWSER_READ_TIMEOUT <= 0:
+        raise ValueError('FILEBROWSER_CONNECT_TIMEOUT and FILEBROWSER_READ_TIMEOUT must be positive')
+    if not (0 <= config_obj.BULK_CONTAINER_TIMEOUT <= config_obj.BULK_CONTAINER_TIMEOUT_MAX):
+        raise ValueError(f'BULK_CONTAINER_TIMEOUT must be between 0 and BULK_CONTAINER_TIMEOUT_MAX, got: {config_obj.BULK_CONTAINER_TIMEOUT}')
+    if config_obj.USER_IMPORT_SYNC_WORKERS < 1:
+        raise ValueError(f'Invalid USER_IMPORT_SYNC_WORKERS: {config_obj.USER_IMPORT_SYNC_WORKERS}')
+    if config_obj.ASSET_CACHE_MEMORY_MB < 1:
+        raise ValueError(f'Invalid ASSET_CACHE_MEMORY_MB: {config_obj.ASSET_CACHE_MEMORY_MB}')
     
     # 验证密码长度
     # Validate password length
     if config_obj.PASSWORD_MIN_LENGTH < 8:
         raise ValueError(f'PASSWORD_MIN_LENGTH must be at least 8, got: {config_obj.PASSWORD_MIN_LENGTH}')
     
+    # 验证容器统计后端
+    # Validate container stats backend
+    if config_obj.CONTAINER_STATS_BACKEND not in ('auto', 'cgroup', 'docker'):
+        raise ValueError(f'Invalid CONTAINER_STATS_BACKEND: {config_obj.CONTAINER_STATS_BACKEND}')
+    
+    # 验证日志配置
+    # Validate logging configuration
+    if config_obj.LOG_FORMAT not in ('json', 'text'):
+        raise ValueError(f'Invalid LOG_FORMAT: {config_obj.LOG_FORMAT}')
+    
+    if not (0 < config_obj.LOG_PROXY_SAMPLE_RATE <= 1):
+        raise ValueError(f'LOG_PROXY_SAMPLE_RATE must be in (0, 1], got: {config_obj.LOG_PROXY_SAMPLE_RATE}')
+    
+    # 验证预拉取时间窗口
+    # Validate prefetch idle window
+    if config_obj.PREFETCH_WINDOW and not re.fullmatch(r'\d{1,2}:\d{2}-\d{1,2}:\d{2}', config_obj.PREFETCH_WINDOW):
+        raise ValueError(f'Invalid PREFETCH_WINDOW: {config_obj.PREFETCH_WINDOW}')
+    
     # 验证监控间隔
     # Validate monitoring interval
     if config_obj.MONITOR_INTERVAL < 1:
         raise ValueError(f'MONITOR_INTERVAL must be at least 1 second, got: {config_obj.MONITOR_INTERVAL}')
+    
+    if config_obj.MONITOR_HISTORY_SIZE < 1:
+        raise ValueError(f'MONITOR_HISTORY_SIZE must be at least 1, got: {config_obj.MONITOR_HISTORY_SIZE}')
 
 
 # 导出配置 / Export configuration
@@ -0,0 +1,364 @@
+# =============================================================================
+# 文件名: container_logs.py
+# 功能:   容器日志的流式读取（支持跟随、时间范围、stdout/stderr 分离）
+# 说明:   按块读取 Docker 日志流并切分为行，逐行产出，内存占用与日志总量无关；
+#         同时读取 stdout 与 stderr 时分别打开两个流并按时间戳合并，
+#         跟随模式下由两个读取线程经有界队列合并；
+#         支持边读边 gzip 压缩导出，以及按时间游标分页；
+#         游标为 (微秒时间, 该微秒内已越过的行数)，同一微秒的多行在翻页时不会丢失或重复
+# =============================================================================
+
+import heapq
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
+
+from metrics_store import parse_duration
+
+
+# 日志流名称 / Log stream names
+STREAMS = ('stdout', 'stderr')
+
+
+def parse_time(value, now=None):
+    """
+    解析时间参数：Unix时间戳、ISO 8601 时间，或相对时长（如 10m 表示10分钟前）。
+    Parse a time parameter: a Unix timestamp, an ISO 8601 time, or a relative duration (10m means ten minutes ago).
+    Args:
+        value: 参数字符串，空值返回None
+        now: 当前时间（便于测试）
+    Returns:
+        float/None: Unix时间戳
+    Raises:
+        ValueError: 格式无效
+    """
+    if value in (None, ''):
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if value[-1:] in ('s', 'm', 'h', 'd'):
+        return (time.time() if now is None else now) - parse_duration(value)
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'Invalid time: {value}')
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_docker_timestamp(value):
+    """
+    解析 Docker 的 RFC3339Nano 时间戳为 Unix 时间（纳秒截断到微秒）。
+    Parse a Docker RFC3339Nano timestamp into Unix time, truncating nanoseconds to microseconds.
+    """
+    base, _, fraction = value.rstrip('Z').partition('.')
+    parsed = datetime.strptime(base, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+    return parsed.timestamp() + (float('0.' + fraction[:6]) if fraction else 0.0)
+
+
+def _micros(ts):
+    return round(ts * 1e6)
+
+
+def iter_positions(entries):
+    """
+    为日志条目标注位置 (微秒时间, 同一微秒内的序号)，无时间戳的行归入前一行所在的微秒。
+    Tag log entries with a position (microsecond time, index within that microsecond);
+    lines without a timestamp belong to the previous line's microsecond.
+    Docker 的 since/until 只精确到微秒，位置用于在同一微秒的多行之间续读
+    Docker's since/until only resolve microseconds, so positions let a reader resume between lines sharing one
+    Yields:
+        tuple: ((微秒, 序号), 条目)；跟随模式的心跳为 (None, None) / heartbeats in follow mode are (None, None)
+    """
+    last, index = None, 0
+    for entry in entries:
+        if entry is None:
+            yield None, None
+            continue
+        micros = _micros(entry['time']) if entry['time'] or last is None else last
+        index = index + 1 if micros == last else 0
+        last = micros
+        yield (micros, index), entry
+
+
+def format_cursor(position):
+    """
+    把位置格式化为分页游标 "<秒>.<微秒>:<序号>"。
+    Format a position as a page cursor "<seconds>.<microseconds>:<index>".
+    """
+    micros, index = position
+    return f'{micros // 1000000}.{micros % 1000000:06d}:{index}'
+
+
+def parse_cursor(value):
+    """
+    解析分页游标；只有时间戳时序号为 0，即该微秒的第一行之前。
+    Parse a page cursor; a bare timestamp has index 0, i.e. before the first line of that microsecond.
+    Returns:
+        tuple/None: (微秒, 序号)，空值为 None
+    Raises:
+        ValueError: 格式无效
+    """
+    if value in (None, ''):
+        return None
+    stamp, sep, index = str(value).partition(':')
+    try:
+        position = (_micros(float(stamp)), int(index) if sep else 0)
+    except ValueError:
+        raise ValueError(f'Invalid cursor: {value}')
+    if position[1] < 0:
+        raise ValueError(f'Invalid cursor: {value}')
+    return position
+
+
+def iter_lines(chunks, max_line=65536):
+    """
+    把字节块流切分为行；超长行按 max_line 截断输出，保证缓冲有界。
+    Split a stream of byte chunks into lines; overlong lines are emitted in max_line pieces so buffering stays bounded.
+    Yields:
+        bytes: 不含换行符的行
+    """
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        lines = pending.split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r')
+        while len(pending) >= max_line:
+            yield pending[:max_line]
+            pending = pending[max_line:]
+    if pending:
+        yield pending
+
+
+def parse_entries(chunks, stream):
+    """
+    把带时间戳的日志流解析为日志条目。
+    Parse a timestamped log stream into log entries.
+    Yields:
+        dict: {'stream', 'time', 'line'}
+    """
+    for raw in iter_lines(chunks):
+        text = raw.decode('utf-8', errors='replace')
+        stamp, sep, line = text.partition(' ')
+        try:
+            ts = parse_docker_timestamp(stamp) if sep else None
+        except ValueError:
+            ts = None
+        if ts is None:
+            ts, line = 0.0, text
+        yield {'stream': stream, 'time': ts, 'line': line}
+
+
+def open_log_stream(container, stream, follow=False, since=None, until=None, tail='all'):
+    """
+    打开单个 stdout 或 stderr 日志流（带时间戳）。
+    Open a single timestamped stdout or stderr log stream.
+    """
+    kwargs = {'stdout': stream == 'stdout', 'stderr': stream == 'stderr', 'stream': True,
+              'timestamps': True, 'follow': follow, 'tail': tail}
+    if since:
+        kwargs['since'] = since
+    if until:
+        kwargs['until'] = until
+    return container.logs(**kwargs)
+
+
+def _close(source):
+    if hasattr(source, 'close'):
+        try:
+            source.close()
+        except Exception:
+            pass
+
+
+def iter_container_logs(container, streams=STREAMS, follow=False, since=None, until=None, tail='all',
+                        idle_timeout=None, queue_size=256):
+    """
+    逐条产出容器日志。
+    Yield container log entries one at a time.
+    - 非跟随模式：按时间戳归并各流 / Without follow, streams are merged by timestamp
+    - 跟随模式：每个流一个读取线程，经有界队列按到达顺序合并 / With follow, one reader thread per stream feeds a bounded queue in arrival order
+    - tail 分别作用于每个流 / tail applies to each stream separately
+    Args:
+        container: docker 容器对象
+        streams: 要读取的流（stdout/stderr）
+        follow: 是否持续跟随新日志
+        since/until: 时间范围（Unix时间戳）
+        tail: 每个流的末尾行数或 'all'
+        idle_timeout: 跟随模式下空闲多少秒产出一次 None（用于心跳）
+        queue_size: 跟随模式合并队列长度
+    Yields:
+        dict/None: 日志条目 {'stream', 'time', 'line'}；跟随模式空闲时为 None
+    """
+    sources = [(name, open_log_stream(container, name, follow, since, until, tail)) for name in streams]
+    try:
+        if not follow:
+            entries = [parse_entries(source, name) for name, source in sources]
+            yield from heapq.merge(*entries, key=lambda entry: entry['time'])
+            return
+        yield from _follow(sources, idle_timeout, queue_size)
+    finally:
+        for _, source in sources:
+            _close(source)
+
+
+def _follow(sources, idle_timeout, queue_size):
+    lines = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def offer(item):
+        while not stop.is_set():
+            try:
+                lines.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader(name, source):
+        try:
+            for entry in parse_entries(source, name):
+                if not offer(entry):
+                    return
+        except Exception:
+            pass
+        finally:
+            offer(done)
+
+    for name, source in sources:
+        threading.Thread(target=reader, args=(name, source), name=f'logs-{name}', daemon=True).start()
+    remaining = len(sources)
+    try:
+        while remaining:
+            try:
+                entry = lines.get(timeout=idle_timeout)
+            except queue.Empty:
+                yield None
+                continue
+            if entry is done:
+                remaining -= 1
+            else:
+                yield entry
+    finally:
+        stop.set()
+        while True:
+            try:
+                lines.get_nowait()
+            except queue.Empty:
+                break
+
+
+def format_entry(entry):
+    """
+    把日志条目格式化为一行文本：ISO时间 流 内容。
+    Format a log entry as one text line: ISO time, stream, content.
+    """
+    stamp = datetime.fromtimestamp(entry['time'], timezone.utc).isoformat(timespec='microseconds')
+    return f"{stamp.replace('+00:00', 'Z')} {entry['stream']} {entry['line']}\n"
+
+
+def gzip_stream(lines, level=6):
+    """
+    边读边 gzip 压缩文本行，只在压缩器产出数据时输出。
+    Gzip-compress text lines on the fly, yielding only when the compressor emits data.
+    Args:
+        lines: 文本行迭代器
+        level: 压缩级别
+    Yields:
+        bytes: gzip 数据块
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for line in lines:
+        data = compressor.compress(line.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _created_time(container):
+    # 容器创建时间是日志的下界，未知时为 0 / The container's creation time bounds its logs from below; 0 when unknown
+    try:
+        return parse_docker_timestamp(container.attrs['Created'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def _read_older(container, streams, boundary, limit, floor, window):
+    # 从 boundary 向前按时间窗口读取，窗口逐次加倍，直到凑够 limit 行或到达 floor；
+    # 窗口边界按整微秒划分，until 多取一微秒再在本地按位置过滤，相邻窗口既不重叠也不遗漏
+    # Read backwards from boundary one time window at a time, doubling the window until limit lines are found or floor
+    # is reached; windows split on whole microseconds and until reaches one microsecond further before filtering by
+    # position locally, so adjacent windows neither overlap nor leave gaps
+    slices, found, high = [], 0, boundary[0]
+    window = round(window * 1e6)
+    while found < limit and high >= floor:
+        low = max(high - window, floor)
+        source = iter_container_logs(container, streams, since=low / 1e6, until=(high + 1) / 1e6)
+        rows = deque(((position, entry) for position, entry in iter_positions(source)
+                      if low <= position[0] <= high and position < boundary), maxlen=limit - found)
+        slices.append(rows)
+        found += len(rows)
+        high = low - 1
+        window *= 2
+    return [row for rows in reversed(slices) for row in rows]
+
+
+def read_page(container, streams=STREAMS, cursor=None, limit=200, direction='older', since=None, until=None, window=60):
+    """
+    按时间游标读取一页日志。
+    Read one page of logs by time cursor.
+    - 游标是日志中的一个位置 (微秒时间, 该微秒内位于游标之前的行数)，格式见 format_cursor
+      A cursor is a position in the log (microsecond time, lines of that microsecond before it), formatted by format_cursor
+    - older: 游标之前的最近 limit 行；Docker 先取 tail 再按 until 过滤，故从游标向前按时间窗口读取，
+      窗口逐次加倍直到凑够 limit 行，每页只读游标附近的日志而不是从头读起
+      The limit lines before the cursor; Docker applies tail before until, so time windows ending at the cursor are read,
+      doubling until limit lines are found, and a page only reads logs near the cursor instead of the whole log
+    - newer: 游标之后的 limit 行，读够即关闭流 / The limit lines after the cursor; the stream is closed once enough are read
+    Args:
+        container: docker 容器对象
+        streams: 要读取的流
+        cursor: 上一页返回的游标，None 表示最新（older）或最早（newer）
+        limit: 每页行数
+        direction: older 或 newer
+        since/until: 总体时间范围
+        window: older 方向第一个时间窗口的长度(秒)
+    Returns:
+        dict: {'entries': [...], 'older': 更早一页的游标, 'newer': 更新一页的游标}
+    Raises:
+        ValueError: 游标格式无效
+    """
+    position = parse_cursor(cursor)
+    if direction == 'older':
+        boundary = position or (_micros(time.time()) + 1, 0)
+        if until is not None:
+            boundary = min(boundary, (_micros(until) + 1, 0))
+        floor = _micros(since if since is not None else _created_time(container))
+        rows = _read_older(container, streams, boundary, limit, floor, window)
+    else:
+        boundary = position or (0, 0)
+        if since is not None:
+            boundary = max(boundary, (_micros(since), 0))
+        source = iter_container_logs(container, streams, since=boundary[0] / 1e6, until=until)
+        try:
+            rows = list(islice(((p, entry) for p, entry in iter_positions(source) if p >= boundary), limit))
+        finally:
+            source.close()
+    if not rows:
+        return {'entries': [], 'older': cursor, 'newer': cursor}
+    last_micros, last_index = rows[-1][0]
+    return {
+        'entries': [entry for _, entry in rows],
+        'older': format_cursor(rows[0][0]),
+        'newer': format_cursor((last_micros, last_index + 1))
+    }
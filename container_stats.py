@@ -0,0 +1,197 @@
+# =============================================================================
+# 文件名: container_stats.py
+# 功能:   并发的容器资源统计采集器
+# 说明:   每个运行中的容器维持一个 Docker stats 流式订阅，增量计算 CPU% 与内存变化；
+#         订阅随容器启动/停止事件自动增减，一次调用即可返回全部容器的最新统计；
+#         统计流异常中断而容器仍在运行时，按有上限的指数退避重新订阅
+# =============================================================================
+
+import threading
+import time
+
+
+# 触发订阅/取消订阅的容器事件 / Container events that add or drop a subscription
+START_ACTIONS = {'start', 'restart', 'unpause'}
+STOP_ACTIONS = {'die', 'stop', 'kill', 'pause', 'destroy'}
+
+
+def compute_stats(raw, previous=None):
+    """
+    根据 Docker stats 原始数据计算 CPU%、内存、网络与块设备 I/O。
+    Compute CPU%, memory, network and block I/O from a raw Docker stats sample.
+    Args:
+        raw: Docker stats API 返回的一条数据
+        previous: 上一次计算结果，用于内存增量
+    Returns:
+        dict: 统计结果
+    """
+    cpu_stats = raw.get('cpu_stats') or {}
+    precpu = raw.get('precpu_stats') or {}
+    cpu_total = (cpu_stats.get('cpu_usage') or {}).get('total_usage', 0)
+    pre_total = (precpu.get('cpu_usage') or {}).get('total_usage', 0)
+    system = cpu_stats.get('system_cpu_usage', 0)
+    pre_system = precpu.get('system_cpu_usage', 0)
+    online = cpu_stats.get('online_cpus') or len((cpu_stats.get('cpu_usage') or {}).get('percpu_usage') or []) or 1
+    cpu_delta = cpu_total - pre_total
+    system_delta = system - pre_system
+    cpu_percent = cpu_delta / system_delta * online * 100.0 if cpu_delta > 0 and system_delta > 0 else 0.0
+
+    memory = raw.get('memory_stats') or {}
+    mem_detail = memory.get('stats') or {}
+    # cgroup v2 使用 inactive_file，v1 使用 cache / cgroup v2 reports inactive_file, v1 reports cache
+    mem_cache = mem_detail.get('inactive_file', mem_detail.get('cache', 0))
+    mem_usage = max(0, memory.get('usage', 0) - mem_cache)
+    mem_limit = memory.get('limit', 0)
+
+    rx = tx = 0
+    for iface in (raw.get('networks') or {}).values():
+        rx += iface.get('rx_bytes', 0)
+        tx += iface.get('tx_bytes', 0)
+    blk_read = blk_write = 0
+    for entry in (raw.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = entry.get('op', '').lower()
+        if op == 'read':
+            blk_read += entry.get('value', 0)
+        elif op == 'write':
+            blk_write += entry.get('value', 0)
+
+    return {
+        'cpu_percent': round(cpu_percent, 2),
+        'mem_usage': mem_usage,
+        'mem_limit': mem_limit,
+        'mem_percent': round(mem_usage * 100.0 / mem_limit, 2) if mem_limit else 0.0,
+        'mem_delta': mem_usage - previous['mem_usage'] if previous else 0,
+        'net_rx': rx,
+        'net_tx': tx,
+        'blk_read': blk_read,
+        'blk_write': blk_write,
+        'pids': (raw.get('pids_stats') or {}).get('current', 0),
+        'timestamp': time.time()
+    }
+
+
+class ContainerStatsCollector:
+    """
+    容器统计采集器。
+    Container stats collector.
+    - 每个运行中的容器一个守护线程读取 stats 流 / One daemon thread per running container reads its stats stream
+    - 通过 DockerStateCache 回调感知容器启动/停止 / Follows container start/stop through DockerStateCache callbacks
+    - 流中断时只要容器仍在运行就退避重连 / Reconnects with backoff when a stream drops while the container still runs
+    """
+
+    def __init__(self, app, client, docker_state, retry_initial=1.0, retry_max=30.0):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            client: Docker客户端实例
+            docker_state: DockerStateCache 实例
+            retry_initial: 统计流中断后首次重连前的等待(秒)
+            retry_max: 重连等待的上限(秒)，每次失败翻倍直至该值
+        """
+        self.app = app
+        self.client = client
+        self.docker_state = docker_state
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._stats = {}
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        注册容器事件回调并为当前运行中的容器建立订阅。
+        Register for container events and subscribe to the currently running containers.
+        """
+        self.docker_state.add_listener(self._on_container_event)
+        self.reconcile()
+
+    def snapshot(self):
+        """
+        获取所有已订阅容器的最新统计。
+        Get the latest stats of every subscribed container.
+        Returns:
+            dict: {容器ID: 统计结果}
+        """
+        with self._lock:
+            return {cid: dict(stats) for cid, stats in self._stats.items()}
+
+    def reconcile(self):
+        """
+        与运行中的容器集合对齐订阅。
+        Align subscriptions with the set of running containers.
+        """
+        running = {c.id: c.name for c in self.docker_state.containers() if c.status == 'running'}
+        with self._lock:
+            current = set(self._subscriptions)
+        for cid in current - set(running):
+            self.unsubscribe(cid)
+        for cid, name in running.items():
+            if cid not in current:
+                self.subscribe(cid, name)
+
+    def subscribe(self, cid, name=None):
+        """
+        为容器建立 stats 流式订阅（已存在则忽略）。
+        Open a streaming stats subscription for a container (no-op if one exists).
+        """
+        with self._lock:
+            if cid in self._subscriptions:
+                return
+            stop = threading.Event()
+            self._subscriptions[cid] = stop
+        thread = threading.Thread(target=self._follow, args=(cid, name, stop), name=f'stats-{cid[:12]}', daemon=True)
+        thread.start()
+
+    def unsubscribe(self, cid):
+        """
+        取消容器订阅并清除其统计；线程在下一条数据到达时退出。
+        Drop a container subscription and its stats; the thread exits on its next sample.
+        """
+        with self._lock:
+            stop = self._subscriptions.pop(cid, None)
+            self._stats.pop(cid, None)
+        if stop:
+            stop.set()
+
+    def _on_container_event(self, action, cid, container):
+        if action == 'resync':
+            self.reconcile()
+        elif action in START_ACTIONS and container is not None and container.status == 'running':
+            self.subscribe(cid, container.name)
+        elif action in STOP_ACTIONS:
+            self.unsubscribe(cid)
+
+    def _is_running(self, cid):
+        return any(c.id == cid and c.status == 'running' for c in self.docker_state.containers())
+
+    def _follow(self, cid, name, stop):
+        previous = None
+        delay = self.retry_initial
+        try:
+            while not stop.is_set():
+                try:
+                    for raw in self.client.api.stats(cid, stream=True, decode=True):
+                        if stop.is_set():
+                            break
+                        stats = compute_stats(raw, previous)
+                        stats['name'] = name or raw.get('name', '').lstrip('/')
+                        previous = stats
+                        delay = self.retry_initial
+                        with self._lock:
+                            if self._subscriptions.get(cid) is stop:
+                                self._stats[cid] = stats
+                except Exception as e:
+                    if not stop.is_set():
+                        self.app.logger.warning(f'容器 {cid[:12]} 统计流中断 / Stats stream for container {cid[:12]} ended: {e}')
+                # 容器已不在运行集合中则结束，否则退避后重新订阅
+                # Give up once the container has left the running set, otherwise resubscribe after a backoff
+                if stop.is_set() or not self._is_running(cid):
+                    break
+                if stop.wait(delay):
+                    break
+                delay = min(delay * 2, self.retry_max)
+        finally:
+            with self._lock:
+                if self._subscriptions.get(cid) is stop:
+                    self._subscriptions.pop(cid, None)
+                    self._stats.pop(cid, None)
@@ -0,0 +1,234 @@
+# =============================================================================
+# 文件名: docker_state.py
+# 功能:   Docker 容器/镜像状态的内存缓存（事件驱动）
+# 说明:   启动时全量拉取一次容器与镜像列表，之后通过 client.events() 增量更新；
+#         事件流断开时标记为过期并在重连后强制全量同步
+# =============================================================================
+
+import threading
+import time
+
+import docker
+
+
+# 需要刷新单个容器状态的事件 / Container events that require refreshing a single container
+CONTAINER_REFRESH_ACTIONS = {
+    'create', 'start', 'restart', 'stop', 'die', 'kill', 'pause', 'unpause',
+    'rename', 'update', 'oom', 'health_status'
+}
+
+
+class DockerStateCache:
+    """
+    Docker 状态缓存。
+    Docker state cache.
+    - 全量同步后由事件流增量维护 / Seeded once, then maintained from the event stream
+    - version 每次状态变化自增 / version is incremented on every state change
+    - 事件流断开时读取方会触发同步刷新 / Readers trigger a synchronous resync while the stream is down
+    """
+
+    def __init__(self, app, client, resync_interval=300, min_resync_gap=5):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            client: Docker客户端实例
+            resync_interval: 定期强制全量同步间隔(秒)，0 表示关闭
+            min_resync_gap: 两次按需同步之间的最小间隔(秒)
+        """
+        self.app = app
+        self.client = client
+        self.resync_interval = resync_interval
+        self.min_resync_gap = min_resync_gap
+        self.version = 0
+        self._lock = threading.RLock()
+        self._containers = {}
+        self._images = []
+        self._images_dirty = True
+        self._stale = True
+        self._last_resync = 0
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._events = None
+
+    # ---------------- 生命周期 / Lifecycle ----------------
+    def start(self):
+        """
+        启动后台事件监听线程。
+        Start the background event listener thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='docker-state', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止事件监听线程。
+        Stop the event listener thread.
+        """
+        self._stop.set()
+        events = self._events
+        if events is not None:
+            try:
+                events.close()
+            except Exception:
+                pass
+
+    # ---------------- 读取接口 / Read API ----------------
+    def containers(self):
+        """
+        获取所有容器（包括已停止的），按创建时间倒序。
+        Get all containers (including stopped ones), newest first.
+        Returns:
+            list: docker Container 对象列表
+        """
+        self._ensure_fresh()
+        with self._lock:
+            items = list(self._containers.values())
+        items.sort(key=lambda c: c.attrs.get('Created', ''), reverse=True)
+        return items
+
+    def container_names(self):
+        """
+        获取所有容器名称（小写）。
+        Get lower-cased names of all containers.
+        Returns:
+            set: 容器名称集合
+        """
+        return {c.name.lower() for c in self.containers()}
+
+    def images(self):
+        """
+        获取所有镜像；镜像事件到达后在下一次读取时重新加载。
+        Get all images; reloaded lazily on the next read after an image event.
+        Returns:
+            list: docker Image 对象列表
+        """
+        self._ensure_fresh()
+        with self._lock:
+            dirty = self._images_dirty
+        if dirty:
+            self._reload_images()
+        with self._lock:
+            return list(self._images)
+
+    def add_listener(self, callback):
+        """
+        注册状态变化回调，参数为 (action, container_id, container)。
+        Register a state change callback receiving (action, container_id, container).
+        resync 时 container_id 为 None / container_id is None for a resync.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def force_resync(self):
+        """
+        立即全量同步容器与镜像。
+        Immediately resync containers and images from the daemon.
+        """
+        containers = self.client.containers.list(all=True)
+        images = self.client.images.list()
+        with self._lock:
+            self._containers = {c.id: c for c in containers}
+            self._images = images
+            self._images_dirty = False
+            self._last_resync = time.time()
+            self.version += 1
+        self._notify('resync', None, None)
+
+    # ---------------- 内部实现 / Internals ----------------
+    def _ensure_fresh(self):
+        with self._lock:
+            stale = self._stale and time.time() - self._last_resync >= self.min_resync_gap
+        if stale:
+            try:
+                self.force_resync()
+            except Exception as e:
+                self.app.logger.error(f'Docker状态同步失败 / Docker state resync failed: {e}')
+
+    def _reload_images(self):
+        try:
+            images = self.client.images.list()
+        except Exception as e:
+            self.app.logger.error(f'刷新镜像列表失败 / Failed to reload images: {e}')
+            return
+        with self._lock:
+            self._images = images
+            self._images_dirty = False
+            self.version += 1
+
+    def _notify(self, action, cid, container):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(action, cid, container)
+            except Exception as e:
+                self.app.logger.error(f'Docker状态回调失败 / Docker state listener failed: {e}')
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                # 先记录时间再同步，事件从该时间点回放，避免同步期间遗漏
+                # Record the timestamp before seeding so replayed events cover the gap
+                since = int(time.time())
+                self.force_resync()
+                # 设置 until 使事件流定期结束，从而定期全量同步兜底
+                # Bounding the stream with `until` forces a periodic full resync
+                until = since + self.resync_interval if self.resync_interval else None
+                self._events = self.client.events(since=since, until=until, decode=True)
+                with self._lock:
+                    self._stale = False
+                backoff = 1
+                for event in self._events:
+                    if self._stop.is_set():
+                        break
+                    self._handle_event(event)
+                continue
+            except Exception as e:
+                self.app.logger.warning(f'Docker事件流中断 / Docker event stream dropped: {e}')
+                with self._lock:
+                    self._stale = True
+                backoff = min(backoff * 2, 30)
+            finally:
+                events, self._events = self._events, None
+                if events is not None:
+                    try:
+                        events.close()
+                    except Exception:
+                        pass
+            self._stop.wait(backoff)
+
+    def _handle_event(self, event):
+        etype = event.get('Type')
+        action = event.get('Action', '').split(':', 1)[0]
+        if etype == 'image':
+            with self._lock:
+                self._images_dirty = True
+                self.version += 1
+            return
+        if etype != 'container':
+            return
+        cid = event.get('id') or event.get('Actor', {}).get('ID')
+        if not cid:
+            return
+        if action == 'destroy':
+            with self._lock:
+                self._containers.pop(cid, None)
+                self.version += 1
+            self._notify(action, cid, None)
+        elif action in CONTAINER_REFRESH_ACTIONS:
+            try:
+                container = self.client.containers.get(cid)
+            except docker.errors.NotFound:
+                container = None
+            with self._lock:
+                if container is None:
+                    self._containers.pop(cid, None)
+                else:
+                    self._containers[cid] = container
+                self.version += 1
+            self._notify(action, cid, container)
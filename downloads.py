@@ -0,0 +1,204 @@
+# =============================================================================
+# 文件名: downloads.py
+# 功能:   数据目录文件的直接下载：路径限定、Range/If-Range 解析与分段读取
+# 说明:   文件直接从 FILEBROWSER_DATA_DIR 读取，不经过 FileBrowser 与反向代理；
+#         路径限定在用户的 FileBrowser scope 内（解析符号链接后再检查）；
+#         到文件末尾的区间交给 WSGI 服务器的 file_wrapper（服务器实现了 sendfile 时才免去复制），
+#         多段 Range 生成 multipart/byteranges
+# =============================================================================
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+
+# 单个请求最多接受的区间数，超出时按完整文件返回 / Max ranges per request; more than this serves the whole file
+MAX_RANGES = 16
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class OutsideScope(ValueError):
+    """
+    请求的路径不在用户 scope 内。
+    The requested path is outside the user's scope.
+    """
+
+
+class RangeNotSatisfiable(ValueError):
+    """
+    Range 中没有可满足的区间。
+    None of the requested ranges can be satisfied.
+    """
+
+
+def _inside(root, path):
+    return os.path.commonpath([root, path]) == root
+
+
+def scope_root(data_dir, scope):
+    """
+    计算用户 scope 对应的本地目录（FileBrowser 的 scope 相对于数据目录根）。
+    Resolve the local directory for a user's scope; FileBrowser scopes are relative to the data root.
+    Args:
+        data_dir: 数据目录
+        scope: FileBrowser 用户 scope，如 '/' 或 '/alice'
+    Returns:
+        str: 解析后的绝对路径
+    Raises:
+        OutsideScope: scope 越出数据目录
+    """
+    data_dir = os.path.realpath(data_dir)
+    root = os.path.realpath(os.path.join(data_dir, (scope or '/').strip('/')))
+    if not _inside(data_dir, root):
+        raise OutsideScope(scope)
+    return root
+
+
+def resolve_download(root, relpath):
+    """
+    解析要下载的文件路径。
+    Resolve the file to download.
+    Args:
+        root: scope_root 的结果
+        relpath: 相对于 scope 的路径
+    Returns:
+        str: 文件的真实路径
+    Raises:
+        OutsideScope: 路径（含符号链接目标）越出 scope
+        FileNotFoundError: 文件不存在或不是普通文件
+    """
+    path = os.path.realpath(os.path.join(root, relpath.lstrip('/')))
+    if not _inside(root, path):
+        raise OutsideScope(relpath)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(relpath)
+    return path
+
+
+def file_validators(st):
+    """
+    由文件状态生成 ETag 与 Last-Modified。
+    Build the ETag and Last-Modified validators from a file's stat result.
+    Returns:
+        tuple: (强 ETag, Last-Modified 字符串)
+    """
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"', formatdate(st.st_mtime, usegmt=True)
+
+
+def parse_ranges(header, size):
+    """
+    解析 Range 头，合并重叠区间。
+    Parse a Range header, merging overlapping ranges.
+    Args:
+        header: Range 头，如 'bytes=0-99,200-,-500'
+        size: 文件大小
+    Returns:
+        list/None: [(start, end)]（end 含），None 表示忽略 Range、返回完整文件
+    Raises:
+        RangeNotSatisfiable: 语法正确但没有可满足的区间
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
+    ranges = []
+    for item in spec.split(','):
+        first, sep, last = item.strip().partition('-')
+        first, last = first.strip(), last.strip()
+        if not sep or not (first.isdigit() or last.isdigit()) or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+        if not first:
+            # 后缀区间：最后 N 个字节 / Suffix range: the last N bytes
+            length = int(last)
+            if length:
+                ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = int(last) if last else size - 1
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+    if len(ranges) > MAX_RANGES:
+        return None
+    if not ranges or size == 0:
+        raise RangeNotSatisfiable(header)
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_matches(header, etag, mtime):
+    """
+    判断 If-Range 是否仍然有效（ETag 强比较，或日期与最后修改时间一致）。
+    Check whether If-Range still holds: a strong ETag match, or a date equal to the modification time.
+    Args:
+        header: If-Range 头，缺省时视为有效
+        etag: 当前强 ETag
+        mtime: 文件修改时间（秒）
+    """
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith('"') or header.startswith('W/'):
+        return header == etag
+    try:
+        return int(parsedate_to_datetime(header).timestamp()) == int(mtime)
+    except (TypeError, ValueError):
+        return False
+
+
+def iter_file_range(path, start, length, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    按块读取文件的一个区间。
+    Read one range of a file chunk by chunk.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _part_header(boundary, content_type, start, end, size):
+    return (f'\r\n--{boundary}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n').encode()
+
+
+def multipart_length(ranges, size, content_type, boundary):
+    """
+    计算 multipart/byteranges 响应体的长度。
+    Compute the length of a multipart/byteranges body.
+    """
+    total = len(f'\r\n--{boundary}--\r\n')
+    for start, end in ranges:
+        total += len(_part_header(boundary, content_type, start, end, size)) + end - start + 1
+    return total
+
+
+def iter_multipart(path, ranges, size, content_type, boundary, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    生成 multipart/byteranges 响应体。
+    Generate a multipart/byteranges body.
+    """
+    with open(path, 'rb') as f:
+        for start, end in ranges:
+            yield _part_header(boundary, content_type, start, end, size)
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    yield f'\r\n--{boundary}--\r\n'.encode()
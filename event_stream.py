@@ -0,0 +1,156 @@
+# =============================================================================
+# 文件名: event_stream.py
+# 功能:   Server-Sent Events 单生产者多订阅者广播
+# 说明:   每个事件只序列化一次后分发给所有订阅者；
+#         每个订阅者有独立的有界队列（背压），慢客户端丢弃最旧事件，
+#         持续积压的客户端被断开；空闲时发送心跳；
+#         带 owner 的事件只发给该用户与管理员的订阅
+# =============================================================================
+
+import json
+import queue
+import threading
+
+
+class Subscriber:
+    """
+    SSE 订阅者，持有一个有界事件队列。
+    SSE subscriber holding a bounded event queue.
+    """
+
+    def __init__(self, maxsize, user_id=None, is_admin=False):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, message, max_dropped):
+        """
+        非阻塞投递；队列满时丢弃最旧的事件，连续多次满队列则关闭订阅。
+        Non-blocking delivery; drops the oldest event when full and closes after too many consecutive overflows.
+        Returns:
+            bool: 订阅是否仍然有效
+        """
+        try:
+            self.queue.put_nowait(message)
+            self.dropped = 0
+            return True
+        except queue.Full:
+            pass
+        # 队列已满说明客户端未及时消费 / A full queue means the client is not keeping up
+        self.dropped += 1
+        if self.dropped > max_dropped:
+            self.closed = True
+            return False
+        try:
+            self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            pass
+        return True
+
+
+class EventBroadcaster:
+    """
+    SSE 广播器。
+    SSE broadcaster.
+    - publish() 由唯一的生产者调用，开销与订阅者数量无关（除入队外）
+    - publish() is called by the single producer; serialisation cost does not grow with subscribers
+    """
+
+    def __init__(self, queue_size=32, heartbeat_interval=15, max_clients=50, max_dropped=None):
+        """
+        Args:
+            queue_size: 每个订阅者的队列长度
+            heartbeat_interval: 心跳间隔(秒)
+            max_clients: 最大订阅者数量
+            max_dropped: 连续丢弃多少条后断开慢客户端，默认等于 queue_size
+        """
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        self.max_clients = max_clients
+        self.max_dropped = queue_size if max_dropped is None else max_dropped
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    @staticmethod
+    def format_event(event, data):
+        """
+        格式化为 SSE 报文。
+        Format an SSE message.
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        return f'event: {event}\ndata: {payload}\n\n'
+
+    def subscribe(self, user_id=None, is_admin=False):
+        """
+        新增订阅者。
+        Add a subscriber.
+        Args:
+            user_id: 订阅用户ID，用于过滤带 owner 的事件
+            is_admin: 是否管理员（接收所有事件）
+        Returns:
+            Subscriber/None: 超过最大连接数时返回None
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber = Subscriber(self.queue_size, user_id, is_admin)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        """
+        移除订阅者。
+        Remove a subscriber.
+        """
+        subscriber.closed = True
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data, owner=None):
+        """
+        向所有订阅者广播一个事件。
+        Broadcast an event to all subscribers.
+        Args:
+            event: 事件名
+            data: 事件数据
+            owner: 事件所属用户ID；指定时只发给该用户与管理员
+        """
+        message = self.format_event(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if owner is not None:
+            subscribers = [s for s in subscribers if s.is_admin or s.user_id == owner]
+        for subscriber in subscribers:
+            if not subscriber.offer(message, self.max_dropped):
+                self.unsubscribe(subscriber)
+
+    def stream(self, subscriber, initial=()):
+        """
+        生成指定订阅者的 SSE 报文流，空闲时输出心跳注释。
+        Yield the SSE stream for a subscriber, emitting heartbeat comments while idle.
+        Args:
+            subscriber: subscribe() 返回的订阅者
+            initial: 连接建立后立即发送的 (event, data) 列表
+        """
+        try:
+            yield f'retry: {int(self.heartbeat_interval * 1000)}\n\n'
+            for event, data in initial:
+                yield self.format_event(event, data)
+            while not subscriber.closed:
+                try:
+                    yield subscriber.queue.get(timeout=self.heartbeat_interval)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,310 @@
+# =============================================================================
+# 文件名: image_pull.py
+# 功能:   解析 Docker 拉取流，计算按字节的真实拉取进度；合并并发的相同镜像拉取
+# 说明:   按层累计 progressDetail 的 current/total，已存在的层不计入；
+#         汇总已下载字节、总字节、速率与预计剩余时间；
+#         相同镜像（按规范化引用，带 @摘要 的引用按摘要）同时只拉取一次，并发请求者共享进度与结果
+# =============================================================================
+
+import threading
+import time
+
+
+class PullProgress:
+    """
+    Docker 拉取进度聚合器。
+    Docker pull progress aggregator.
+    - 下载阶段计入 downloaded，解压阶段计入 extracted / Download bytes go to downloaded, extraction bytes to extracted
+    - 'Already exists' 的层被排除 / Layers reported as 'Already exists' are excluded
+    """
+
+    def __init__(self, clock=time.monotonic, smoothing=0.3):
+        """
+        Args:
+            clock: 单调时钟函数（便于测试）
+            smoothing: 速率指数平滑系数
+        """
+        self.clock = clock
+        self.smoothing = smoothing
+        self.layers = {}
+        self.existing = set()
+        self.digest = None
+        self.status = ''
+        self.rate = 0.0
+        self._last_time = None
+        self._last_bytes = 0
+
+    def feed(self, line):
+        """
+        处理拉取流中的一条消息。
+        Process one message from the pull stream.
+        Args:
+            line: client.api.pull(..., decode=True) 产生的字典
+        Raises:
+            RuntimeError: 消息中包含错误
+        """
+        if 'error' in line:
+            raise RuntimeError(line.get('error') or line.get('errorDetail', {}).get('message', 'pull failed'))
+        status = line.get('status', '')
+        layer_id = line.get('id')
+        if status.startswith('Digest:'):
+            self.digest = status.split(':', 1)[1].strip()
+            return
+        if not layer_id or status.startswith('Pulling from'):
+            self.status = status or self.status
+            return
+        if status == 'Already exists':
+            self.existing.add(layer_id)
+            self.layers.pop(layer_id, None)
+            return
+        layer = self.layers.setdefault(layer_id, {'total': 0, 'downloaded': 0, 'extracted': 0, 'status': ''})
+        layer['status'] = status
+        detail = line.get('progressDetail') or {}
+        if status == 'Downloading':
+            layer['total'] = detail.get('total') or layer['total']
+            layer['downloaded'] = detail.get('current', layer['downloaded'])
+        elif status in ('Download complete', 'Verifying Checksum'):
+            layer['downloaded'] = layer['total']
+        elif status == 'Extracting':
+            layer['total'] = layer['total'] or detail.get('total', 0)
+            layer['downloaded'] = layer['total']
+            layer['extracted'] = detail.get('current', layer['extracted'])
+        elif status == 'Pull complete':
+            layer['downloaded'] = layer['extracted'] = layer['total']
+        self._update_rate()
+
+    @property
+    def total_bytes(self):
+        return sum(layer['total'] for layer in self.layers.values())
+
+    @property
+    def downloaded_bytes(self):
+        return sum(min(layer['downloaded'], layer['total']) for layer in self.layers.values())
+
+    @property
+    def extracted_bytes(self):
+        return sum(min(layer['extracted'], layer['total']) for layer in self.layers.values())
+
+    @property
+    def complete(self):
+        return bool(self.layers) and all(layer['status'] == 'Pull complete' for layer in self.layers.values())
+
+    def fraction(self):
+        """
+        拉取完成比例：下载与解压各占一半；尚无层信息时为0。
+        Completion fraction, weighting download and extraction equally; 0 before any layer is known.
+        """
+        if self.complete:
+            return 1.0
+        total = self.total_bytes
+        if not total:
+            return 0.0
+        return (self.downloaded_bytes + self.extracted_bytes) / (2.0 * total)
+
+    def eta(self):
+        """
+        预计剩余下载时间(秒)，速率未知时为None。
+        Estimated remaining download time in seconds, None while the rate is unknown.
+        """
+        remaining = self.total_bytes - self.downloaded_bytes
+        if remaining <= 0:
+            return 0
+        if self.rate <= 0:
+            return None
+        return int(remaining / self.rate)
+
+    def to_dict(self):
+        """
+        汇总信息。
+        Summary suitable for job details.
+        """
+        return {
+            'total_bytes': self.total_bytes,
+            'downloaded_bytes': self.downloaded_bytes,
+            'extracted_bytes': self.extracted_bytes,
+            'layers': len(self.layers),
+            'layers_existing': len(self.existing),
+            'rate': int(self.rate),
+            'eta': self.eta(),
+            'digest': self.digest
+        }
+
+    def _update_rate(self):
+        now = self.clock()
+        downloaded = self.downloaded_bytes
+        if self._last_time is None:
+            self._last_time, self._last_bytes = now, downloaded
+            return
+        elapsed = now - self._last_time
+        if elapsed < 0.5:
+            return
+        instant = max(0, downloaded - self._last_bytes) / elapsed
+        self.rate = instant if self.rate <= 0 else self.smoothing * instant + (1 - self.smoothing) * self.rate
+        self._last_time, self._last_bytes = now, downloaded
+
+
+def split_reference(image):
+    """
+    将镜像引用规范化并拆分为 (仓库, 标签, 摘要)。
+    Normalise an image reference and split it into (repository, tag, digest).
+    'nginx' 与 'docker.io/library/nginx:latest' 得到相同结果。
+    'nginx' and 'docker.io/library/nginx:latest' yield the same result.
+    """
+    name, _, digest = image.strip().partition('@')
+    tag = None
+    slash = name.rfind('/')
+    colon = name.rfind(':')
+    if colon > slash:
+        name, tag = name[:colon], name[colon + 1:]
+    parts = name.split('/')
+    if len(parts) == 1 or ('.' not in parts[0] and ':' not in parts[0] and parts[0] != 'localhost'):
+        parts.insert(0, 'docker.io')
+    if parts[0] == 'docker.io' and len(parts) == 2:
+        parts.insert(1, 'library')
+    if not tag and not digest:
+        tag = 'latest'
+    return '/'.join(parts).lower(), tag, digest or None
+
+
+def normalize_reference(image):
+    """
+    规范化镜像引用，作为拉取合并的键。
+    Normalise an image reference for use as the coalescing key.
+    """
+    repository, tag, digest = split_reference(image)
+    if digest:
+        return f'{repository}@{digest}'
+    return f'{repository}:{tag}'
+
+
+class PullFlight:
+    """
+    一次进行中的拉取，由多个请求者共享。
+    One in-flight pull shared by several requesters.
+    """
+
+    def __init__(self, image, key):
+        self.image = image
+        self.key = key
+        self.progress = PullProgress()
+        self.subscribers = []
+        self.error = None
+        self.done = threading.Event()
+        self.aborted = threading.Event()
+
+
+class PullCoordinator:
+    """
+    单飞拉取协调器：相同镜像（按规范化引用）同时只拉取一次，
+    并发请求者挂到进行中的拉取上，共享进度与最终结果。
+    Single-flight pull coordinator: an image (keyed by normalised reference) is pulled
+    at most once at a time; concurrent requesters attach to the in-flight pull and
+    share its progress and final result.
+    - 所有请求者都取消后才中止拉取 / The pull is aborted only once every requester has cancelled
+    """
+
+    def __init__(self, app, stream_factory, min_interval=0.5):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            stream_factory: 函数 image -> 拉取流（如 client.api.pull(image, stream=True, decode=True)）
+            min_interval: 两次进度推送的最小间隔(秒)
+        """
+        self.app = app
+        self.stream_factory = stream_factory
+        self.min_interval = min_interval
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def pull(self, image, on_progress=None, check_cancelled=None, poll_interval=0.5):
+        """
+        拉取镜像；如已有相同镜像在拉取则挂接到该拉取。
+        Pull an image, attaching to an in-flight pull of the same image if there is one.
+        Args:
+            image: 镜像引用
+            on_progress: 进度回调，参数为 PullProgress
+            check_cancelled: 取消检查函数，取消时应抛出异常
+            poll_interval: 等待期间的取消检查间隔(秒)
+        Returns:
+            dict: 最终进度汇总（PullProgress.to_dict()），附加 shared 表示是否复用了进行中的拉取
+        Raises:
+            RuntimeError: 拉取失败
+        """
+        key = normalize_reference(image)
+        subscriber = on_progress or (lambda progress: None)
+        with self._lock:
+            flight = self._flights.get(key)
+            shared = flight is not None and not flight.aborted.is_set()
+            if not shared:
+                flight = PullFlight(image, key)
+                self._flights[key] = flight
+            flight.subscribers.append(subscriber)
+        if shared:
+            self.app.logger.info(f'复用进行中的镜像拉取 / Attaching to in-flight pull: {key}')
+            self._call(subscriber, flight.progress)
+        else:
+            threading.Thread(target=self._run, args=(flight,), name=f'pull-{key}', daemon=True).start()
+        try:
+            while not flight.done.wait(poll_interval):
+                if check_cancelled:
+                    check_cancelled()
+        finally:
+            self._detach(flight, subscriber)
+        if flight.error:
+            raise RuntimeError(flight.error)
+        return dict(flight.progress.to_dict(), shared=shared)
+
+    def inflight(self):
+        """
+        进行中的拉取列表。
+        List the in-flight pulls.
+        """
+        with self._lock:
+            return [dict(f.progress.to_dict(), image=f.key, subscribers=len(f.subscribers)) for f in self._flights.values()]
+
+    def _detach(self, flight, subscriber):
+        with self._lock:
+            if subscriber in flight.subscribers:
+                flight.subscribers.remove(subscriber)
+            if not flight.subscribers and not flight.done.is_set():
+                flight.aborted.set()
+
+    def _call(self, subscriber, progress):
+        try:
+            subscriber(progress)
+        except Exception as e:
+            self.app.logger.error(f'拉取进度回调失败 / Pull progress callback failed: {e}')
+
+    def _publish(self, flight):
+        with self._lock:
+            subscribers = list(flight.subscribers)
+        for subscriber in subscribers:
+            self._call(subscriber, flight.progress)
+
+    def _run(self, flight):
+        stream = None
+        last_percent, last_push = -1, 0.0
+        try:
+            stream = self.stream_factory(flight.image)
+            for line in stream:
+                if flight.aborted.is_set():
+                    flight.error = '拉取已中止 / pull aborted'
+                    break
+                flight.progress.feed(line)
+                percent = int(flight.progress.fraction() * 100)
+                now = time.monotonic()
+                if percent != last_percent or now - last_push >= self.min_interval:
+                    self._publish(flight)
+                    last_percent, last_push = percent, now
+        except Exception as e:
+            flight.error = str(e) or e.__class__.__name__
+            self.app.logger.error(f'镜像拉取失败 / Image pull failed: {flight.key}: {flight.error}')
+        finally:
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+            with self._lock:
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+            if not flight.error:
+                self._publish(flight)
+            flight.done.set()
@@ -0,0 +1,334 @@
+# =============================================================================
+# 文件名: jobs.py
+# 功能:   后台任务调度（安装等长耗时操作）
+# 说明:   每个任务有唯一ID、状态历史与失败原因；
+#         固定数量的工作线程从有界队列取任务，排队任务数达到上限时拒绝新任务；
+#         支持取消（排队中立即取消并释放排队名额，运行中协作式取消）
+# =============================================================================
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+# 任务状态 / Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobQueueFull(Exception):
+    """
+    任务队列已满。
+    The job queue is full.
+    """
+
+
+class JobCancelled(Exception):
+    """
+    任务已被取消，由任务函数在检查点抛出。
+    Raised by a job function at a checkpoint when the job has been cancelled.
+    """
+
+
+class Job:
+    """
+    后台任务。
+    Background job.
+    属性 / Attributes:
+        id (str): 任务ID / Job ID
+        kind (str): 任务类型，如 install / Job kind, e.g. install
+        owner (str): 提交者用户ID / Submitting user ID
+        params (dict): 任务参数 / Job parameters
+        status (str): queued/running/succeeded/failed/cancelled
+        stage (str): 当前阶段 / Current stage
+        progress (int): 进度百分比 / Progress percentage
+        detail (dict): 阶段详情（如字节数） / Stage details (e.g. byte counts)
+        error (str): 失败原因 / Failure reason
+        history (list): 状态/阶段变化记录 / Status and stage change records
+    """
+
+    def __init__(self, kind, owner, params, func, on_change=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.params = params
+        self.func = func
+        self.status = QUEUED
+        self.stage = QUEUED
+        self.progress = 0
+        self.detail = {}
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.history = [{'time': self.created_at, 'status': QUEUED, 'stage': QUEUED, 'message': ''}]
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._on_change = on_change
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """
+        协作式取消检查点。
+        Cooperative cancellation checkpoint.
+        Raises:
+            JobCancelled: 任务已被请求取消
+        """
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def update(self, progress=None, stage=None, message=None, **detail):
+        """
+        更新进度/阶段；阶段变化或带消息时写入历史。
+        Update progress or stage; stage changes and messages are recorded in the history.
+        """
+        with self._lock:
+            if progress is not None:
+                self.progress = progress
+            if detail:
+                self.detail.update(detail)
+            if (stage and stage != self.stage) or message:
+                self.stage = stage or self.stage
+                self.history.append({'time': time.time(), 'status': self.status, 'stage': self.stage, 'message': message or ''})
+        self._changed()
+
+    def _set_status(self, status, message='', only_from=None, error=None):
+        """
+        切换状态；指定 only_from 时仅当当前状态在其中才切换（检查与切换在同一把锁内）。
+        Switch status; with only_from, switch only if the current status is one of them (checked under the same lock).
+        Returns:
+            bool: 是否已切换
+        """
+        with self._lock:
+            if not self._transition(status, message, only_from, error):
+                return False
+        self._changed()
+        return True
+
+    def _complete(self):
+        """
+        任务函数正常返回后结束任务：检查取消与切换在同一把锁内，已请求取消则结束为 CANCELLED。
+        Finish a job whose function returned: the cancellation check and the transition share one lock,
+        so a job cancelled at the last moment ends as CANCELLED rather than SUCCEEDED.
+        Returns:
+            str: 最终状态
+        """
+        with self._lock:
+            if self._cancel.is_set():
+                self._transition(CANCELLED, '运行中取消 / cancelled while running', only_from=(RUNNING,))
+            else:
+                self.progress = 100
+                self._transition(SUCCEEDED, only_from=(RUNNING,))
+            status = self.status
+        self._changed()
+        return status
+
+    def _transition(self, status, message='', only_from=None, error=None):
+        # 调用方持有 self._lock / The caller holds self._lock
+        if only_from is not None and self.status not in only_from:
+            return False
+        self.status = status
+        if error is not None:
+            self.error = error
+        now = time.time()
+        if status == RUNNING:
+            self.started_at = now
+        elif status in FINISHED_STATES:
+            self.finished_at = now
+            self.stage = status
+        self.history.append({'time': now, 'status': status, 'stage': self.stage, 'message': message})
+        return True
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change(self)
+
+    def to_dict(self, with_history=False):
+        """
+        转为可JSON序列化的字典。
+        Convert to a JSON-serialisable dict.
+        """
+        with self._lock:
+            data = {
+                'id': self.id,
+                'kind': self.kind,
+                'owner': self.owner,
+                'params': self.params,
+                'status': self.status,
+                'stage': self.stage,
+                'progress': self.progress,
+                'detail': dict(self.detail),
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+            if with_history:
+                data['history'] = list(self.history)
+        return data
+
+
+class JobScheduler:
+    """
+    有界任务调度器。
+    Bounded job scheduler.
+    - max_workers 个工作线程 / max_workers worker threads
+    - 最多 max_queue 个排队任务，取消的排队任务立即释放名额 / At most max_queue queued jobs; cancelling a queued job frees its slot at once
+    - 保留最近 history_limit 个已结束任务 / Keeps the last history_limit finished jobs
+    """
+
+    def __init__(self, app, max_workers=2, max_queue=20, history_limit=100):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            max_workers: 工作线程数
+            max_queue: 等待队列长度
+            history_limit: 保留的已结束任务数
+        """
+        self.app = app
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.history_limit = history_limit
+        # 队列本身不限长，名额由 _queued 计数控制，取消的任务不再占用名额
+        # The queue itself is unbounded; _queued counts the slots so cancelled jobs stop holding one
+        self._queue = queue.Queue()
+        self._queued = 0
+        self._jobs = OrderedDict()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def start(self):
+        """
+        启动工作线程。
+        Start the worker threads.
+        """
+        if self._workers:
+            return
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def add_listener(self, callback):
+        """
+        注册任务变化回调，参数为 Job。
+        Register a callback invoked with the Job on every change.
+        """
+        self._listeners.append(callback)
+
+    def submit(self, kind, owner, func, params=None):
+        """
+        提交任务。
+        Submit a job.
+        Args:
+            kind: 任务类型
+            owner: 提交者用户ID
+            func: 任务函数，参数为 Job
+            params: 任务参数（用于展示）
+        Returns:
+            Job: 新任务
+        Raises:
+            JobQueueFull: 等待队列已满
+        """
+        job = Job(kind, owner, params or {}, func, on_change=self._notify)
+        with self._lock:
+            if self._queued >= self.max_queue:
+                raise JobQueueFull()
+            self._queued += 1
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        self._notify(job)
+        return job
+
+    def get(self, job_id):
+        """
+        按ID获取任务。
+        Get a job by ID.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, owner=None, kind=None):
+        """
+        列出任务（新任务在前）。
+        List jobs, newest first.
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in reversed(jobs) if (owner is None or j.owner == owner) and (kind is None or j.kind == kind)]
+
+    def active(self):
+        """
+        是否有排队或运行中的任务。
+        Whether any job is queued or running.
+        """
+        with self._lock:
+            return any(j.status in (QUEUED, RUNNING) for j in self._jobs.values())
+
+    def cancel(self, job_id):
+        """
+        取消任务：排队中立即取消，运行中在下一个检查点取消。
+        Cancel a job: queued jobs are cancelled immediately, running ones at their next checkpoint.
+        Returns:
+            bool: 任务存在且未结束
+        """
+        job = self.get(job_id)
+        if not job:
+            return False
+        # 检查与切换在任务锁内完成，工作线程只能从 QUEUED 切换到 RUNNING
+        # Check and transition under the job lock; the worker can only move a job from QUEUED to RUNNING
+        with job._lock:
+            if job.status in FINISHED_STATES:
+                return False
+            job._cancel.set()
+            dequeued = job._transition(CANCELLED, '排队中取消 / cancelled while queued', only_from=(QUEUED,))
+        if dequeued:
+            with self._lock:
+                self._queued -= 1
+            job._changed()
+        return True
+
+    def _notify(self, job):
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                self.app.logger.error(f'任务回调失败 / Job listener failed: {e}')
+
+    def _prune(self):
+        with self._lock:
+            finished = [jid for jid, j in self._jobs.items() if j.status in FINISHED_STATES]
+            for jid in finished[:max(0, len(finished) - self.history_limit)]:
+                self._jobs.pop(jid, None)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                # 排队中已取消的任务已释放名额，直接跳过 / Jobs cancelled while queued already gave up their slot
+                if not job._set_status(RUNNING, only_from=(QUEUED,)):
+                    continue
+                with self._lock:
+                    self._queued -= 1
+                try:
+                    job.func(job)
+                    job._complete()
+                except JobCancelled:
+                    job._set_status(CANCELLED, '运行中取消 / cancelled while running')
+                except Exception as e:
+                    error = str(e) or e.__class__.__name__
+                    self.app.logger.error(f'任务 {job.id} ({job.kind}) 失败 / Job failed: {error}')
+                    job._set_status(FAILED, error, error=error)
+            finally:
+                self._queue.task_done()
+                self._prune()
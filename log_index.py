@@ -0,0 +1,266 @@
+# =============================================================================
+# 文件名: log_index.py
+# 功能:   跨容器的日志全文索引（SQLite FTS5）
+# 说明:   后台线程按容器记录最后索引的位置（微秒时间与该微秒内已索引的行数），每轮只读取其后的新日志并批量写入；
+#         已停止的容器在停止后再索引一轮（收录退出前的输出），之后跳过；
+#         按容器保留最近 N 行且不超过保留时长；
+#         搜索支持全文匹配、容器与时间范围过滤
+# =============================================================================
+
+import sqlite3
+import threading
+import time
+
+from container_logs import iter_container_logs, iter_positions
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS log_entries (
+    id INTEGER PRIMARY KEY,
+    container_id TEXT NOT NULL,
+    container_name TEXT NOT NULL,
+    stream TEXT NOT NULL,
+    time REAL NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS log_entries_container_time ON log_entries(container_id, time);
+CREATE INDEX IF NOT EXISTS log_entries_time ON log_entries(time);
+CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5(line, content='log_entries', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS log_entries_ai AFTER INSERT ON log_entries BEGIN
+    INSERT INTO log_fts(rowid, line) VALUES (new.id, new.line);
+END;
+CREATE TRIGGER IF NOT EXISTS log_entries_ad AFTER DELETE ON log_entries BEGIN
+    INSERT INTO log_fts(log_fts, rowid, line) VALUES ('delete', old.id, old.line);
+END;
+CREATE TABLE IF NOT EXISTS log_cursors (
+    container_id TEXT PRIMARY KEY,
+    container_name TEXT NOT NULL,
+    last_time REAL NOT NULL,
+    last_count INTEGER NOT NULL DEFAULT 0
+);
+'''
+
+
+def fts_query(text):
+    """
+    把用户输入转为安全的 FTS5 查询：每个词按短语匹配，词之间为 AND。
+    Turn user input into a safe FTS5 query: each word is matched as a phrase, words are ANDed.
+    """
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"' for term in terms if term)
+
+
+class LogIndexer:
+    """
+    容器日志全文索引器。
+    Container log full-text indexer.
+    - 增量：每个容器从上次最后一条日志的位置之后继续 / Incremental from each container's last indexed position
+    - 位置包含该微秒内已索引的行数，同一微秒的多行不会丢失或重复 / Positions count the lines already indexed in
+      their microsecond, so lines sharing one are neither lost nor repeated
+    - 每批写入与游标更新在同一事务中 / Each batch and its cursor update share one transaction
+    - 保留：每个容器最多 retention_lines 行，且不早于 retention_seconds / Per-container line and age limits
+    """
+
+    def __init__(self, app, path, list_containers, interval=60, retention_lines=100000,
+                 retention_seconds=7 * 86400, batch_size=500, clock=time.time):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            path: 索引数据库文件路径
+            list_containers: 函数，返回要索引的 docker 容器对象列表
+            interval: 两轮索引的间隔(秒)
+            retention_lines: 每个容器保留的最大行数
+            retention_seconds: 日志保留时长(秒)
+            batch_size: 每个事务写入的行数
+        """
+        self.app = app
+        self.path = path
+        self.list_containers = list_containers
+        self.interval = interval
+        self.retention_lines = retention_lines
+        self.retention_seconds = retention_seconds
+        self.batch_size = batch_size
+        self.clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+        # 每个容器上一轮看到的状态 / Status of each container as seen by the previous pass
+        self._last_status = {}
+        db = self._connect()
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+            # 旧版游标没有 last_count，此前 last_time 所在微秒的行已全部索引
+            # Older cursors lack last_count; every line in the last_time microsecond was indexed back then
+            try:
+                db.execute('ALTER TABLE log_cursors ADD COLUMN last_count INTEGER NOT NULL DEFAULT 0')
+            except sqlite3.OperationalError:
+                pass
+            else:
+                with db:
+                    db.execute('UPDATE log_cursors SET last_count = (SELECT COUNT(*) FROM log_entries '
+                               'WHERE log_entries.container_id = log_cursors.container_id '
+                               'AND log_entries.time = log_cursors.last_time)')
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def start(self):
+        """
+        启动后台索引线程。
+        Start the background indexing thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='log-indexer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止后台索引线程。
+        Stop the background indexing thread.
+        """
+        self._stop.set()
+
+    def index_once(self):
+        """
+        对所有容器执行一轮增量索引并应用保留策略。
+        Run one incremental indexing pass over all containers and apply retention.
+        Returns:
+            int: 新索引的行数
+        """
+        total = 0
+        db = self._connect()
+        try:
+            cursors = {row['container_id']: (round(row['last_time'] * 1e6), row['last_count'])
+                       for row in db.execute('SELECT container_id, last_time, last_count FROM log_cursors')}
+            statuses = {}
+            for container in self.list_containers():
+                if self._stop.is_set():
+                    break
+                status = getattr(container, 'status', 'running')
+                statuses[container.id] = status
+                # 停止后已完整索引过一轮的容器不会再有新日志；刚停止（或本进程首次见到）的容器
+                # 还要再读一轮，收录上一轮之后到退出前写出的日志
+                # A container already indexed once since it stopped has no new logs; one that just stopped
+                # (or that this process has not seen yet) gets one more pass for the output written before it exited
+                previous = self._last_status.get(container.id)
+                if container.id in cursors and status != 'running' and previous is not None and previous != 'running':
+                    continue
+                try:
+                    total += self._index_container(db, container, cursors.get(container.id))
+                except Exception as e:
+                    # 失败时下一轮重试 / Retry on the next pass after a failure
+                    statuses[container.id] = 'running'
+                    self.app.logger.error(f'索引容器日志失败 / Failed to index logs: {container.name}: {e}')
+            self._last_status = statuses
+            self._apply_retention(db)
+        finally:
+            db.close()
+        return total
+
+    def _index_container(self, db, container, last_position):
+        now = self.clock()
+        # 从上次位置所在的微秒重读，跳过其中已索引的行 / Re-read the last position's microsecond and skip the lines already indexed
+        boundary = (round((now - self.retention_seconds) * 1e6), 0)
+        if last_position is not None:
+            boundary = max(boundary, last_position)
+        count, batch = 0, []
+        previous, cursor = None, last_position
+        for position, entry in iter_positions(iter_container_logs(container, since=boundary[0] / 1e6)):
+            if entry['time']:
+                previous = entry['time']
+            # 第一条带时间戳的行之前没有位置可言，照常索引且不移动游标；之后的续行与前一行同属一个微秒
+            # Lines before the first timestamped one have no position and are indexed without moving the cursor;
+            # continuation lines after it share the previous line's microsecond
+            if previous is not None:
+                if position < boundary:
+                    continue
+                cursor = (position[0], position[1] + 1)
+            # 无时间戳的行沿用前一行的时间，没有前一行时用写入时间，避免被当作 1970 年的日志清除
+            # Lines without a timestamp take the previous line's time, or the ingest time, so retention does not treat them as 1970
+            line_time = entry['time'] or (previous if previous is not None else now)
+            batch.append((container.id, container.name, entry['stream'], line_time, entry['line']))
+            if len(batch) >= self.batch_size:
+                count += self._write_batch(db, container, batch, cursor or (round(now * 1e6), 0))
+                batch = []
+        if batch:
+            count += self._write_batch(db, container, batch, cursor or (round(now * 1e6), 0))
+        return count
+
+    def _write_batch(self, db, container, batch, position):
+        with db:
+            db.executemany('INSERT INTO log_entries (container_id, container_name, stream, time, line) VALUES (?, ?, ?, ?, ?)', batch)
+            db.execute(
+                'INSERT INTO log_cursors (container_id, container_name, last_time, last_count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(container_id) DO UPDATE SET container_name = excluded.container_name, '
+                'last_time = excluded.last_time, last_count = excluded.last_count',
+                (container.id, container.name, position[0] / 1e6, position[1])
+            )
+        return len(batch)
+
+    def _apply_retention(self, db):
+        with db:
+            db.execute('DELETE FROM log_entries WHERE time < ?', (self.clock() - self.retention_seconds,))
+            for (container_id,) in db.execute('SELECT container_id FROM log_cursors').fetchall():
+                row = db.execute(
+                    'SELECT time FROM log_entries WHERE container_id = ? ORDER BY time DESC LIMIT 1 OFFSET ?',
+                    (container_id, self.retention_lines)
+                ).fetchone()
+                if row:
+                    db.execute('DELETE FROM log_entries WHERE container_id = ? AND time <= ?', (container_id, row['time']))
+
+    def search(self, text, container=None, since=None, until=None, limit=100):
+        """
+        全文搜索日志，最新的在前。
+        Full-text search across logs, newest first.
+        Args:
+            text: 搜索词（多个词同时匹配）
+            container: 容器名或ID，None 表示全部
+            since/until: 时间范围（Unix时间戳）
+            limit: 最大返回条数
+        Returns:
+            list: [{'container_id', 'container', 'stream', 'time', 'line'}]
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = ('SELECT e.container_id, e.container_name, e.stream, e.time, e.line FROM log_fts '
+               'JOIN log_entries e ON e.id = log_fts.rowid WHERE log_fts MATCH ?')
+        params = [query]
+        if container:
+            sql += ' AND (e.container_name = ? OR e.container_id LIKE ?)'
+            params += [container, container + '%']
+        if since is not None:
+            sql += ' AND e.time >= ?'
+            params.append(since)
+        if until is not None:
+            sql += ' AND e.time < ?'
+            params.append(until)
+        sql += ' ORDER BY e.time DESC LIMIT ?'
+        params.append(limit)
+        db = self._connect()
+        try:
+            return [{
+                'container_id': row['container_id'],
+                'container': row['container_name'],
+                'stream': row['stream'],
+                'time': row['time'],
+                'line': row['line']
+            } for row in db.execute(sql, params)]
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                count = self.index_once()
+                if count:
+                    self.app.logger.debug(f'已索引日志行 / Indexed log lines: {count}')
+            except Exception as e:
+                self.app.logger.error(f'日志索引失败 / Log indexing failed: {e}')
+            self._stop.wait(self.interval)
@@ -0,0 +1,168 @@
+# =============================================================================
+# 文件名: logging_setup.py
+# 功能:   异步日志管道：队列处理器 + 后台写文件线程，JSON 结构化输出
+# 说明:   请求线程只把日志记录放入有界队列，由 QueueListener 线程写入轮转文件；
+#         队列满时丢弃并计数，不阻塞请求；
+#         支持按类别（子 logger）设置级别，对高频类别（如代理访问日志）采样与限速
+# =============================================================================
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+# 文本格式（与原有日志格式一致） / Text format, same as the original log format
+TEXT_FORMAT = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    JSON 结构化日志格式，每条记录一行。
+    Structured JSON log format, one record per line.
+    通过 extra={'fields': {...}} 附加的字段会合并到输出中。
+    Fields passed via extra={'fields': {...}} are merged into the output.
+    """
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'category': record.name,
+            'message': record.getMessage(),
+            'where': f'{record.pathname}:{record.lineno}'
+        }
+        data.update(getattr(record, 'fields', None) or {})
+        if getattr(record, 'suppressed', 0):
+            data['suppressed'] = record.suppressed
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    采样与限速过滤器，用于高频日志类别。
+    Sampling and rate-limiting filter for noisy log categories.
+    - 按比例保留（确定性地每 N 条保留一条） / Keeps a fraction of records (deterministically every Nth)
+    - 令牌桶限速，每秒最多 rate 条 / Token bucket limiting to rate records per second
+    - WARNING 及以上级别总是保留 / WARNING and above always pass
+    - 被丢弃的条数记在下一条保留记录的 suppressed 字段 / Dropped counts are reported on the next kept record as suppressed
+    """
+
+    def __init__(self, sample=1.0, rate=0, burst=None, clock=time.monotonic):
+        """
+        Args:
+            sample: 保留比例 (0, 1]
+            rate: 每秒最多保留条数，0 表示不限速
+            burst: 令牌桶容量，默认等于 rate
+        """
+        super().__init__()
+        self.every = max(1, round(1 / sample)) if sample > 0 else 0
+        self.rate = rate
+        self.burst = burst or rate
+        self.clock = clock
+        self._tokens = float(self.burst)
+        self._last = clock()
+        self._seen = 0
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return self._keep(record)
+        with self._lock:
+            self._seen += 1
+            if not self.every or (self._seen - 1) % self.every:
+                self._suppressed += 1
+                return False
+            if self.rate:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens < 1:
+                    self._suppressed += 1
+                    return False
+                self._tokens -= 1
+        return self._keep(record)
+
+    def _keep(self, record):
+        with self._lock:
+            record.suppressed, self._suppressed = self._suppressed, 0
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    队列满时丢弃记录而不是阻塞或报错的队列处理器。
+    Queue handler that drops records when the queue is full instead of blocking or erroring.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_category_levels(value):
+    """
+    解析类别级别配置，如 'proxy=WARNING,docker=DEBUG'。
+    Parse per-category levels such as 'proxy=WARNING,docker=DEBUG'.
+    Returns:
+        dict: {类别: 级别数值}
+    Raises:
+        ValueError: 格式或级别无效
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, sep, level = item.partition('=')
+        level_no = logging.getLevelName(level.strip().upper())
+        if not sep or not name.strip() or not isinstance(level_no, int):
+            raise ValueError(f'Invalid log category level: {item}')
+        levels[name.strip()] = level_no
+    return levels
+
+
+def setup_logging(app, config):
+    """
+    为应用配置异步文件日志、类别级别与代理访问日志采样。
+    Configure asynchronous file logging, category levels and proxy access log sampling.
+    Args:
+        app: Flask应用实例
+        config: 配置对象
+    Returns:
+        QueueListener: 已启动的后台写日志监听器（退出时自动停止）
+    """
+    file_handler = RotatingFileHandler(
+        config.LOG_FILE,
+        maxBytes=config.LOG_MAX_SIZE,
+        backupCount=config.LOG_BACKUP_COUNT
+    )
+    if config.LOG_FORMAT == 'json':
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    level = getattr(logging, config.LOG_LEVEL.upper())
+    file_handler.setLevel(level)
+
+    log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    app.logger.addHandler(DroppingQueueHandler(log_queue))
+    app.logger.setLevel(level)
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    for category, category_level in parse_category_levels(config.LOG_CATEGORY_LEVELS).items():
+        app.logger.getChild(category).setLevel(category_level)
+    app.logger.getChild('proxy').addFilter(
+        SamplingFilter(sample=config.LOG_PROXY_SAMPLE_RATE, rate=config.LOG_PROXY_RATE_LIMIT)
+    )
+    return listener
@@ -0,0 +1,283 @@
+# =============================================================================
+# 文件名: metrics_store.py
+# 功能:   多分辨率主机指标时序存储（类 RRD）
+# 说明:   每个分辨率层级为定长数组环，按步长聚合平均值；
+#         定期以紧凑二进制格式持久化，重启后恢复历史
+# =============================================================================
+
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+
+
+# 持久化文件头 / Persisted file header
+FILE_MAGIC = b'LNMS'
+FILE_VERSION = 1
+HEADER = struct.Struct('<4sHHH')
+TIER_HEADER = struct.Struct('<dI')
+
+# 默认记录的指标 / Metrics recorded by default
+DEFAULT_METRICS = ('cpu', 'mem_percent', 'mem_used', 'disk_percent')
+
+_DURATION_RE = re.compile(r'^(\d+(?:\.\d+)?)([smhd]?)$')
+_DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(value):
+    """
+    解析时长参数，支持纯秒数或 s/m/h/d 后缀（如 '90', '15m', '1h', '7d'）。
+    Parse a duration given in seconds or with an s/m/h/d suffix (e.g. '90', '15m', '1h', '7d').
+    Returns:
+        float: 秒数
+    Raises:
+        ValueError: 格式无效
+    """
+    match = _DURATION_RE.match(str(value).strip().lower())
+    if not match:
+        raise ValueError(f'Invalid duration: {value}')
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+class Tier:
+    """
+    单个分辨率层级：固定数量的时间槽，每个槽保存一个步长内的平均值。
+    One resolution tier: a fixed number of slots, each holding the average over one step.
+    """
+
+    def __init__(self, step, retention, metrics):
+        self.step = float(step)
+        self.slots = max(1, int(retention // step))
+        self.metrics = tuple(metrics)
+        self.times = array('d', bytes(8 * self.slots))
+        self.values = {m: array('d', bytes(8 * self.slots)) for m in self.metrics}
+        self._bucket = None
+        self._sums = dict.fromkeys(self.metrics, 0.0)
+        self._count = 0
+
+    @property
+    def retention(self):
+        return self.step * self.slots
+
+    def add(self, timestamp, values):
+        """
+        将一个样本累加到当前步长桶，跨桶时写入槽位。
+        Accumulate a sample into the current bucket, flushing into a slot when the bucket changes.
+        """
+        bucket = timestamp - timestamp % self.step
+        if self._bucket is not None and bucket != self._bucket:
+            self._flush()
+        self._bucket = bucket
+        for m in self.metrics:
+            self._sums[m] += values.get(m, 0.0)
+        self._count += 1
+
+    def _flush(self):
+        if not self._count:
+            return
+        i = int(self._bucket // self.step) % self.slots
+        self.times[i] = self._bucket
+        for m in self.metrics:
+            self.values[m][i] = self._sums[m] / self._count
+            self._sums[m] = 0.0
+        self._count = 0
+
+    def rows(self, start, end):
+        """
+        获取 [start, end] 区间内的已聚合数据（包含尚未写入的当前桶）。
+        Get aggregated rows within [start, end], including the pending bucket.
+        Returns:
+            list: (timestamp, {metric: value}) 按时间排序
+        """
+        rows = []
+        for i in range(self.slots):
+            t = self.times[i]
+            if t and start <= t <= end:
+                rows.append((t, {m: self.values[m][i] for m in self.metrics}))
+        if self._count and start <= self._bucket <= end:
+            rows.append((self._bucket, {m: self._sums[m] / self._count for m in self.metrics}))
+        rows.sort(key=lambda r: r[0])
+        return rows
+
+
+class MetricsStore:
+    """
+    多分辨率指标存储。
+    Multi-resolution metrics store.
+    - 每个样本同时写入所有层级 / Every sample is fed to all tiers
+    - 内存占用固定：槽数 × (指标数 + 1) × 8 字节 / Fixed memory: slots × (metrics + 1) × 8 bytes
+    """
+
+    def __init__(self, app, path, tiers=((2, 3600), (60, 86400), (900, 30 * 86400)),
+                 metrics=DEFAULT_METRICS, flush_interval=300):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            path: 持久化文件路径，为空则不持久化
+            tiers: (步长秒, 保留秒) 列表，从细到粗
+            metrics: 记录的指标名
+            flush_interval: 持久化间隔(秒)
+        """
+        self.app = app
+        self.path = path
+        self.metrics = tuple(metrics)
+        self.flush_interval = flush_interval
+        self.tiers = [Tier(step, retention, self.metrics) for step, retention in sorted(tiers)]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if path:
+            self.load()
+
+    # ---------------- 写入 / Write ----------------
+    def record(self, timestamp, values):
+        """
+        记录一个样本。
+        Record one sample.
+        Args:
+            timestamp: Unix时间戳
+            values: {指标: 数值}
+        """
+        with self._lock:
+            for tier in self.tiers:
+                tier.add(timestamp, values)
+
+    def record_snapshot(self, snapshot):
+        """
+        从资源采样器快照中提取指标并记录，可直接注册为采样器回调。
+        Record metrics extracted from a sampler snapshot; usable as a sampler listener.
+        """
+        disks = snapshot.get('disks') or []
+        total = sum(d['total'] for d in disks)
+        used = sum(d['used'] for d in disks)
+        self.record(snapshot['timestamp'], {
+            'cpu': snapshot['cpu'],
+            'mem_percent': snapshot['mem']['percent'],
+            'mem_used': snapshot['mem']['used'],
+            'disk_percent': used * 100.0 / total if total else 0.0
+        })
+
+    # ---------------- 查询 / Query ----------------
+    def query(self, range_seconds, step=None, end=None):
+        """
+        查询最近 range_seconds 秒的数据，选择能覆盖该区间的最细层级并按 step 重新分桶。
+        Query the last range_seconds, using the finest tier that covers the range and re-bucketing by step.
+        Args:
+            range_seconds: 查询区间长度(秒)
+            step: 输出步长(秒)，为空则使用层级步长
+            end: 区间结束时间，默认当前时间
+        Returns:
+            dict: {'start', 'end', 'step', 'timestamps', <metric>: [...]}
+        """
+        end = time.time() if end is None else end
+        start = end - range_seconds
+        step = float(step) if step else 0.0
+        candidates = [t for t in self.tiers if t.retention >= range_seconds] or [self.tiers[-1]]
+        # 在覆盖区间的层级中选择步长不超过请求步长的最粗层级，减少重新聚合量
+        # Among covering tiers pick the coarsest whose step does not exceed the requested one
+        fitting = [t for t in candidates if t.step <= step] if step else []
+        tier = fitting[-1] if fitting else candidates[0]
+        step = max(step, tier.step)
+        with self._lock:
+            rows = tier.rows(start, end)
+        result = {'start': start, 'end': end, 'step': step, 'timestamps': []}
+        for m in self.metrics:
+            result[m] = []
+        bucket, sums, count = None, None, 0
+        for t, values in rows + [(None, None)]:
+            b = None if t is None else t - t % step
+            if bucket is not None and b != bucket:
+                result['timestamps'].append(bucket)
+                for m in self.metrics:
+                    result[m].append(round(sums[m] / count, 3))
+                bucket = None
+            if t is None:
+                break
+            if bucket is None:
+                bucket, sums, count = b, dict.fromkeys(self.metrics, 0.0), 0
+            for m in self.metrics:
+                sums[m] += values[m]
+            count += 1
+        return result
+
+    # ---------------- 持久化 / Persistence ----------------
+    def start(self):
+        """
+        启动定期持久化线程。
+        Start the periodic persistence thread.
+        """
+        if not self.path or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-store', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止持久化线程并立即保存。
+        Stop the persistence thread and save immediately.
+        """
+        self._stop.set()
+        self.save()
+
+    def save(self):
+        """
+        以二进制格式原子写入持久化文件。
+        Atomically write the store to its binary file.
+        """
+        if not self.path:
+            return
+        tmp = f'{self.path}.tmp'
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock, open(tmp, 'wb') as f:
+                f.write(HEADER.pack(FILE_MAGIC, FILE_VERSION, len(self.tiers), len(self.metrics)))
+                for tier in self.tiers:
+                    f.write(TIER_HEADER.pack(tier.step, tier.slots))
+                    tier.times.tofile(f)
+                    for m in self.metrics:
+                        tier.values[m].tofile(f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.app.logger.error(f'保存指标历史失败 / Failed to save metrics history: {e}')
+
+    def load(self):
+        """
+        从持久化文件恢复；文件不存在或布局与当前配置不一致时忽略。
+        Restore from the binary file; ignored when missing or when its layout differs from the current configuration.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                magic, version, n_tiers, n_metrics = HEADER.unpack(f.read(HEADER.size))
+                if magic != FILE_MAGIC or version != FILE_VERSION or n_tiers != len(self.tiers) or n_metrics != len(self.metrics):
+                    self.app.logger.warning('指标历史文件布局不匹配，已忽略 / Metrics history layout mismatch, ignored')
+                    return
+                loaded = []
+                for tier in self.tiers:
+                    step, slots = TIER_HEADER.unpack(f.read(TIER_HEADER.size))
+                    if step != tier.step or slots != tier.slots:
+                        self.app.logger.warning('指标历史文件布局不匹配，已忽略 / Metrics history layout mismatch, ignored')
+                        return
+                    times = array('d')
+                    times.fromfile(f, slots)
+                    values = {}
+                    for m in self.metrics:
+                        values[m] = array('d')
+                        values[m].fromfile(f, slots)
+                    loaded.append((times, values))
+        except (OSError, EOFError, struct.error) as e:
+            self.app.logger.error(f'读取指标历史失败 / Failed to load metrics history: {e}')
+            return
+        with self._lock:
+            for tier, (times, values) in zip(self.tiers, loaded):
+                tier.times, tier.values = times, values
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.save()
@@ -0,0 +1,266 @@
+# =============================================================================
+# 文件名: monitor.py
+# 功能:   后台资源采样线程与定长环形缓冲区
+# 说明:   按 MONITOR_INTERVAL 周期采集 CPU/内存/磁盘/RAID，
+#         请求方直接读取最新样本，不再在请求线程中阻塞等待 psutil
+# =============================================================================
+
+import os
+import platform
+import threading
+import time
+from array import array
+
+import psutil
+
+
+class RingBuffer:
+    """
+    定长数组环形缓冲区，每个字段一个 array('d')，写满后覆盖最旧数据。
+    Fixed-size array-backed ring buffer, one array('d') per field; overwrites the oldest entry when full.
+    """
+
+    def __init__(self, capacity, fields):
+        """
+        Args:
+            capacity: 最大样本数
+            fields: 数值字段名列表（自动包含 timestamp）
+        """
+        if capacity < 1:
+            raise ValueError(f'RingBuffer capacity must be at least 1, got: {capacity}')
+        self.capacity = capacity
+        self.fields = ('timestamp',) + tuple(fields)
+        self._data = {f: array('d', bytes(8 * capacity)) for f in self.fields}
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, **values):
+        """
+        追加一个样本，缺失字段记为 0。
+        Append a sample; missing fields are stored as 0.
+        """
+        with self._lock:
+            i = self._next
+            self._data['timestamp'][i] = timestamp
+            for f in self.fields[1:]:
+                self._data[f][i] = values.get(f, 0.0)
+            self._next = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def latest(self):
+        """
+        获取最新样本。
+        Get the most recent sample.
+        Returns:
+            dict/None: 字段到数值的映射，无样本时为None
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            i = (self._next - 1) % self.capacity
+            return {f: self._data[f][i] for f in self.fields}
+
+    def items(self, since=None):
+        """
+        按时间顺序获取样本。
+        Get samples in chronological order.
+        Args:
+            since: 仅返回时间戳大于该值的样本
+        Returns:
+            list: 样本字典列表
+        """
+        with self._lock:
+            start = (self._next - self._count) % self.capacity
+            rows = []
+            for k in range(self._count):
+                i = (start + k) % self.capacity
+                if since is not None and self._data['timestamp'][i] <= since:
+                    continue
+                rows.append({f: self._data[f][i] for f in self.fields})
+            return rows
+
+
+def collect_disks(min_size=100 * 1024 * 1024):
+    """
+    采集磁盘分区使用情况，忽略小于 min_size 的分区。
+    Collect disk partition usage, skipping partitions smaller than min_size.
+    Returns:
+        list: 磁盘信息字典列表
+    """
+    disks = []
+    for part in psutil.disk_partitions(all=True):
+        try:
+            usage = psutil.disk_usage(part.mountpoint)
+        except Exception:
+            continue
+        if usage.total < min_size:
+            continue
+        disks.append({
+            'device': part.device,
+            'mountpoint': part.mountpoint,
+            'fstype': part.fstype,
+            'total': usage.total,
+            'used': usage.used,
+            'free': usage.free,
+            'percent': usage.percent
+        })
+    return disks
+
+
+def collect_raid():
+    """
+    采集RAID阵列状态（Linux读取 /proc/mdstat，Windows通过WMI）。
+    Collect RAID status (/proc/mdstat on Linux, WMI on Windows).
+    Returns:
+        list: RAID信息字典列表
+    """
+    raid = []
+    if platform.system().lower() == 'windows':
+        try:
+            import wmi
+            c = wmi.WMI()
+            for disk in c.Win32_DiskDrive():
+                raid.append({
+                    'name': disk.Caption,
+                    'level': getattr(disk, 'SCSIBus', ''),
+                    'status': disk.Status
+                })
+        except Exception:
+            pass
+    else:
+        try:
+            if os.path.exists('/proc/mdstat'):
+                with open('/proc/mdstat') as f:
+                    lines = f.readlines()
+                for line in lines:
+                    if line.startswith('md'):
+                        arr = line.split()
+                        raid.append({
+                            'name': arr[0],
+                            'level': arr[3] if len(arr) > 3 else '',
+                            'status': arr[-1] if arr else ''
+                        })
+        except Exception:
+            pass
+    return raid
+
+
+class ResourceSampler:
+    """
+    后台资源采样器。
+    Background resource sampler.
+    - 单线程按固定间隔采样 / One thread samples at a fixed interval
+    - 数值历史写入 RingBuffer，由 /api/resource?history=1 返回 / Numeric history goes into a RingBuffer, served by /api/resource?history=1
+    - 磁盘/RAID 等较慢的信息按 slow_every 个周期采集一次 / Slower disk/RAID info is refreshed every slow_every ticks
+    """
+
+    FIELDS = ('cpu', 'mem_percent', 'mem_used', 'mem_total')
+
+    def __init__(self, app, interval=2, history_size=300, slow_every=5):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            interval: 采样间隔(秒)
+            history_size: 环形缓冲区容量
+            slow_every: 每隔多少个周期刷新一次磁盘与RAID信息
+        """
+        self.app = app
+        self.interval = interval
+        self.slow_every = max(1, slow_every)
+        self.history = RingBuffer(history_size, self.FIELDS)
+        self._snapshot = None
+        self._disks = []
+        self._raid = []
+        self._ticks = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        启动采样线程。
+        Start the sampler thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        # 首次调用 cpu_percent(None) 仅用于建立基准 / The first cpu_percent(None) call only primes the baseline
+        psutil.cpu_percent(interval=None)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止采样线程。
+        Stop the sampler thread.
+        """
+        self._stop.set()
+
+    def add_listener(self, callback):
+        """
+        注册采样回调，每次采样后以快照为参数调用。
+        Register a callback invoked with each new snapshot.
+        """
+        self._listeners.append(callback)
+
+    def latest(self):
+        """
+        获取最新的完整快照，尚无样本时立即同步采集一次（不阻塞）。
+        Get the latest full snapshot, sampling once synchronously (non-blocking) if none exists yet.
+        Returns:
+            dict: 包含 cpu/mem/disks/raid/timestamp 的快照
+        """
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.sample()
+        return snapshot
+
+    def sample(self):
+        """
+        采集一次样本并写入历史。
+        Take one sample and record it in the history.
+        Returns:
+            dict: 快照
+        """
+        now = time.time()
+        cpu = psutil.cpu_percent(interval=None)
+        mem = psutil.virtual_memory()
+        if self._ticks % self.slow_every == 0:
+            self._disks = collect_disks()
+            self._raid = collect_raid()
+        self._ticks += 1
+        snapshot = {
+            'timestamp': now,
+            'cpu': cpu,
+            'mem': {
+                'percent': mem.percent,
+                'used': mem.used,
+                'total': mem.total
+            },
+            'disks': self._disks,
+            'raid': self._raid
+        }
+        self.history.append(now, cpu=cpu, mem_percent=mem.percent, mem_used=mem.used, mem_total=mem.total)
+        with self._lock:
+            self._snapshot = snapshot
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                self.app.logger.error(f'资源采样回调失败 / Resource sampler listener failed: {e}')
+        return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sample()
+            except Exception as e:
+                self.app.logger.error(f'资源采样失败 / Resource sampling failed: {e}')
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
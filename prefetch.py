@@ -0,0 +1,203 @@
+# =============================================================================
+# 文件名: prefetch.py
+# 功能:   空闲时段预拉取应用商店中标记为 warm 的镜像
+# 说明:   仅在配置的时间窗口内、且一段时间无交互请求和安装任务时运行；
+#         同一时间最多拉取一个镜像，一旦出现交互请求或安装任务立即暂停
+# =============================================================================
+
+import threading
+import time
+
+
+def parse_window(value):
+    """
+    解析空闲时间窗口 'HH:MM-HH:MM'（可跨午夜），空值表示全天。
+    Parse an idle window 'HH:MM-HH:MM' (may wrap past midnight); empty means all day.
+    Returns:
+        tuple/None: (开始分钟, 结束分钟) 或 None
+    Raises:
+        ValueError: 格式无效
+    """
+    if not value:
+        return None
+    try:
+        start, end = value.split('-')
+        bounds = []
+        for part in (start, end):
+            hour, minute = part.strip().split(':')
+            hour, minute = int(hour), int(minute)
+            if not (0 <= hour < 24 and 0 <= minute < 60):
+                raise ValueError(part)
+            bounds.append(hour * 60 + minute)
+    except ValueError:
+        raise ValueError(f'Invalid idle window: {value}')
+    return tuple(bounds)
+
+
+def in_window(window, minutes):
+    """
+    判断一天中的分钟数是否落在时间窗口内。
+    Whether a minute of the day falls inside the window.
+    """
+    if window is None:
+        return True
+    start, end = window
+    if start <= end:
+        return start <= minutes < end
+    return minutes >= start or minutes < end
+
+
+class PrefetchPaused(Exception):
+    """
+    预拉取因交互请求或安装任务而暂停。
+    Prefetching paused because of interactive traffic or an install job.
+    """
+
+
+class ImagePrefetcher:
+    """
+    空闲时段镜像预拉取器。
+    Idle-time image prefetcher.
+    - 每轮按目录顺序逐个拉取缺失的 warm 镜像 / Each round pulls missing warm images one by one in catalog order
+    - 拉取期间持续检查是否仍空闲，否则中止本轮 / Idleness is rechecked during a pull; the round stops otherwise
+    - 失败的镜像在 retry_after 秒内不再尝试 / Failed images are not retried for retry_after seconds
+    """
+
+    def __init__(self, app, catalog, image_present, pull, is_busy=None, window=None,
+                 idle_seconds=300, interval=300, retry_after=3600, clock=time.time, localtime=time.localtime):
+        """
+        Args:
+            app: Flask应用实例（用于日志）
+            catalog: 函数，返回应用目录列表（apps.json 内容）
+            image_present: 函数 image -> 本地是否已有该镜像
+            pull: 函数 pull(image, check_cancelled=...)，check_cancelled 抛出异常时应中止
+            is_busy: 函数，返回是否有安装任务在排队或运行
+            window: parse_window 的结果，None 表示全天
+            idle_seconds: 最后一次交互请求后需保持安静的秒数
+            interval: 两轮检查的间隔(秒)
+            retry_after: 失败镜像的重试间隔(秒)
+        """
+        self.app = app
+        self.catalog = catalog
+        self.image_present = image_present
+        self.pull = pull
+        self.is_busy = is_busy or (lambda: False)
+        self.window = window
+        self.idle_seconds = idle_seconds
+        self.interval = interval
+        self.retry_after = retry_after
+        self.clock = clock
+        self.localtime = localtime
+        self.current = None
+        self.last_error = None
+        self._last_activity = clock()
+        self._failed = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        启动后台线程。
+        Start the background thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='image-prefetcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止后台线程。
+        Stop the background thread.
+        """
+        self._stop.set()
+
+    def touch(self):
+        """
+        记录一次交互请求。
+        Record interactive activity.
+        """
+        self._last_activity = self.clock()
+
+    def idle(self):
+        """
+        是否处于可预拉取的空闲状态。
+        Whether the system is idle enough to prefetch.
+        """
+        now = self.clock()
+        if now - self._last_activity < self.idle_seconds:
+            return False
+        local = self.localtime(now)
+        if not in_window(self.window, local.tm_hour * 60 + local.tm_min):
+            return False
+        return not self.is_busy()
+
+    def warm_images(self):
+        """
+        目录中标记为 warm 的镜像（去重，保持顺序）。
+        Images marked warm in the catalog, de-duplicated in order.
+        """
+        images = []
+        for entry in self.catalog():
+            image = entry.get('image')
+            if entry.get('warm') and image and image not in images:
+                images.append(image)
+        return images
+
+    def run_once(self):
+        """
+        执行一轮预拉取。
+        Run one prefetch round.
+        Returns:
+            list: 本轮成功拉取的镜像
+        """
+        pulled = []
+        for image in self.warm_images():
+            if self._stop.is_set() or not self.idle():
+                break
+            failed_at = self._failed.get(image)
+            if failed_at is not None and self.clock() - failed_at < self.retry_after:
+                continue
+            if self.image_present(image):
+                continue
+            self.current = image
+            try:
+                self.app.logger.info(f'空闲预拉取镜像 / Prefetching image: {image}')
+                self.pull(image, check_cancelled=self._check_idle)
+                pulled.append(image)
+                self._failed.pop(image, None)
+            except PrefetchPaused:
+                self.app.logger.info(f'预拉取已暂停 / Prefetch paused: {image}')
+                break
+            except Exception as e:
+                self.last_error = f'{image}: {e}'
+                self._failed[image] = self.clock()
+                self.app.logger.error(f'预拉取镜像失败 / Prefetch failed: {self.last_error}')
+            finally:
+                self.current = None
+        return pulled
+
+    def status(self):
+        """
+        预拉取状态。
+        Prefetcher status.
+        """
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'idle': self.idle(),
+            'current': self.current,
+            'warm': self.warm_images(),
+            'last_error': self.last_error
+        }
+
+    def _check_idle(self):
+        if self._stop.is_set() or not self.idle():
+            raise PrefetchPaused()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.app.logger.error(f'预拉取轮次失败 / Prefetch round failed: {e}')
@@ -0,0 +1,119 @@
+# =============================================================================
+# 文件名: proxy_stream.py
+# 功能:   反向代理的双向流式转发工具
+# 说明:   上传按固定大小分块从 WSGI 输入读取并转发，下载按分块从上游读取并返回，
+#         内存占用与文件大小无关；逐跳头（Connection、Transfer-Encoding 等）
+#         不转发，分块传输编码由两端各自处理
+# =============================================================================
+
+
+# 逐跳头，只对单个连接有意义，不能转发（RFC 7230 6.1）
+# Hop-by-hop headers only apply to a single connection and must not be forwarded (RFC 7230 6.1)
+HOP_BY_HOP_HEADERS = frozenset((
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade'
+))
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _connection_tokens(headers):
+    # Connection 头中列出的头也是逐跳头 / Headers named in Connection are hop-by-hop too
+    return {token.strip().lower() for token in headers.get('Connection', '').split(',') if token.strip()}
+
+
+def forward_request_headers(headers, extra=None):
+    """
+    生成转发给上游的请求头：去掉逐跳头与 Content-Length（由请求体决定）。
+    Build the headers forwarded upstream, dropping hop-by-hop headers and Content-Length, which the body determines.
+    Args:
+        headers: 原始请求头
+        extra: 追加的头（如 X-Forwarded-*）
+    Returns:
+        dict: 转发的请求头
+    """
+    skip = HOP_BY_HOP_HEADERS | _connection_tokens(headers) | {'content-length'}
+    forwarded = {name: value for name, value in headers.items() if name.lower() not in skip}
+    forwarded.update(extra or {})
+    return forwarded
+
+
+def forward_response_headers(headers):
+    """
+    生成返回给客户端的响应头：去掉逐跳头，保留 Content-Length 与 Content-Encoding。
+    Build the headers returned to the client, dropping hop-by-hop headers and keeping Content-Length and Content-Encoding.
+    Args:
+        headers: 上游响应头（保留重复的 Set-Cookie）
+    Returns:
+        list: [(name, value)]
+    """
+    skip = HOP_BY_HOP_HEADERS | _connection_tokens(headers)
+    if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        # 分块响应的长度未知 / A chunked response has no known length
+        skip = skip | {'content-length'}
+    return [(name, value) for name, value in headers.items() if name.lower() not in skip]
+
+
+class RequestBody:
+    """
+    已知长度的请求体，按需从 WSGI 输入读取。
+    Request body of known length, read from the WSGI input on demand.
+    requests 通过 len 属性设置 Content-Length，并以 read() 分块发送。
+    requests sets Content-Length from the len attribute and sends it in read() chunks.
+    """
+
+    def __init__(self, stream, length):
+        self._stream = stream
+        self.len = length
+
+    def read(self, size=DEFAULT_CHUNK_SIZE):
+        if size is None or size < 0:
+            size = DEFAULT_CHUNK_SIZE
+        return self._stream.read(size)
+
+
+def iter_stream(stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    按块读取流直到结束。
+    Read a stream chunk by chunk until it ends.
+    """
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def request_body(request, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    为请求选择流式请求体。
+    Choose a streaming body for a request.
+    - 有 Content-Length：按长度流式发送 / With Content-Length: streamed with that length
+    - 分块上传：生成器，requests 以分块编码转发 / Chunked upload: a generator, forwarded with chunked encoding
+    - 无请求体：None / No body: None
+    Args:
+        request: Flask 请求对象
+        chunk_size: 分块大小
+    """
+    if request.content_length:
+        return RequestBody(request.stream, request.content_length)
+    if 'chunked' in request.headers.get('Transfer-Encoding', '').lower():
+        # Werkzeug 已解码分块编码，流在请求体结束时返回空 / Werkzeug decodes chunking; the stream ends with the body
+        return iter_stream(request.stream, chunk_size)
+    return None
+
+
+def iter_response(resp, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    按块转发上游响应体，不解压，结束或客户端断开时关闭上游连接。
+    Relay an upstream response body in chunks without decompressing, closing the upstream connection when done or when the client goes away.
+    Args:
+        resp: requests 的流式响应（stream=True）
+        chunk_size: 分块大小
+    """
+    try:
+        for chunk in resp.raw.stream(chunk_size, decode_content=False):
+            if chunk:
+                yield chunk
+    finally:
+        resp.close()
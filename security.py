@@ -0,0 +1,178 @@
+# =============================================================================
+# 文件名: security.py
+# 功能:   密码哈希线程池与登录限流
+# 说明:   密码哈希是刻意缓慢的 KDF，放到固定大小的线程池中执行，排队数有上限，
+#         超出时立即拒绝而不是占住请求线程；
+#         令牌桶按 IP 与（用户名, 客户端网段）限流，登录洪泛只影响登录本身
+# =============================================================================
+
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """
+    密码哈希线程池已满。
+    The password hashing pool is saturated.
+    """
+
+
+def client_subnet(address, ipv4_prefix=24, ipv6_prefix=64):
+    """
+    客户端地址所在的网段，同一网段的地址共用一个限流键。
+    The subnet of a client address, so addresses in one subnet share a throttling key.
+    Args:
+        address: 客户端IP
+        ipv4_prefix/ipv6_prefix: 网段前缀长度
+    Returns:
+        str: 网段（如 192.0.2.0/24），无法解析时原样返回
+    """
+    try:
+        ip = ipaddress.ip_address(address)
+    except (TypeError, ValueError):
+        return str(address)
+    prefix = ipv4_prefix if ip.version == 4 else ipv6_prefix
+    return str(ipaddress.ip_network(f'{ip}/{prefix}', strict=False))
+
+
+class RateLimiter:
+    """
+    按键的令牌桶限流器。
+    Per-key token bucket rate limiter.
+    - 每个键容量 burst，每秒补充 rate 个令牌 / Each key holds up to burst tokens, refilled at rate per second
+    - 最多跟踪 max_keys 个键，超出时淘汰最久未使用的 / Tracks at most max_keys keys, evicting the least recently used
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, clock=time.monotonic):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 令牌桶容量
+            max_keys: 最多跟踪的键数
+            clock: 单调时钟函数（便于测试）
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - last) * self.rate)
+
+    def _retry_after(self, tokens):
+        if tokens >= 1:
+            return 0
+        return math.ceil((1 - tokens) / self.rate) if self.rate else 60
+
+    def check(self, key):
+        """
+        检查是否还有令牌，不消耗。
+        Check whether a token is available without consuming it.
+        Returns:
+            tuple: (是否允许, 建议重试秒数)
+        """
+        with self._lock:
+            tokens = self._tokens(key, self.clock())
+        return tokens >= 1, self._retry_after(tokens)
+
+    def allow(self, key):
+        """
+        消耗一个令牌。
+        Consume one token.
+        Returns:
+            tuple: (是否允许, 建议重试秒数)
+        """
+        with self._lock:
+            now = self.clock()
+            tokens = self._tokens(key, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, self._retry_after(tokens)
+
+
+class PasswordHasher:
+    """
+    在有界线程池中执行密码哈希与校验。
+    Runs password hashing and verification on a bounded thread pool.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, timeout=30):
+        """
+        Args:
+            max_workers: 哈希线程数
+            max_pending: 同时进行（执行中+排队）的最大任务数
+            timeout: 等待单个任务的最长秒数
+        """
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def check(self, password_hash, password):
+        """
+        校验密码。
+        Verify a password.
+        Raises:
+            HasherBusy: 线程池已满
+        """
+        return self._run(check_password_hash, password_hash, password)
+
+    def generate(self, password):
+        """
+        生成密码哈希。
+        Generate a password hash.
+        Raises:
+            HasherBusy: 线程池已满
+        """
+        return self._run(generate_password_hash, password)
+
+    def generate_many(self, passwords):
+        """
+        批量生成密码哈希（如用户导入），同时最多占用 max_workers 个槽位，为登录留出余量。
+        Hash many passwords (e.g. for a user import), holding at most max_workers slots so logins keep headroom.
+        Returns:
+            list: 与输入顺序一致的哈希列表
+        Raises:
+            HasherBusy: 等待槽位超时
+        """
+        window = threading.BoundedSemaphore(self.max_workers)
+        futures = []
+
+        def done(_):
+            self._slots.release()
+            window.release()
+
+        for password in passwords:
+            window.acquire()
+            if not self._slots.acquire(timeout=self.timeout):
+                window.release()
+                raise HasherBusy()
+            future = self._executor.submit(generate_password_hash, password)
+            future.add_done_callback(done)
+            futures.append(future)
+        return [future.result(timeout=self.timeout) for future in futures]
@@ -0,0 +1,69 @@
+# =============================================================================
+# 文件名: static_files.py
+# 功能:   本地静态文件的内容指纹
+# 说明:   url_for('static', ...) 生成的地址附带内容摘要 ?v=<hash>，
+#         带正确指纹的请求可以长期缓存（immutable），文件变化后地址随之变化；
+#         摘要按 (mtime, size) 缓存，文件未变化时不重复读取
+# =============================================================================
+
+import hashlib
+import os
+import threading
+
+
+class StaticFingerprinter:
+    """
+    计算静态文件的内容指纹。
+    Compute content fingerprints for static files.
+    """
+
+    def __init__(self, root, length=12):
+        """
+        Args:
+            root: 静态文件根目录
+            length: 指纹长度（十六进制字符数）
+        """
+        self.root = os.path.abspath(root)
+        self.length = length
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, filename):
+        path = os.path.abspath(os.path.join(self.root, filename))
+        # 不允许越出根目录 / Never leave the root directory
+        if os.path.commonpath([self.root, path]) != self.root:
+            return None
+        return path
+
+    def version(self, filename):
+        """
+        获取文件指纹。
+        Get a file's fingerprint.
+        Args:
+            filename: 相对于根目录的路径
+        Returns:
+            str/None: 指纹，文件不存在时为 None
+        """
+        path = self._resolve(filename)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        digest = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        version = digest.hexdigest()[:self.length]
+        with self._lock:
+            self._cache[path] = (key, version)
+        return version
@@ -0,0 +1,172 @@
+"""
+FileBrowser 静态资源缓存测试
+Tests for the FileBrowser static asset cache.
+"""
+import gzip
+
+import pytest
+
+import asset_cache
+from asset_cache import AssetCache, CachedAsset, UncachedResponse
+
+
+class FakeRaw:
+    def __init__(self, body):
+        self.body = body
+        self.read = 0
+
+    def stream(self, size, decode_content=True):
+        for i in range(0, len(self.body), size):
+            self.read += 1
+            yield self.body[i:i + size]
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = FakeRaw(body)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Upstream:
+    """按路径返回固定内容的假上游 / Fake upstream serving fixed content per path"""
+
+    def __init__(self):
+        self.files = {}
+        self.extra_headers = {}
+        self.calls = []
+        self.down = False
+
+    def __call__(self, path, headers):
+        self.calls.append((path, headers.get('If-None-Match')))
+        if self.down:
+            raise ConnectionError('upstream down')
+        if path not in self.files:
+            return FakeResponse(404, b'not found')
+        etag, body, content_type = self.files[path]
+        if headers.get('If-None-Match') == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, body, dict({'ETag': etag, 'Content-Type': content_type}, **self.extra_headers))
+
+
+@pytest.fixture
+def upstream():
+    up = Upstream()
+    up.files['/static/js/app.js'] = ('"v1"', b'console.log(1);' * 200, 'application/javascript')
+    up.files['/static/img/logo.png'] = ('"p1"', b'\x89PNG' * 500, 'image/png')
+    return up
+
+
+def test_miss_then_memory_hit_with_gzip_variant(upstream):
+    cache = AssetCache(upstream)
+    asset = cache.get('/static/js/app.js')
+    assert cache.get('/static/js/app.js') is asset
+    assert len(upstream.calls) == 1
+    encoding, body = asset.select('gzip, deflate')
+    assert encoding == 'gzip' and gzip.decompress(body) == asset.body
+    assert asset.select('identity') == (None, asset.body)
+    assert asset.select('gzip;q=0') == (None, asset.body)
+    assert cache.get('/static/img/logo.png').variants == {}
+    assert cache.stats()['hits'] == 1
+
+
+def test_etags_and_conditional_match(upstream):
+    asset = AssetCache(upstream).get('/static/js/app.js')
+    assert asset.variant_etag(None) == '"v1"'
+    assert asset.variant_etag('gzip') == '"v1-gzip"'
+    assert asset.matches('"v1-gzip"') and asset.matches('W/"v1"') and asset.matches('"x", "v1"') and asset.matches('*')
+    assert not asset.matches('"v2"') and not asset.matches(None)
+
+
+def test_revalidation_keeps_or_replaces(upstream):
+    now = [0.0]
+    cache = AssetCache(upstream, revalidate_after=10, clock=lambda: now[0])
+    first = cache.get('/static/js/app.js')
+    now[0] = 11
+    assert cache.get('/static/js/app.js') is first
+    assert upstream.calls[-1] == ('/static/js/app.js', '"v1"')
+    upstream.files['/static/js/app.js'] = ('"v2"', b'console.log(2);' * 200, 'application/javascript')
+    now[0] = 22
+    second = cache.get('/static/js/app.js')
+    assert second.etag == '"v2"' and b'2' in second.body
+
+
+def test_stale_copy_served_when_upstream_down(upstream):
+    now = [0.0]
+    cache = AssetCache(upstream, revalidate_after=10, clock=lambda: now[0])
+    asset = cache.get('/static/js/app.js')
+    upstream.down = True
+    now[0] = 60
+    assert cache.get('/static/js/app.js') is asset
+    with pytest.raises(OSError):
+        cache.get('/static/js/other.js')
+
+
+def test_uncacheable_responses_are_relayed_and_remembered(upstream):
+    now = [0.0]
+    cache = AssetCache(upstream, max_asset_size=1000, revalidate_after=10, clock=lambda: now[0])
+    missing = cache.get('/static/missing.js')
+    assert isinstance(missing, UncachedResponse) and missing.status_code == 404
+    assert b''.join(missing.iter_body()) == b'not found'
+    assert missing.response.closed
+
+    # 超过大小上限：已读取的部分与剩余部分一起转发 / Oversize: the part already read is relayed with the rest
+    oversize = cache.get('/static/js/app.js')
+    assert isinstance(oversize, UncachedResponse) and oversize.status_code == 200
+    assert b''.join(oversize.iter_body()) == upstream.files['/static/js/app.js'][1]
+    assert cache.stats()['entries'] == 0
+
+    # 间隔内不再经过缓存，由调用方直接代理 / Within the interval the cache steps aside and the caller proxies directly
+    calls = len(upstream.calls)
+    assert cache.get('/static/missing.js') is None
+    assert cache.get('/static/js/app.js') is None
+    assert len(upstream.calls) == calls
+    now[0] = 11
+    assert isinstance(cache.get('/static/js/app.js'), UncachedResponse)
+    assert len(upstream.calls) == calls + 1
+
+
+def test_no_store_response_relayed_without_reading(upstream):
+    upstream.files['/static/private.js'] = ('"s1"', b'secret', 'application/javascript')
+    upstream.extra_headers['Cache-Control'] = 'no-store'
+    relayed = AssetCache(upstream).get('/static/private.js')
+    assert isinstance(relayed, UncachedResponse) and relayed.response.raw.read == 0
+    assert b''.join(relayed.iter_body()) == b'secret'
+
+
+def test_memory_limit_evicts_least_recently_used(upstream):
+    cache = AssetCache(upstream, max_memory=2500)
+    cache.get('/static/js/app.js')
+    cache.get('/static/img/logo.png')
+    assert cache.stats()['memory_bytes'] <= 2500
+    assert cache.stats()['entries'] == 1
+
+
+def test_disk_cache_survives_restart(upstream, tmp_path):
+    AssetCache(upstream, cache_dir=str(tmp_path)).get('/static/js/app.js')
+    upstream.down = True
+    asset = AssetCache(upstream, cache_dir=str(tmp_path)).get('/static/js/app.js')
+    assert asset.etag == '"v1"' and 'gzip' in asset.variants
+    assert len(upstream.calls) == 1
+
+
+def test_brotli_variant_preferred_when_available(upstream, monkeypatch):
+    class FakeBrotli:
+        @staticmethod
+        def compress(body):
+            return b'br' + body[:10]
+
+    monkeypatch.setattr(asset_cache, 'brotli', FakeBrotli)
+    asset = AssetCache(upstream).get('/static/js/app.js')
+    assert asset.select('gzip, br')[0] == 'br'
+    assert asset.select('gzip')[0] == 'gzip'
+
+
+def test_weak_upstream_etag_variants():
+    asset = CachedAsset('/static/a.css', 'W/"abc"', 'text/css', b'x', {'gzip': b'y'})
+    assert asset.variant_etag('gzip') == 'W/"abc-gzip"'
+    assert asset.matches('"abc-gzip"')
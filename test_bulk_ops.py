@@ -0,0 +1,133 @@
+"""
+批量容器操作测试（使用伪造的 Docker 客户端）
+Tests for bulk container operations against a fake Docker client.
+"""
+import logging
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+import pytest
+
+import utils
+from utils import bulk_container_operation, parse_bulk_timeout
+
+APP = types.SimpleNamespace(logger=logging.getLogger('test'))
+
+
+class FakeContainer:
+    def __init__(self, cid, calls, fail=False, block=None):
+        self.id = cid
+        self.calls = calls
+        self.fail = fail
+        self.block = block
+
+    def _act(self, name, **kwargs):
+        self.calls.append((self.id, name, kwargs))
+        if self.block is not None:
+            self.block.wait(5)
+        if self.fail:
+            raise docker.errors.APIError(f'{name} failed')
+
+    def start(self):
+        self._act('start')
+
+    def stop(self, timeout=None):
+        self._act('stop', timeout=timeout)
+
+    def restart(self, timeout=None):
+        self._act('restart', timeout=timeout)
+
+    def remove(self, force=False):
+        self._act('remove', force=force)
+
+
+class FakeClient:
+    def __init__(self, failing=(), blocking=(), block=None):
+        self.calls = []
+        self.failing = set(failing)
+        self.blocking = set(blocking)
+        self.block = block
+        self.containers = self
+
+    def get(self, cid):
+        if cid == 'missing':
+            raise docker.errors.NotFound('no such container')
+        return FakeContainer(cid, self.calls, fail=cid in self.failing,
+                             block=self.block if cid in self.blocking else None)
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def test_partial_failure_reports_each_container(executor):
+    """
+    部分容器失败时其余容器照常执行，结果顺序与请求一致
+    A failing container does not stop the others, and results keep the request order
+    """
+    client = FakeClient(failing={'b'})
+    results = bulk_container_operation(APP, client, executor, ['a', 'b', 'missing', 'c'], 'stop', timeout=7)
+    assert [(r['id'], r['status']) for r in results] == [('a', 'ok'), ('b', 'error'), ('missing', 'error'), ('c', 'ok')]
+    assert 'stop failed' in results[1]['message']
+    assert sorted(call for call in client.calls if call[0] != 'b') == [('a', 'stop', {'timeout': 7}), ('c', 'stop', {'timeout': 7})]
+
+
+def test_duplicate_ids_run_once(executor):
+    """
+    重复的容器ID只执行一次
+    Duplicate container IDs are acted on once
+    """
+    client = FakeClient()
+    results = bulk_container_operation(APP, client, executor, ['a', 'b', 'a', 'b', 'a'], 'remove')
+    assert [r['id'] for r in results] == ['a', 'b']
+    assert sorted(client.calls) == [('a', 'remove', {'force': True}), ('b', 'remove', {'force': True})]
+
+
+def test_unknown_action_rejected(executor):
+    """
+    不支持的操作直接拒绝，不调用 Docker
+    Unknown actions are rejected without calling Docker
+    """
+    client = FakeClient()
+    with pytest.raises(ValueError):
+        bulk_container_operation(APP, client, executor, ['a'], 'pause')
+    assert client.calls == []
+
+
+def test_every_action_is_time_bounded(executor, monkeypatch):
+    """
+    没有超时参数的操作（start）也有等待期限，超出记为 timeout
+    Actions without a timeout argument (start) are bounded too and reported as timeout
+    """
+    monkeypatch.setattr(utils, 'BULK_OPERATION_GRACE', 0.2)
+    block = threading.Event()
+    client = FakeClient(blocking={'slow'}, block=block)
+    try:
+        results = bulk_container_operation(APP, client, executor, ['slow', 'fast'], 'start', timeout=0, max_workers=4)
+    finally:
+        block.set()
+    assert [(r['id'], r['status']) for r in results] == [('slow', 'timeout'), ('fast', 'ok')]
+
+
+@pytest.mark.parametrize('value', [-1, 301, 'abc', None, 1.5, True, [10]])
+def test_timeout_validation_rejects(value):
+    """
+    timeout 必须是 0 到上限之间的整数
+    The timeout must be an integer between 0 and the maximum
+    """
+    with pytest.raises(ValueError):
+        parse_bulk_timeout(value, 300)
+
+
+@pytest.mark.parametrize('value,expected', [(0, 0), (300, 300), ('15', 15), (20.0, 20)])
+def test_timeout_validation_accepts(value, expected):
+    """
+    合法的 timeout 原样返回
+    Valid timeouts are returned as integers
+    """
+    assert parse_bulk_timeout(value, 300) == expected
@@ -0,0 +1,138 @@
+"""
+cgroup v2 容器统计读取测试（使用伪造的 sysfs 目录）
+Tests for the cgroup v2 container stats reader (against a fake sysfs tree).
+"""
+import logging
+import types
+
+from cgroup_stats import CgroupStatsCollector, CgroupStatsReader
+
+CID_A = 'a' * 64
+CID_B = 'b' * 64
+
+
+def write_cgroup(directory, usage_usec, memory, inactive=0, rbytes=0, wbytes=0, pids=1, limit='max'):
+    """
+    在指定目录写入一组 cgroup v2 统计文件
+    Write a set of cgroup v2 stat files into a directory
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / 'cpu.stat').write_text(f'usage_usec {usage_usec}\nuser_usec 0\nsystem_usec 0\n')
+    (directory / 'memory.current').write_text(f'{memory}\n')
+    (directory / 'memory.max').write_text(f'{limit}\n')
+    (directory / 'memory.stat').write_text(f'anon 0\ninactive_file {inactive}\n')
+    (directory / 'io.stat').write_text(f'8:0 rbytes={rbytes} wbytes={wbytes} rios=1 wios=1\n')
+    (directory / 'pids.current').write_text(f'{pids}\n')
+
+
+def make_tree(tmp_path):
+    """
+    同时包含 systemd 与 cgroupfs 两种驱动布局的伪造 cgroup 树
+    Fake cgroup tree containing both systemd and cgroupfs driver layouts
+    """
+    (tmp_path / 'cgroup.controllers').write_text('cpu io memory pids\n')
+    write_cgroup(tmp_path / 'system.slice' / f'docker-{CID_A}.scope', 1000, 600, inactive=100, rbytes=10, wbytes=20, limit='1000')
+    write_cgroup(tmp_path / 'docker' / CID_B, 0, 300, pids=4)
+    (tmp_path / 'system.slice' / 'ssh.service').mkdir()
+    return tmp_path
+
+
+def test_discover_and_read_all(tmp_path):
+    """
+    一次遍历发现并读取所有容器
+    All containers are discovered and read in one pass
+    """
+    reader = CgroupStatsReader(str(make_tree(tmp_path)))
+    assert reader.available()
+    assert set(reader.discover()) == {CID_A, CID_B}
+    stats = reader.read_all()
+    assert stats[CID_A]['mem_usage'] == 500
+    assert stats[CID_A]['mem_percent'] == 50.0
+    assert (stats[CID_A]['blk_read'], stats[CID_A]['blk_write']) == (10, 20)
+    assert stats[CID_B]['pids'] == 4
+    assert stats[CID_B]['mem_limit'] > 0
+
+
+def test_cpu_percent_from_deltas(tmp_path):
+    """
+    CPU% 由两次读取之间 usage_usec 的增量计算
+    CPU% is derived from the usage_usec delta between two reads
+    """
+    make_tree(tmp_path)
+    reader = CgroupStatsReader(str(tmp_path))
+    path = str(tmp_path / 'docker' / CID_B)
+    assert reader.read(CID_B, path, now=10.0)['cpu_percent'] == 0.0
+    write_cgroup(tmp_path / 'docker' / CID_B, 500000, 300)
+    assert reader.read(CID_B, path, now=11.0)['cpu_percent'] == 50.0
+
+
+def test_collector_falls_back_when_unreadable(tmp_path):
+    """
+    cgroup 读取失败时切换到 Docker API 采集器
+    The collector switches to the Docker API collector when cgroups cannot be read
+    """
+    container = types.SimpleNamespace(id=CID_A, name='web', status='running')
+    state = types.SimpleNamespace(containers=lambda: [container], add_listener=lambda callback: None)
+    fallback = types.SimpleNamespace(start=lambda: None, snapshot=lambda: {'docker': {}})
+    reader = CgroupStatsReader(str(make_tree(tmp_path)))
+    app = types.SimpleNamespace(logger=logging.getLogger('test'))
+    collector = CgroupStatsCollector(app, state, reader, fallback_factory=lambda: fallback)
+    collector.start()
+    assert collector.snapshot()[CID_A]['name'] == 'web'
+
+    def broken(ids):
+        raise PermissionError('denied')
+
+    reader.read_all = broken
+    collector._cached_at = 0
+    assert collector.snapshot() == {'docker': {}}
+    assert collector.fallback is fallback
+
+
+def test_missing_container_rediscovers_once_per_interval(tmp_path):
+    """
+    缺失的容器在间隔内不重复遍历，容器启动事件使下一次读取立即重新遍历
+    A missing container does not trigger a walk on every read; a start event forces the next read to rediscover
+    """
+    now = [100.0]
+    reader = CgroupStatsReader(str(make_tree(tmp_path)), rediscover_interval=30, clock=lambda: now[0])
+    reader.discover()
+    walks = []
+    original = reader.discover
+    reader.discover = lambda: walks.append(1) or original()
+    missing = 'c' * 64
+    for _ in range(5):
+        assert set(reader.read_all({CID_A, missing})) == {CID_A}
+    assert walks == []
+    now[0] += 31
+    reader.read_all({CID_A, missing})
+    assert len(walks) == 1
+
+    write_cgroup(tmp_path / 'docker' / missing, 0, 100)
+    assert missing not in reader.read_all({CID_A, missing})
+    reader.invalidate()
+    assert missing in reader.read_all({CID_A, missing})
+    assert len(walks) == 2
+
+
+def test_network_counters_from_proc(tmp_path):
+    """
+    网络流量从容器进程的 /proc/<pid>/net/dev 读取，回环接口不计入；无法读取时为 None
+    Network counters come from /proc/<pid>/net/dev of a container process, excluding loopback; None when unreadable
+    """
+    (tmp_path / 'cgroup').mkdir()
+    make_tree(tmp_path / 'cgroup')
+    proc = tmp_path / 'proc'
+    (proc / '42' / 'net').mkdir(parents=True)
+    (proc / '42' / 'net' / 'dev').write_text(
+        'Inter-|   Receive                                                |  Transmit\n'
+        ' face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n'
+        '    lo:    900      9    0    0    0     0          0         0      900      9    0    0    0     0       0          0\n'
+        '  eth0:   1500     10    0    0    0     0          0         0      700      7    0    0    0     0       0          0\n'
+        '  eth1:    500      5    0    0    0     0          0         0      300      3    0    0    0     0       0          0\n')
+    (tmp_path / 'cgroup' / 'docker' / CID_B / 'cgroup.procs').write_text('42\n43\n')
+    reader = CgroupStatsReader(str(tmp_path / 'cgroup'), proc_root=str(proc))
+    reader.discover()
+    stats = reader.read_all()
+    assert (stats[CID_B]['net_rx'], stats[CID_B]['net_tx']) == (2000, 1000)
+    assert (stats[CID_A]['net_rx'], stats[CID_A]['net_tx']) == (None, None)
@@ -0,0 +1,186 @@
+"""
+容器日志流式读取测试
+Tests for streaming container log reading.
+"""
+import gzip
+import threading
+import time
+
+import pytest
+
+from container_logs import (format_entry, gzip_stream, iter_container_logs, iter_lines, parse_cursor,
+                            parse_docker_timestamp, parse_time, read_page)
+
+
+class FakeContainer:
+    """
+    按 stdout/stderr 返回预设日志块的容器
+    Container returning canned log chunks per stream
+    """
+
+    def __init__(self, stdout, stderr, block=None):
+        self.chunks = {'stdout': stdout, 'stderr': stderr}
+        self.block = block
+        self.calls = []
+
+    def logs(self, **kwargs):
+        name = 'stdout' if kwargs['stdout'] else 'stderr'
+        self.calls.append(kwargs)
+
+        def generate():
+            yield from self.chunks[name]
+            if self.block is not None:
+                self.block.wait(2)
+        return generate()
+
+
+def test_iter_lines_handles_split_chunks_and_long_lines():
+    """
+    跨块的行被拼接，超长行被分段
+    Lines split across chunks are joined; overlong lines are emitted in pieces
+    """
+    assert list(iter_lines([b'ab', b'c\nde\r\n', b'f'])) == [b'abc', b'de', b'f']
+    assert list(iter_lines([b'x' * 10], max_line=4)) == [b'xxxx', b'xxxx', b'xx']
+
+
+def test_time_parsing():
+    """
+    支持时间戳、ISO时间、相对时长与 Docker 纳秒时间戳
+    Timestamps, ISO times, relative durations and Docker nanosecond stamps are parsed
+    """
+    assert parse_time('1700000000') == 1700000000.0
+    assert parse_time('1970-01-01T00:01:00Z') == 60.0
+    assert parse_time('10m', now=1000.0) == 400.0
+    assert parse_time('') is None
+    with pytest.raises(ValueError):
+        parse_time('yesterday')
+    assert parse_docker_timestamp('1970-01-01T00:00:01.500000000Z') == 1.5
+
+
+def test_streams_are_merged_by_time():
+    """
+    非跟随模式按时间戳归并 stdout 与 stderr，并保留来源
+    Without follow, stdout and stderr are merged by timestamp and keep their source
+    """
+    container = FakeContainer(
+        [b'1970-01-01T00:00:01Z a\n1970-01-01T00:00:03Z c\n'],
+        [b'1970-01-01T00:00:02Z b\n']
+    )
+    entries = list(iter_container_logs(container, since=1.0, tail=10))
+    assert [(e['stream'], e['line']) for e in entries] == [('stdout', 'a'), ('stderr', 'b'), ('stdout', 'c')]
+    assert all(call['since'] == 1.0 and call['tail'] == 10 and call['timestamps'] for call in container.calls)
+
+
+def test_follow_yields_heartbeats_and_stops_on_close():
+    """
+    跟随模式空闲时产出 None，关闭生成器后读取线程退出
+    Follow mode yields None while idle, and reader threads exit once the generator is closed
+    """
+    block = threading.Event()
+    container = FakeContainer([b'1970-01-01T00:00:01Z hello\n'], [], block=block)
+    entries = iter_container_logs(container, streams=('stdout',), follow=True, idle_timeout=0.01)
+    assert next(entries)['line'] == 'hello'
+    assert next(entries) is None
+    entries.close()
+    block.set()
+    assert container.calls[0]['follow'] is True
+
+
+def test_gzip_export_and_pages():
+    """
+    导出为合法 gzip；分页按游标向前/向后读取
+    Exports are valid gzip; pages move older/newer by cursor
+    """
+    lines = [f'1970-01-01T00:00:{i:02d}Z line {i}\n'.encode() for i in range(1, 6)]
+    container = FakeContainer(lines, [])
+    data = b''.join(gzip_stream(format_entry(e) for e in iter_container_logs(container, streams=('stdout',))))
+    assert gzip.decompress(data).decode().splitlines()[0] == '1970-01-01T00:00:01.000000Z stdout line 1'
+
+    class RangeContainer(FakeContainer):
+        def logs(self, **kwargs):
+            since, until = kwargs.get('since', 0), kwargs.get('until', 1e9)
+            return iter([l for l in lines if since <= int(l[17:19]) <= until]) if kwargs['stdout'] else iter([])
+
+    container = RangeContainer([], [])
+    newest = read_page(container, cursor=None, limit=2)
+    assert [e['line'] for e in newest['entries']] == ['line 4', 'line 5']
+    older = read_page(container, cursor=newest['older'], limit=2)
+    assert [e['line'] for e in older['entries']] == ['line 2', 'line 3']
+    newer = read_page(container, cursor=older['newer'], limit=1, direction='newer')
+    assert [e['line'] for e in newer['entries']] == ['line 4']
+
+
+def datetime_stamp(ts):
+    """
+    Unix 时间转 Docker 时间戳
+    Unix time to a Docker timestamp
+    """
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+
+def test_older_pages_read_bounded_windows():
+    """
+    向前翻页只读取游标前的时间窗口，行数不够时窗口加倍，不从日志开头读起
+    Older pages read time windows ending at the cursor, doubling when short, instead of the whole log
+    """
+    stamps = [10, 5000, 5010, 5020, 5030]
+    lines = [f'{datetime_stamp(ts)} line {ts}\n'.encode() for ts in stamps]
+
+    class RangeContainer(FakeContainer):
+        attrs = {'Created': '1970-01-01T00:00:05Z'}
+
+        def logs(self, **kwargs):
+            self.calls.append(kwargs)
+            since, until = kwargs.get('since', 0), kwargs.get('until', 1e12)
+            return iter([l for l, ts in zip(lines, stamps) if since <= ts <= until]) if kwargs['stdout'] else iter([])
+
+    container = RangeContainer([], [])
+    page = read_page(container, streams=('stdout',), cursor=5031, limit=2, window=60)
+    assert [e['line'] for e in page['entries']] == ['line 5020', 'line 5030']
+    assert [c['since'] for c in container.calls] == [pytest.approx(4971)]
+
+    container.calls.clear()
+    page = read_page(container, streams=('stdout',), cursor=page['older'], limit=3, window=60)
+    assert [e['line'] for e in page['entries']] == ['line 10', 'line 5000', 'line 5010']
+    assert min(c['since'] for c in container.calls) == 5
+
+
+
+def test_pages_split_lines_sharing_a_microsecond():
+    """
+    同一微秒内的多行跨页时，向前、向后翻页都不丢失也不重复
+    Lines sharing one microsecond split across pages are neither lost nor repeated in either direction
+    """
+    nanos = [5_000_000_000, 10_000_001_100, 10_000_001_200, 10_000_001_300, 10_000_001_400, 12_000_000_000]
+    lines = [f'1970-01-01T00:00:{ns // 10 ** 9:02d}.{ns % 10 ** 9:09d}Z line {i}\n'.encode() for i, ns in enumerate(nanos)]
+
+    class NanoContainer(FakeContainer):
+        attrs = {'Created': '1970-01-01T00:00:01Z'}
+
+        def logs(self, **kwargs):
+            # Docker 的 since/until 截断到微秒 / Docker truncates since/until to microseconds
+            since = int(kwargs.get('since', 0) * 1e6) * 1000
+            until = int(kwargs.get('until', 1e9) * 1e6) * 1000
+            return iter([l for l, ns in zip(lines, nanos) if since <= ns <= until]) if kwargs['stdout'] else iter([])
+
+    container = NanoContainer([], [])
+    seen, cursor = [], None
+    while True:
+        page = read_page(container, streams=('stdout',), cursor=cursor, limit=2, window=1)
+        if not page['entries']:
+            break
+        seen = [e['line'] for e in page['entries']] + seen
+        cursor = page['older']
+    assert seen == [f'line {i}' for i in range(6)]
+
+    seen, cursor = [], '0'
+    while True:
+        page = read_page(container, streams=('stdout',), cursor=cursor, limit=2, direction='newer')
+        if not page['entries']:
+            break
+        seen += [e['line'] for e in page['entries']]
+        cursor = page['newer']
+    assert seen == [f'line {i}' for i in range(6)]
+    assert parse_cursor('10.000001:2') == (10000001, 2)
+    with pytest.raises(ValueError):
+        parse_cursor('10:-1')
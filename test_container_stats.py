@@ -0,0 +1,115 @@
+"""
+容器统计采集器测试
+Tests for the container stats collector.
+"""
+import logging
+import threading
+import types
+
+from container_stats import ContainerStatsCollector, compute_stats
+
+
+def raw_sample(total, system, usage):
+    """
+    构造一条 Docker stats 原始数据
+    Build a raw Docker stats sample
+    """
+    return {
+        'name': '/web',
+        'cpu_stats': {'cpu_usage': {'total_usage': total}, 'system_cpu_usage': system, 'online_cpus': 2},
+        'precpu_stats': {'cpu_usage': {'total_usage': 100}, 'system_cpu_usage': 1000},
+        'memory_stats': {'usage': usage, 'limit': 1000, 'stats': {'inactive_file': 100}},
+        'networks': {'eth0': {'rx_bytes': 5, 'tx_bytes': 7}},
+        'pids_stats': {'current': 3}
+    }
+
+
+def test_compute_stats():
+    """
+    CPU% 按在线核数折算，内存扣除缓存并计算增量
+    CPU% is scaled by online CPUs; memory excludes cache and reports a delta
+    """
+    first = compute_stats(raw_sample(200, 2000, 600))
+    assert first['cpu_percent'] == 20.0
+    assert first['mem_usage'] == 500 and first['mem_percent'] == 50.0
+    assert first['net_rx'] == 5 and first['pids'] == 3
+    second = compute_stats(raw_sample(200, 2000, 700), first)
+    assert second['mem_delta'] == 100
+
+
+class FakeState:
+    def __init__(self, containers):
+        self.items = containers
+        self.listeners = []
+
+    def containers(self):
+        return self.items
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+
+def test_subscriptions_follow_container_events():
+    """
+    容器启动时订阅、停止时取消订阅
+    Subscriptions are opened on start and dropped on stop
+    """
+    release = threading.Event()
+
+    def stats(cid, stream, decode):
+        yield raw_sample(200, 2000, 600)
+        release.wait(1)
+
+    client = types.SimpleNamespace(api=types.SimpleNamespace(stats=stats))
+    web = types.SimpleNamespace(id='a' * 64, name='web', status='running')
+    db = types.SimpleNamespace(id='b' * 64, name='db', status='exited')
+    state = FakeState([web, db])
+    app = types.SimpleNamespace(logger=logging.getLogger('test'))
+    collector = ContainerStatsCollector(app, client, state)
+    collector.start()
+    for _ in range(100):
+        if collector.snapshot():
+            break
+        threading.Event().wait(0.01)
+    assert list(collector.snapshot()) == [web.id]
+    assert collector.snapshot()[web.id]['name'] == 'web'
+    state.listeners[0]('die', web.id, None)
+    assert collector.snapshot() == {}
+    release.set()
+
+
+def test_stream_error_resubscribes_while_running():
+    """
+    统计流出错后容器仍在运行则退避重订阅，容器停止后不再重试
+    A failed stats stream is resubscribed after a backoff while the container runs, and abandoned once it stops
+    """
+    calls = []
+    resumed = threading.Event()
+    release = threading.Event()
+
+    def stats(cid, stream, decode):
+        calls.append(cid)
+        if len(calls) == 1:
+            raise ConnectionError('stream reset')
+        yield raw_sample(200, 2000, 600)
+        resumed.set()
+        release.wait(1)
+
+    client = types.SimpleNamespace(api=types.SimpleNamespace(stats=stats))
+    web = types.SimpleNamespace(id='a' * 64, name='web', status='running')
+    state = FakeState([web])
+    app = types.SimpleNamespace(logger=logging.getLogger('test'))
+    collector = ContainerStatsCollector(app, client, state, retry_initial=0.01, retry_max=0.05)
+    collector.start()
+    assert resumed.wait(1)
+    assert len(calls) == 2
+    assert collector.snapshot()[web.id]['name'] == 'web'
+
+    web.status = 'exited'
+    release.set()
+    for _ in range(100):
+        if not collector.snapshot():
+            break
+        threading.Event().wait(0.01)
+    assert collector.snapshot() == {}
+    assert len(calls) == 2
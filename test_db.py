@@ -0,0 +1,39 @@
+"""
+SQLite 连接管理测试
+Tests for SQLite connection management.
+"""
+import threading
+
+from db import ConnectionManager
+
+
+def test_per_thread_connections_in_wal_mode(tmp_path):
+    """
+    同一线程复用连接，不同线程各自连接；数据库为 WAL 模式
+    A thread reuses its connection, other threads get their own; the database runs in WAL mode
+    """
+    manager = ConnectionManager(str(tmp_path / 'users.db'))
+    db = manager.connection()
+    assert manager.connection() is db
+    assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert db.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+    other = []
+    thread = threading.Thread(target=lambda: other.append(manager.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not db
+
+
+def test_release_rolls_back_and_transaction_commits(tmp_path):
+    """
+    release 回滚未提交的写入；transaction 正常结束时提交
+    release rolls back uncommitted writes; transaction commits on success
+    """
+    manager = ConnectionManager(str(tmp_path / 'users.db'))
+    with manager.transaction() as db:
+        db.execute('CREATE TABLE users (name TEXT)')
+        db.execute("INSERT INTO users VALUES ('kept')")
+    db.execute("INSERT INTO users VALUES ('dropped')")
+    manager.release()
+    assert not db.in_transaction
+    assert [row[0] for row in db.execute('SELECT name FROM users')] == ['kept']
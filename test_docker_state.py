@@ -0,0 +1,95 @@
+"""
+Docker状态缓存测试
+Tests for the event-driven Docker state cache.
+
+- 使用假的 Docker 客户端，无需真实 Docker 守护进程
+- Uses a fake Docker client, no real Docker daemon required
+"""
+import logging
+import types
+
+import docker
+import pytest
+
+from docker_state import DockerStateCache
+
+
+class FakeContainer:
+    def __init__(self, cid, name, created):
+        self.id = cid
+        self.name = name
+        self.attrs = {'Created': created}
+
+
+class FakeClient:
+    """
+    假 Docker 客户端，记录 list 调用次数
+    Fake Docker client counting list calls
+    """
+    def __init__(self, containers):
+        self.store = {c.id: c for c in containers}
+        self.list_calls = 0
+        self.containers = types.SimpleNamespace(list=self._list, get=self._get)
+        self.images = types.SimpleNamespace(list=lambda: ['img'])
+
+    def _list(self, all=False):
+        self.list_calls += 1
+        return list(self.store.values())
+
+    def _get(self, cid):
+        if cid not in self.store:
+            raise docker.errors.NotFound('gone')
+        return self.store[cid]
+
+
+@pytest.fixture
+def cache():
+    """
+    已完成一次同步的状态缓存
+    State cache after an initial seed
+    """
+    client = FakeClient([FakeContainer('a', 'Alpha', '2025-01-01'), FakeContainer('b', 'beta', '2025-02-01')])
+    app = types.SimpleNamespace(logger=logging.getLogger('test'))
+    state = DockerStateCache(app, client)
+    state.force_resync()
+    state._stale = False
+    return state
+
+
+def test_reads_served_from_cache(cache):
+    """
+    同步后多次读取不再访问 Docker
+    Repeated reads after the seed do not hit Docker
+    """
+    calls = cache.client.list_calls
+    assert [c.id for c in cache.containers()] == ['b', 'a']
+    assert cache.container_names() == {'alpha', 'beta'}
+    assert cache.client.list_calls == calls
+
+
+def test_events_update_state_and_version(cache):
+    """
+    容器事件增量更新缓存并自增版本号
+    Container events update the cache incrementally and bump the version
+    """
+    events = []
+    cache.add_listener(lambda action, cid, c: events.append((action, cid)))
+    version = cache.version
+    cache.client.store['c'] = FakeContainer('c', 'gamma', '2025-03-01')
+    cache._handle_event({'Type': 'container', 'Action': 'create', 'id': 'c'})
+    cache._handle_event({'Type': 'container', 'Action': 'destroy', 'id': 'a'})
+    cache._handle_event({'Type': 'container', 'Action': 'exec_start: sh', 'id': 'b'})
+    assert [c.id for c in cache.containers()] == ['c', 'b']
+    assert cache.version == version + 2
+    assert events == [('create', 'c'), ('destroy', 'a')]
+
+
+def test_stale_cache_resyncs_on_read(cache):
+    """
+    事件流断开后读取会触发强制同步
+    Reads force a resync while the event stream is down
+    """
+    cache._stale = True
+    cache._last_resync = 0
+    cache.client.store.pop('a')
+    assert [c.id for c in cache.containers()] == ['b']
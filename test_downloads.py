@@ -0,0 +1,83 @@
+"""
+数据目录直接下载测试
+Tests for direct data directory downloads.
+"""
+import os
+from email.utils import formatdate
+
+import pytest
+
+from downloads import (OutsideScope, RangeNotSatisfiable, file_validators, if_range_matches, iter_file_range,
+                       iter_multipart, multipart_length, parse_ranges, resolve_download, scope_root)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / 'alice' / 'movies').mkdir(parents=True)
+    (tmp_path / 'alice' / 'movies' / 'film.mp4').write_bytes(bytes(range(256)) * 40)
+    (tmp_path / 'bob').mkdir()
+    (tmp_path / 'bob' / 'secret.txt').write_text('secret')
+    os.symlink(tmp_path / 'bob', tmp_path / 'alice' / 'escape')
+    return tmp_path
+
+
+def test_scope_confinement(data_dir):
+    root = scope_root(str(data_dir), '/alice')
+    assert root == os.path.realpath(data_dir / 'alice')
+    assert scope_root(str(data_dir), '/') == os.path.realpath(data_dir)
+    assert resolve_download(root, 'movies/film.mp4').endswith('film.mp4')
+    with pytest.raises(OutsideScope):
+        resolve_download(root, '../bob/secret.txt')
+    with pytest.raises(OutsideScope):
+        resolve_download(root, 'escape/secret.txt')
+    with pytest.raises(OutsideScope):
+        scope_root(str(data_dir), '/../..')
+    with pytest.raises(FileNotFoundError):
+        resolve_download(root, 'movies')
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('bytes=0-99', [(0, 99)]),
+    ('bytes=900-', [(900, 999)]),
+    ('bytes=-100', [(900, 999)]),
+    ('bytes=-5000', [(0, 999)]),
+    ('bytes=0-99,50-149,500-599', [(0, 149), (500, 599)]),
+    ('bytes=0-9,10-19', [(0, 19)]),
+    ('bytes=990-5000', [(990, 999)]),
+    ('items=0-1', None),
+    ('bytes=abc', None),
+    ('bytes=9-1', None),
+    (','.join(['bytes=0-0'] + [f'{i * 10}-{i * 10}' for i in range(1, 20)]), None),
+])
+def test_parse_ranges(header, expected):
+    assert parse_ranges(header, 1000) == expected
+
+
+@pytest.mark.parametrize('header, size', [('bytes=1000-', 1000), ('bytes=-0', 1000), ('bytes=0-', 0)])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_ranges(header, size)
+
+
+def test_if_range(data_dir):
+    st = os.stat(data_dir / 'alice' / 'movies' / 'film.mp4')
+    etag, last_modified = file_validators(st)
+    assert if_range_matches(None, etag, st.st_mtime)
+    assert if_range_matches(etag, etag, st.st_mtime)
+    assert not if_range_matches('"other"', etag, st.st_mtime)
+    assert not if_range_matches('W/' + etag, etag, st.st_mtime)
+    assert if_range_matches(last_modified, etag, st.st_mtime)
+    assert not if_range_matches(formatdate(st.st_mtime - 60, usegmt=True), etag, st.st_mtime)
+    assert not if_range_matches('garbage', etag, st.st_mtime)
+
+
+def test_range_bodies(data_dir):
+    path = str(data_dir / 'alice' / 'movies' / 'film.mp4')
+    content = open(path, 'rb').read()
+    assert b''.join(iter_file_range(path, 100, 300, chunk_size=64)) == content[100:400]
+    ranges = [(0, 9), (5000, 5099)]
+    body = b''.join(iter_multipart(path, ranges, len(content), 'video/mp4', 'XYZ', chunk_size=32))
+    assert len(body) == multipart_length(ranges, len(content), 'video/mp4', 'XYZ')
+    assert b'Content-Range: bytes 5000-5099/10240\r\n\r\n' + content[5000:5100] in body
+    assert body.endswith(b'\r\n--XYZ--\r\n')
@@ -0,0 +1,81 @@
+"""
+SSE广播器测试
+Tests for the SSE broadcaster.
+"""
+from event_stream import EventBroadcaster
+
+
+def test_fan_out_to_all_subscribers():
+    """
+    一次发布分发给所有订阅者
+    One publish reaches every subscriber
+    """
+    bus = EventBroadcaster(queue_size=4)
+    a, b = bus.subscribe(), bus.subscribe()
+    bus.publish('resource', {'cpu': 1})
+    expected = 'event: resource\ndata: {"cpu":1}\n\n'
+    assert a.queue.get_nowait() == expected
+    assert b.queue.get_nowait() == expected
+
+
+def test_slow_client_drops_oldest_then_disconnects():
+    """
+    慢客户端先丢弃最旧事件，持续积压后被断开
+    A slow client first loses its oldest events, then gets disconnected
+    """
+    bus = EventBroadcaster(queue_size=2, max_dropped=2)
+    slow = bus.subscribe()
+    for i in range(4):
+        bus.publish('tick', i)
+    assert [slow.queue.get_nowait() for _ in range(2)] == [bus.format_event('tick', 2), bus.format_event('tick', 3)]
+    for i in range(5):
+        bus.publish('tick', i)
+    assert slow.closed
+    assert bus.client_count == 0
+
+
+def test_stream_heartbeat_and_cleanup():
+    """
+    空闲时输出心跳，关闭生成器后自动取消订阅
+    Heartbeats are emitted while idle and closing the generator unsubscribes
+    """
+    bus = EventBroadcaster(queue_size=2, heartbeat_interval=0.01, max_clients=1)
+    sub = bus.subscribe()
+    assert bus.subscribe() is None
+    gen = bus.stream(sub, initial=[('hello', {})])
+    assert next(gen).startswith('retry:')
+    assert next(gen) == 'event: hello\ndata: {}\n\n'
+    assert next(gen) == ': heartbeat\n\n'
+    gen.close()
+    assert bus.client_count == 0
+
+
+def test_unsubscribe_without_iterating_frees_slot():
+    """
+    响应从未被迭代时，显式取消订阅也能释放名额，且可重复调用
+    A never-iterated stream still frees its slot through an explicit, idempotent unsubscribe
+    """
+    bus = EventBroadcaster(max_clients=1)
+    sub = bus.subscribe()
+    gen = bus.stream(sub)
+    gen.close()  # 未启动的生成器关闭时不会执行 finally / closing an unstarted generator skips finally
+    assert bus.client_count == 1
+    bus.unsubscribe(sub)
+    bus.unsubscribe(sub)
+    assert bus.client_count == 0
+    assert bus.subscribe() is not None
+
+
+def test_owned_events_reach_owner_and_admins_only():
+    """
+    带 owner 的事件只发给该用户与管理员
+    Events with an owner reach only that user and admins
+    """
+    bus = EventBroadcaster(queue_size=4)
+    owner, other, admin = bus.subscribe('1'), bus.subscribe('2'), bus.subscribe('3', is_admin=True)
+    bus.publish('job', {'id': 'j', 'params': {'image': 'secret'}}, owner='1')
+    assert owner.queue.qsize() == 1
+    assert admin.queue.qsize() == 1
+    assert other.queue.empty()
+    bus.publish('resource', {'cpu': 1})
+    assert other.queue.qsize() == 1
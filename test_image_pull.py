@@ -0,0 +1,140 @@
+"""
+镜像拉取进度解析测试
+Tests for Docker pull stream progress parsing.
+"""
+import logging
+import threading
+import types
+
+import pytest
+
+from image_pull import PullCoordinator, PullProgress, normalize_reference
+
+APP = types.SimpleNamespace(logger=logging.getLogger('test'))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_byte_progress_excludes_existing_layers():
+    """
+    已存在的层不计入总字节，下载与解压各占一半进度
+    Existing layers are not counted; download and extraction weigh half each
+    """
+    clock = FakeClock()
+    progress = PullProgress(clock=clock)
+    progress.feed({'status': 'Pulling from library/nginx', 'id': 'latest'})
+    progress.feed({'status': 'Already exists', 'id': 'base'})
+    progress.feed({'status': 'Pulling fs layer', 'id': 'l1'})
+    progress.feed({'status': 'Downloading', 'id': 'l1', 'progressDetail': {'current': 0, 'total': 1000}})
+    clock.now = 1.0
+    progress.feed({'status': 'Downloading', 'id': 'l1', 'progressDetail': {'current': 500, 'total': 1000}})
+    assert progress.total_bytes == 1000
+    assert progress.downloaded_bytes == 500
+    assert progress.fraction() == 0.25
+    assert progress.rate == 500
+    assert progress.eta() == 1
+    assert progress.to_dict()['layers_existing'] == 1
+
+    progress.feed({'status': 'Download complete', 'id': 'l1'})
+    progress.feed({'status': 'Extracting', 'id': 'l1', 'progressDetail': {'current': 500, 'total': 1000}})
+    assert progress.fraction() == 0.75
+    progress.feed({'status': 'Pull complete', 'id': 'l1'})
+    progress.feed({'status': 'Digest: sha256:abc'})
+    assert progress.complete and progress.fraction() == 1.0
+    assert progress.digest == 'sha256:abc'
+
+
+def test_error_line_raises():
+    """
+    拉取流中的错误消息会抛出异常并保留原因
+    Error messages in the stream raise with the original reason
+    """
+    with pytest.raises(RuntimeError, match='manifest unknown'):
+        PullProgress().feed({'error': 'manifest unknown'})
+
+
+def test_normalize_reference():
+    """
+    不同写法的同一镜像得到相同的键
+    Different spellings of one image yield the same key
+    """
+    assert normalize_reference('nginx') == 'docker.io/library/nginx:latest'
+    assert normalize_reference('docker.io/library/nginx:latest') == 'docker.io/library/nginx:latest'
+    assert normalize_reference('ghcr.io/foo/bar:1.0') == 'ghcr.io/foo/bar:1.0'
+    assert normalize_reference('localhost:5000/app') == 'localhost:5000/app:latest'
+    assert normalize_reference('nginx@sha256:abc') == 'docker.io/library/nginx@sha256:abc'
+
+
+def test_concurrent_pulls_share_one_stream():
+    """
+    并发拉取同一镜像只打开一个拉取流，所有请求者得到进度与结果
+    Concurrent pulls of one image open a single stream; every requester gets progress and the result
+    """
+    release = threading.Event()
+    calls = []
+
+    def stream_factory(image):
+        calls.append(image)
+        yield {'status': 'Downloading', 'id': 'l1', 'progressDetail': {'current': 10, 'total': 100}}
+        release.wait(2)
+        yield {'status': 'Pull complete', 'id': 'l1'}
+        yield {'status': 'Digest: sha256:abc'}
+
+    coordinator = PullCoordinator(APP, stream_factory)
+    seen = {'a': [], 'b': []}
+    results = {}
+
+    def run(name, image):
+        results[name] = coordinator.pull(image, on_progress=lambda p: seen[name].append(p.fraction()), poll_interval=0.01)
+
+    first = threading.Thread(target=run, args=('a', 'nginx'))
+    first.start()
+    while not seen['a']:
+        threading.Event().wait(0.01)
+    second = threading.Thread(target=run, args=('b', 'docker.io/library/nginx:latest'))
+    second.start()
+    while not seen['b']:
+        threading.Event().wait(0.01)
+    assert coordinator.inflight()[0]['subscribers'] == 2
+    release.set()
+    first.join(2)
+    second.join(2)
+    assert calls == ['nginx']
+    assert seen['b'][-1] == 1.0
+    assert not results['a']['shared'] and results['b']['shared']
+    assert results['b']['digest'] == 'sha256:abc'
+    assert coordinator.inflight() == []
+
+
+def test_failure_is_delivered_and_cancel_detaches():
+    """
+    拉取失败传递给请求者；请求者取消后拉取中止
+    Pull failures reach the requester; the pull is aborted once its requester cancels
+    """
+    coordinator = PullCoordinator(APP, lambda image: iter([{'error': 'manifest unknown'}]))
+    with pytest.raises(RuntimeError, match='manifest unknown'):
+        coordinator.pull('nginx:missing', poll_interval=0.01)
+
+    def endless(image):
+        while True:
+            yield {'status': 'Downloading', 'id': 'l1', 'progressDetail': {'current': 1, 'total': 100}}
+            threading.Event().wait(0.01)
+
+    coordinator = PullCoordinator(APP, endless)
+
+    def cancelled():
+        raise InterruptedError()
+
+    with pytest.raises(InterruptedError):
+        coordinator.pull('nginx', check_cancelled=cancelled, poll_interval=0.01)
+    for _ in range(200):
+        if not coordinator.inflight():
+            break
+        threading.Event().wait(0.01)
+    assert coordinator.inflight() == []
@@ -0,0 +1,119 @@
+"""
+后台任务调度器测试
+Tests for the background job scheduler.
+"""
+import logging
+import threading
+import types
+
+import pytest
+
+from jobs import CANCELLED, FAILED, SUCCEEDED, JobQueueFull, JobScheduler
+
+APP = types.SimpleNamespace(logger=logging.getLogger('test'))
+
+
+def wait_for(job, states, timeout=2):
+    """
+    等待任务进入指定状态
+    Wait until the job reaches one of the given states
+    """
+    for _ in range(int(timeout / 0.01)):
+        if job.status in states:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f'job stuck in {job.status}')
+
+
+def test_jobs_succeed_and_keep_failure_reason():
+    """
+    成功任务进度为100，失败任务保留原因与历史
+    Successful jobs end at 100%; failed jobs keep their reason and history
+    """
+    scheduler = JobScheduler(APP, max_workers=1)
+    scheduler.start()
+    ok = scheduler.submit('install', '1', lambda job: job.update(progress=50, stage='pulling'))
+    bad = scheduler.submit('install', '1', lambda job: (_ for _ in ()).throw(RuntimeError('manifest unknown')))
+    wait_for(ok, {SUCCEEDED})
+    wait_for(bad, {FAILED})
+    assert ok.progress == 100
+    assert bad.error == 'manifest unknown'
+    assert [h['status'] for h in bad.to_dict(with_history=True)['history']] == ['queued', 'running', 'failed']
+    assert [j.id for j in scheduler.list(owner='1')] == [bad.id, ok.id]
+
+
+def test_bounded_queue_and_cancellation():
+    """
+    队列满时拒绝提交；排队与运行中的任务都可取消
+    Submissions are rejected when the queue is full; queued and running jobs can be cancelled
+    """
+    scheduler = JobScheduler(APP, max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    def blocking(job):
+        while not release.wait(0.01):
+            job.check_cancelled()
+
+    running = scheduler.submit('install', '1', blocking)
+    scheduler.start()
+    wait_for(running, {'running'})
+    queued = scheduler.submit('install', '1', blocking)
+    with pytest.raises(JobQueueFull):
+        scheduler.submit('install', '1', blocking)
+    assert scheduler.cancel(queued.id)
+    assert queued.status == CANCELLED
+    assert scheduler.cancel(running.id)
+    wait_for(running, {CANCELLED})
+    assert not scheduler.active()
+
+
+def test_cancelled_queued_job_frees_its_slot_and_never_runs():
+    """
+    取消排队任务立即释放名额，工作线程跳过已取消的任务
+    Cancelling a queued job frees its slot at once, and the worker skips it
+    """
+    scheduler = JobScheduler(APP, max_workers=1, max_queue=1)
+    ran = []
+    first = scheduler.submit('install', '1', lambda job: ran.append('first'))
+    with pytest.raises(JobQueueFull):
+        scheduler.submit('install', '1', lambda job: ran.append('extra'))
+    assert scheduler.cancel(first.id)
+    assert not scheduler.cancel(first.id)
+    second = scheduler.submit('install', '1', lambda job: ran.append('second'))
+    scheduler.start()
+    wait_for(second, {SUCCEEDED})
+    assert ran == ['second']
+    assert first.status == CANCELLED
+    assert [h['status'] for h in first.to_dict(with_history=True)['history']] == ['queued', 'cancelled']
+
+
+def test_cancel_races_with_worker_start():
+    """
+    取消与工作线程启动并发时，任务要么从未运行，要么在检查点取消
+    When cancel races the worker, the job either never runs or stops at its checkpoint
+    """
+    for _ in range(50):
+        scheduler = JobScheduler(APP, max_workers=1, max_queue=5)
+        started = []
+        job = scheduler.submit('install', '1', lambda job: (started.append(1), job.check_cancelled()))
+        scheduler.start()
+        assert scheduler.cancel(job.id) or job.status == SUCCEEDED
+        wait_for(job, {CANCELLED, SUCCEEDED})
+        statuses = [h['status'] for h in job.to_dict(with_history=True)['history']]
+        assert statuses in (['queued', 'cancelled'], ['queued', 'running', 'cancelled'], ['queued', 'running', 'succeeded'])
+        assert bool(started) == ('running' in statuses)
+
+
+def test_cancel_after_last_checkpoint_ends_cancelled():
+    """
+    任务函数返回后、结束前被取消时，任务结束为 CANCELLED 而不是 SUCCEEDED
+    A cancel that lands after the job function returned but before completion ends the job as CANCELLED
+    """
+    scheduler = JobScheduler(APP, max_workers=1)
+    job = scheduler.submit('install', '1', lambda job: None)
+    job._set_status('running', only_from=('queued',))
+    job.func(job)
+    assert scheduler.cancel(job.id)
+    assert job._complete() == CANCELLED
+    assert job.status == CANCELLED and job.progress == 0
+    assert not scheduler.cancel(job.id)
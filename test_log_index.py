@@ -0,0 +1,130 @@
+"""
+日志全文索引测试
+Tests for the log full-text index.
+"""
+import logging
+import sqlite3
+import types
+
+from log_index import SCHEMA, LogIndexer, fts_query
+
+APP = types.SimpleNamespace(logger=logging.getLogger('test'))
+
+
+class FakeContainer:
+    """
+    记录 since 参数并按其过滤预设日志的容器
+    Container that records since and filters its canned lines by it
+    """
+
+    def __init__(self, cid, name, lines):
+        self.id = cid
+        self.name = name
+        self.status = 'running'
+        self.lines = lines
+        self.since = []
+
+    def logs(self, **kwargs):
+        since = kwargs.get('since', 0)
+        if kwargs['stdout']:
+            self.since.append(since)
+        stream = 'stdout' if kwargs['stdout'] else 'stderr'
+        return iter([f'1970-01-01T00:00:{ts:02d}Z {text}\n'.encode()
+                     for ts, name, text in self.lines if name == stream and ts >= since])
+
+
+def test_incremental_indexing_and_search(tmp_path):
+    """
+    第二轮只读取新日志；搜索支持容器与时间过滤
+    The second pass reads only new lines; search filters by container and time
+    """
+    web = FakeContainer('aaa111', 'web', [(1, 'stdout', 'GET /index ok'), (2, 'stderr', 'disk error sda')])
+    db = FakeContainer('bbb222', 'db', [(3, 'stdout', 'checkpoint error')])
+    indexer = LogIndexer(APP, str(tmp_path / 'logs.db'), lambda: [web, db], retention_seconds=10 ** 10, clock=lambda: 100)
+    assert indexer.index_once() == 3
+    web.lines.append((5, 'stdout', 'late error'))
+    assert indexer.index_once() == 1
+    assert web.since[-1] == 2
+
+    results = indexer.search('error')
+    assert [r['line'] for r in results] == ['late error', 'checkpoint error', 'disk error sda']
+    assert [r['line'] for r in indexer.search('error', container='web', until=5)] == ['disk error sda']
+    assert indexer.search('error', since=4)[0]['stream'] == 'stdout'
+    assert indexer.search('"unbalanced') == []
+
+
+def test_lines_sharing_a_microsecond_resume_exactly(tmp_path):
+    """
+    上一轮停在某微秒中间时，下一轮跳过其中已索引的行，不丢失也不重复
+    A pass that stopped inside a microsecond resumes by skipping the lines already indexed there, without loss or repeats
+    """
+    web = FakeContainer('aaa111', 'web', [(1, 'stdout', 'first'), (2, 'stdout', 'second')])
+    indexer = LogIndexer(APP, str(tmp_path / 'logs.db'), lambda: [web], retention_seconds=10 ** 10, clock=lambda: 100)
+    assert indexer.index_once() == 2
+    web.lines.append((2, 'stdout', 'third'))
+    web.lines.append((3, 'stdout', 'fourth'))
+    assert indexer.index_once() == 2
+    assert indexer.index_once() == 0
+    assert sorted(r['line'] for r in indexer.search('first') + indexer.search('second') + indexer.search('third')
+                  + indexer.search('fourth')) == ['first', 'fourth', 'second', 'third']
+
+
+def test_old_cursor_table_is_migrated(tmp_path):
+    """
+    旧版游标表补上 last_count，已索引的边界行不会重复
+    An old cursor table gains last_count and the boundary lines it already indexed are not repeated
+    """
+    path = str(tmp_path / 'logs.db')
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA.replace(',\n    last_count INTEGER NOT NULL DEFAULT 0', ''))
+    db.execute("INSERT INTO log_entries (container_id, container_name, stream, time, line) VALUES ('aaa111', 'web', 'stdout', 2, 'old')")
+    db.execute("INSERT INTO log_cursors (container_id, container_name, last_time) VALUES ('aaa111', 'web', 2)")
+    db.commit()
+    db.close()
+    web = FakeContainer('aaa111', 'web', [(2, 'stdout', 'old'), (3, 'stdout', 'new')])
+    indexer = LogIndexer(APP, path, lambda: [web], retention_seconds=10 ** 10, clock=lambda: 100)
+    assert indexer.index_once() == 1
+
+
+def test_retention_limits_lines_per_container(tmp_path):
+    """
+    每个容器只保留最近的 retention_lines 行，全文索引同步删除
+    Only the newest retention_lines lines are kept per container, and the FTS index follows
+    """
+    web = FakeContainer('aaa111', 'web', [(i, 'stdout', f'line {i}') for i in range(1, 6)])
+    indexer = LogIndexer(APP, str(tmp_path / 'logs.db'), lambda: [web], retention_lines=2,
+                         retention_seconds=10 ** 10, clock=lambda: 100)
+    indexer.index_once()
+    assert [r['line'] for r in indexer.search('line')] == ['line 5', 'line 4']
+    assert fts_query('a "b') == '"a" """b"'
+
+
+def test_container_stopping_after_a_pass_gets_a_final_pass(tmp_path):
+    """
+    容器在一轮索引后停止，停止前写出的日志在下一轮被索引，之后不再读取
+    Output written before a container stops is indexed by the next pass; later passes skip it
+    """
+    web = FakeContainer('aaa111', 'web', [(1, 'stdout', 'starting')])
+    indexer = LogIndexer(APP, str(tmp_path / 'logs.db'), lambda: [web], retention_seconds=10 ** 10, clock=lambda: 100)
+    assert indexer.index_once() == 1
+    web.lines.append((2, 'stderr', 'fatal crash'))
+    web.status = 'exited'
+    assert indexer.index_once() == 1
+    assert [r['line'] for r in indexer.search('crash')] == ['fatal crash']
+    reads = len(web.since)
+    assert indexer.index_once() == 0
+    assert len(web.since) == reads
+
+
+def test_lines_without_timestamp_survive_retention(tmp_path):
+    """
+    无时间戳的行使用前一行或写入时间，不会被保留策略当作过期删除
+    Lines without a timestamp use the previous line's time or the ingest time and are not expired by retention
+    """
+    web = FakeContainer('aaa111', 'web', [])
+    web.logs = lambda **kwargs: iter([b'no stamp first\n', b'1970-01-01T00:16:40Z stamped\n', b'continued\n']
+                                     if kwargs['stdout'] else [])
+    indexer = LogIndexer(APP, str(tmp_path / 'logs.db'), lambda: [web], retention_seconds=3600, clock=lambda: 2000)
+    assert indexer.index_once() == 3
+    times = {r['line']: r['time'] for r in indexer.search('stamp') + indexer.search('stamped') + indexer.search('continued')}
+    assert times == {'no stamp first': 2000, 'stamped': 1000, 'continued': 1000}
@@ -0,0 +1,71 @@
+"""
+异步日志管道测试
+Tests for the asynchronous logging pipeline.
+"""
+import json
+import logging
+import queue
+import types
+
+import pytest
+
+from logging_setup import DroppingQueueHandler, JsonFormatter, SamplingFilter, parse_category_levels, setup_logging
+
+
+def make_record(msg='hello', level=logging.INFO, **extra):
+    record = logging.LogRecord('app.proxy', level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_and_rate_limit():
+    """
+    按比例采样、令牌桶限速，警告总是保留并报告被抑制条数
+    Records are sampled and rate-limited; warnings always pass and report the suppressed count
+    """
+    sampled = SamplingFilter(sample=0.25)
+    assert [sampled.filter(make_record()) for _ in range(8)] == [True, False, False, False] * 2
+
+    now = [0.0]
+    limited = SamplingFilter(rate=2, clock=lambda: now[0])
+    assert [limited.filter(make_record()) for _ in range(4)] == [True, True, False, False]
+    warning = make_record(level=logging.WARNING)
+    assert limited.filter(warning) and warning.suppressed == 2
+    now[0] = 1.0
+    assert limited.filter(make_record())
+
+
+def test_json_format_and_category_levels():
+    """
+    JSON 输出包含附加字段；类别级别解析校验
+    JSON output carries extra fields; category levels are validated
+    """
+    data = json.loads(JsonFormatter().format(make_record(fields={'status': 200})))
+    assert data['category'] == 'app.proxy' and data['message'] == 'hello' and data['status'] == 200
+    assert parse_category_levels('proxy=WARNING, docker=debug') == {'proxy': logging.WARNING, 'docker': logging.DEBUG}
+    with pytest.raises(ValueError):
+        parse_category_levels('proxy=LOUD')
+
+
+def test_queue_handler_drops_when_full_and_listener_writes(tmp_path):
+    """
+    队列满时丢弃计数；监听线程把记录写入文件
+    Records are dropped and counted when the queue is full; the listener writes records to the file
+    """
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert handler.dropped == 1
+
+    app = types.SimpleNamespace(logger=logging.getLogger('test_pipeline'))
+    config = types.SimpleNamespace(
+        LOG_FILE=str(tmp_path / 'app.log'), LOG_MAX_SIZE=1 << 20, LOG_BACKUP_COUNT=1, LOG_FORMAT='json',
+        LOG_LEVEL='INFO', LOG_QUEUE_SIZE=100, LOG_CATEGORY_LEVELS='docker=ERROR',
+        LOG_PROXY_SAMPLE_RATE=1.0, LOG_PROXY_RATE_LIMIT=0
+    )
+    listener = setup_logging(app, config)
+    app.logger.info('started')
+    app.logger.getChild('docker').info('hidden')
+    listener.stop()
+    lines = [json.loads(line) for line in (tmp_path / 'app.log').read_text().splitlines()]
+    assert [line['message'] for line in lines] == ['started']
@@ -0,0 +1,78 @@
+"""
+多分辨率指标存储测试
+Tests for the multi-resolution metrics store.
+"""
+import logging
+import types
+
+import pytest
+
+from metrics_store import MetricsStore, parse_duration
+
+APP = types.SimpleNamespace(logger=logging.getLogger('test'))
+
+
+def make_store(path=None):
+    """
+    创建小容量层级的测试存储
+    Build a store with small tiers for testing
+    """
+    return MetricsStore(APP, path, tiers=((2, 20), (10, 100)), metrics=('cpu',))
+
+
+def test_parse_duration():
+    """
+    支持秒数与单位后缀
+    Plain seconds and unit suffixes are accepted
+    """
+    assert parse_duration('90') == 90
+    assert parse_duration('15m') == 900
+    assert parse_duration('1h') == 3600
+    with pytest.raises(ValueError):
+        parse_duration('abc')
+
+
+def test_downsampling_and_bounded_slots():
+    """
+    细层级循环覆盖，粗层级保存平均值
+    The fine tier wraps around while the coarse tier keeps averages
+    """
+    store = make_store()
+    for t in range(0, 60, 2):
+        store.record(1000 + t, {'cpu': t})
+    raw = store.query(20, end=1058)
+    assert len(raw['timestamps']) <= 11
+    assert raw['cpu'][-1] == 58
+    coarse = store.query(60, end=1058)
+    assert coarse['step'] == 10
+    assert coarse['timestamps'][0] == 1000
+    assert coarse['cpu'][0] == 4  # 平均值 (0+2+4+6+8)/5
+
+
+def test_requested_step_rebuckets():
+    """
+    请求步长大于层级步长时重新聚合
+    A step larger than the tier step re-buckets the rows
+    """
+    store = make_store()
+    for t in range(0, 20, 2):
+        store.record(1000 + t, {'cpu': 10})
+    result = store.query(20, step=10, end=1019)
+    assert result['step'] == 10
+    assert result['cpu'] == [10, 10]
+
+
+def test_persistence_round_trip(tmp_path):
+    """
+    保存后重新加载可恢复历史；布局不一致时忽略
+    History survives a save/load cycle; mismatched layouts are ignored
+    """
+    path = str(tmp_path / 'metrics.bin')
+    store = make_store(path)
+    for t in range(0, 40, 2):
+        store.record(1000 + t, {'cpu': t})
+    store.save()
+    restored = make_store(path)
+    assert restored.query(100, end=1040)['cpu'][:3] == store.query(100, end=1040)['cpu'][:3]
+    other = MetricsStore(APP, path, tiers=((5, 50),), metrics=('cpu',))
+    assert other.query(50, end=1040)['timestamps'] == []
@@ -0,0 +1,35 @@
+"""
+资源采样器与环形缓冲区测试
+Tests for the resource sampler and ring buffer.
+"""
+import logging
+import types
+
+from monitor import ResourceSampler, RingBuffer
+
+
+def test_ring_buffer_overwrites_oldest():
+    """
+    写满后覆盖最旧样本，按时间顺序返回
+    Oldest samples are overwritten once full; items come back in order
+    """
+    buf = RingBuffer(3, ('cpu',))
+    for t in range(5):
+        buf.append(float(t), cpu=t * 10)
+    assert len(buf) == 3
+    assert [row['timestamp'] for row in buf.items()] == [2.0, 3.0, 4.0]
+    assert buf.latest() == {'timestamp': 4.0, 'cpu': 40.0}
+    assert [row['cpu'] for row in buf.items(since=3.0)] == [40.0]
+
+
+def test_sampler_latest_is_non_blocking():
+    """
+    未启动线程时 latest() 同步采样一次并写入历史
+    latest() samples once synchronously when the thread has not run yet
+    """
+    app = types.SimpleNamespace(logger=logging.getLogger('test'))
+    sampler = ResourceSampler(app, interval=1, history_size=10)
+    snapshot = sampler.latest()
+    assert {'cpu', 'mem', 'disks', 'raid', 'timestamp'} <= set(snapshot)
+    assert len(sampler.history) == 1
+    assert sampler.latest() is snapshot
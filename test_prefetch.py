@@ -0,0 +1,83 @@
+"""
+空闲镜像预拉取测试
+Tests for the idle-time image prefetcher.
+"""
+import logging
+import time
+import types
+
+import pytest
+
+from prefetch import ImagePrefetcher, in_window, parse_window
+
+APP = types.SimpleNamespace(logger=logging.getLogger('test'))
+CATALOG = [
+    {'name': 'Jellyfin', 'image': 'jellyfin/jellyfin:latest', 'warm': True},
+    {'name': 'Plex', 'image': 'plexinc/pms-docker:latest'},
+    {'name': 'Nextcloud', 'image': 'nextcloud:latest', 'warm': True},
+]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_prefetcher(clock, pull, present=(), busy=lambda: False):
+    return ImagePrefetcher(APP, lambda: CATALOG, lambda image: image in present, pull, is_busy=busy,
+                           idle_seconds=60, clock=clock, localtime=time.gmtime)
+
+
+def test_window_parsing():
+    """
+    时间窗口支持跨午夜，格式错误时报错
+    Windows may wrap past midnight; malformed windows raise
+    """
+    window = parse_window('23:00-02:00')
+    assert in_window(window, 23 * 60 + 30) and in_window(window, 60)
+    assert not in_window(window, 12 * 60)
+    assert parse_window('') is None and in_window(None, 0)
+    with pytest.raises(ValueError):
+        parse_window('25:00-02:00')
+
+
+def test_pulls_missing_warm_images_one_at_a_time_when_idle():
+    """
+    空闲时按顺序逐个拉取缺失的warm镜像，有交互请求时不拉取
+    Missing warm images are pulled one at a time when idle, and not at all after interactive traffic
+    """
+    clock = FakeClock()
+    pulled = []
+    prefetcher = make_prefetcher(clock, lambda image, check_cancelled: pulled.append(image),
+                                 present={'nextcloud:latest'})
+    assert prefetcher.run_once() == []
+    clock.now += 61
+    assert prefetcher.run_once() == ['jellyfin/jellyfin:latest']
+    assert pulled == ['jellyfin/jellyfin:latest']
+
+
+def test_pauses_on_activity_and_install_jobs():
+    """
+    拉取中出现交互请求时暂停本轮；有安装任务时不启动
+    A round pauses when interactive traffic arrives mid-pull and does not start while an install is active
+    """
+    clock = FakeClock()
+    attempts = []
+
+    def pull(image, check_cancelled):
+        attempts.append(image)
+        prefetcher.touch()
+        check_cancelled()
+
+    prefetcher = make_prefetcher(clock, pull)
+    clock.now += 61
+    assert prefetcher.run_once() == []
+    assert attempts == ['jellyfin/jellyfin:latest']
+    assert prefetcher.last_error is None
+
+    busy = make_prefetcher(clock, pull, busy=lambda: True)
+    clock.now += 61
+    assert busy.run_once() == [] and len(attempts) == 1
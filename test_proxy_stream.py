@@ -0,0 +1,123 @@
+"""
+反向代理流式转发测试
+Tests for the streaming reverse proxy helpers.
+"""
+import hashlib
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from urllib3 import HTTPHeaderDict
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from proxy_stream import (RequestBody, forward_request_headers, forward_response_headers,
+                          iter_response, request_body)
+
+
+class Upstream(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_PUT(self):
+        # 返回收到的字节数与摘要 / Reply with the byte count and digest received
+        digest, size = hashlib.sha256(), 0
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            while True:
+                length = int(self.rfile.readline().strip(), 16)
+                if not length:
+                    self.rfile.readline()
+                    break
+                data = self.rfile.read(length)
+                self.rfile.readline()
+                digest.update(data)
+                size += len(data)
+        else:
+            remaining = int(self.headers['Content-Length'])
+            while remaining:
+                data = self.rfile.read(min(remaining, 65536))
+                digest.update(data)
+                size += len(data)
+                remaining -= len(data)
+        body = f'{size} {digest.hexdigest()}'.encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # 分块响应 / Chunked response
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Set-Cookie', 'a=1')
+        self.send_header('Set-Cookie', 'b=2')
+        self.end_headers()
+        for _ in range(16):
+            self.wfile.write(b'10000\r\n' + b'x' * 0x10000 + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+@pytest.fixture(scope='module')
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+class CountingStream(io.BytesIO):
+    """记录最大单次读取量 / Records the largest single read"""
+    largest = 0
+
+    def read(self, size=-1):
+        self.largest = max(self.largest, size)
+        return super().read(size)
+
+
+def test_request_headers_drop_hop_by_hop():
+    headers = forward_request_headers(
+        {'Host': 'nas', 'Connection': 'keep-alive, X-Private', 'X-Private': '1', 'Content-Length': '5',
+         'Transfer-Encoding': 'chunked', 'Cookie': 'auth=1'},
+        {'X-Forwarded-For': '10.0.0.1'})
+    assert headers == {'Host': 'nas', 'Cookie': 'auth=1', 'X-Forwarded-For': '10.0.0.1'}
+
+
+def test_response_headers_keep_duplicates_and_drop_length_when_chunked():
+    headers = HTTPHeaderDict([('Set-Cookie', 'a=1'), ('Set-Cookie', 'b=2'), ('Transfer-Encoding', 'chunked'),
+                              ('Content-Length', '10'), ('Content-Encoding', 'gzip')])
+    assert forward_response_headers(headers) == [('Set-Cookie', 'a=1'), ('Set-Cookie', 'b=2'), ('Content-Encoding', 'gzip')]
+    assert ('Content-Length', '10') in forward_response_headers(HTTPHeaderDict({'Content-Length': '10'}))
+
+
+def test_request_body_selection():
+    sized = Request(EnvironBuilder(method='PUT', data=b'abc').get_environ())
+    assert isinstance(request_body(sized), RequestBody) and request_body(sized).len == 3
+    environ = EnvironBuilder(method='PUT', input_stream=io.BytesIO(b'abc'),
+                             headers={'Transfer-Encoding': 'chunked'}).get_environ()
+    # 服务器已解码分块编码时设置 wsgi.input_terminated / Set by servers that decode chunked input
+    environ['wsgi.input_terminated'] = True
+    chunked = Request(environ)
+    assert b''.join(request_body(chunked, 2)) == b'abc'
+    assert request_body(Request(EnvironBuilder(method='GET').get_environ())) is None
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+def test_upload_streams_in_bounded_chunks(upstream, chunked):
+    payload = bytes(range(256)) * 16384  # 4MB
+    stream = CountingStream(payload)
+    body = iter(lambda: stream.read(65536), b'') if chunked else RequestBody(stream, len(payload))
+    resp = requests.put(upstream, data=body)
+    assert resp.text == f'{len(payload)} {hashlib.sha256(payload).hexdigest()}'
+    assert 0 < stream.largest <= 65536
+
+
+def test_download_relays_chunks_and_closes(upstream):
+    resp = requests.get(upstream, stream=True)
+    assert [value for name, value in forward_response_headers(resp.raw.headers) if name == 'Set-Cookie'] == ['a=1', 'b=2']
+    sizes = [len(chunk) for chunk in iter_response(resp, 65536)]
+    assert sum(sizes) == 16 * 0x10000 and max(sizes) <= 65536
+    assert resp.raw.closed
@@ -0,0 +1,295 @@
+"""
+Flask 路由测试（测试客户端，数据文件放在临时目录）
+Route tests using the Flask test client, with data files in a temporary directory.
+"""
+import importlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import types
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """
+    在临时目录中导入应用：数据库、指标历史与缓存都不写入仓库
+    Import the app against a temporary directory so the database, metrics history and caches stay out of the repo
+    """
+    root = tmp_path_factory.mktemp('app')
+    shutil.copy(os.path.join(HERE, 'users.db'), root / 'users.db')
+    (root / 'data').mkdir()
+    env = {
+        'DATABASE_PATH': str(root / 'users.db'),
+        'METRICS_HISTORY_FILE': str(root / 'metrics_history.bin'),
+        'ASSET_CACHE_DIR': str(root / 'asset_cache'),
+        'LOG_INDEX_FILE': str(root / 'log_index.db'),
+        'FILEBROWSER_DATA_DIR': str(root / 'data'),
+        'LOGIN_IP_BURST': '1000',
+        'LOGIN_USER_BURST': '2',
+        'LOGIN_USER_RATE': '0.001',
+    }
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    try:
+        module = sys.modules.get('app') or importlib.import_module('app')
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    module.app.config['TESTING'] = True
+    module.app.config['SESSION_COOKIE_SECURE'] = False
+    module.app.config['WTF_CSRF_ENABLED'] = False
+    module.login_manager.session_protection = None
+    module.data_root = root / 'data'
+    return module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def add_user(app_module, username, password, is_admin=0):
+    """
+    直接写入数据库新增用户
+    Add a user straight to the database
+    """
+    db = sqlite3.connect(app_module.config.DATABASE_PATH)
+    try:
+        db.execute('INSERT OR REPLACE INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)',
+                   (username, generate_password_hash(password), is_admin))
+        db.commit()
+        return db.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()[0]
+    finally:
+        db.close()
+
+
+def test_drained_username_bucket_rejects_before_hashing(app_module, client, monkeypatch):
+    """
+    用户名令牌耗尽后，即使密码正确也在计算哈希之前被拒绝；其他网段的用户本人不受影响
+    Once a username's bucket is drained, attempts are rejected before any hashing, even with the right password;
+    the owner on another subnet is unaffected
+    """
+    add_user(app_module, 'lockout-victim', 'correct horse battery')
+    checks = []
+    original = app_module.password_hasher.check
+    monkeypatch.setattr(app_module.password_hasher, 'check',
+                        lambda password_hash, password: checks.append(password) or original(password_hash, password))
+    statuses = [client.post('/login', data={'username': 'lockout-victim', 'password': 'wrong'}).status_code
+                for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert len(checks) == 2
+    response = client.post('/login', data={'username': 'lockout-victim', 'password': 'correct horse battery'})
+    assert response.status_code == 429
+    assert len(checks) == 2
+
+    owner = app_module.app.test_client()
+    response = owner.post('/login', data={'username': 'lockout-victim', 'password': 'correct horse battery'},
+                          environ_base={'REMOTE_ADDR': '198.51.100.7'})
+    assert response.status_code == 302
+
+
+class RelayRaw:
+    def __init__(self, body, headers):
+        self.body = body
+        self.headers = headers
+
+    def stream(self, size, decode_content=True):
+        yield self.body
+
+
+class RelayResponse:
+    def __init__(self, status_code, body, headers):
+        self.status_code = status_code
+        self.headers = headers
+        self.raw = RelayRaw(body, headers)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_uncacheable_asset_relayed_from_single_fetch(app_module, client, monkeypatch):
+    """
+    不可缓存的静态资源直接转发缓存取回的响应，上游只被请求一次
+    An uncacheable static asset is relayed from the cache's own fetch, so upstream is asked once
+    """
+    calls = []
+
+    def fetch(path, headers):
+        calls.append(path)
+        return RelayResponse(404, b'gone', {'Content-Type': 'text/plain', 'Content-Length': '4'})
+
+    monkeypatch.setattr(app_module, 'asset_cache', app_module.AssetCache(fetch))
+    monkeypatch.setattr(app_module.filebrowser_upstream, 'request',
+                        lambda *args, **kwargs: pytest.fail('proxied a second time'))
+    response = client.get('/filemanager/static/js/missing.js')
+    assert (response.status_code, response.data) == (404, b'gone')
+    assert calls == ['/static/js/missing.js']
+
+
+def test_fingerprinted_static_url_is_immutable(app_module, client):
+    """
+    带正确指纹的静态地址长期缓存且 immutable；无指纹或指纹过期时短期缓存
+    A correctly fingerprinted static URL is immutable and long-lived; missing or stale fingerprints get the short max-age
+    """
+    version = app_module.static_fingerprints.version('wallpapers/1.jpg')
+    fresh = client.get(f'/static/wallpapers/1.jpg?v={version}')
+    assert fresh.status_code == 200
+    assert fresh.cache_control.immutable
+    assert fresh.cache_control.max_age == app_module.config.STATIC_IMMUTABLE_MAX_AGE
+    fresh.close()
+    for url in ('/static/wallpapers/1.jpg', '/static/wallpapers/1.jpg?v=stale'):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert not response.cache_control.immutable
+        assert response.cache_control.max_age == app_module.config.STATIC_MAX_AGE
+        etag = response.headers['ETag']
+        response.close()
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_url_for_static_adds_fingerprint(app_module):
+    """
+    url_for('static') 自动附加内容指纹，文件不存在时不附加
+    url_for('static') appends the content fingerprint, and leaves unknown files alone
+    """
+    with app_module.app.test_request_context():
+        url = app_module.url_for('static', filename='wallpapers/1.jpg')
+        missing = app_module.url_for('static', filename='nope.css')
+    assert url == f"/static/wallpapers/1.jpg?v={app_module.static_fingerprints.version('wallpapers/1.jpg')}"
+    assert missing == '/static/nope.css'
+
+
+@pytest.fixture
+def download_client(app_module, client, monkeypatch):
+    """
+    已登录的客户端，scope 查询替换为数据目录下的 /alice
+    A logged-in client whose scope lookup is stubbed to /alice under the data directory
+    """
+    data = app_module.data_root
+    (data / 'alice').mkdir(exist_ok=True)
+    (data / 'alice' / 'movie.bin').write_bytes(bytes(range(100)))
+    (data / 'secret.txt').write_text('secret')
+    if not (data / 'alice' / 'escape.txt').is_symlink():
+        (data / 'alice' / 'escape.txt').symlink_to(data / 'secret.txt')
+    monkeypatch.setattr(app_module, 'user_download_root',
+                        lambda username: app_module.scope_root(str(data), '/alice'))
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    return client
+
+
+def test_download_requires_login_and_scope(app_module, download_client):
+    """
+    未登录返回 401，越出 scope（含符号链接）返回 403
+    Unauthenticated requests get 401; paths leaving the scope, symlinks included, get 403
+    """
+    assert app_module.app.test_client().get('/download/movie.bin').status_code == 401
+    assert download_client.get('/download/escape.txt').status_code == 403
+    assert download_client.get('/download/nope.bin').status_code == 404
+
+
+def test_download_full_head_and_disposition(download_client):
+    """
+    完整下载、HEAD 与 download 参数
+    Full download, HEAD and the download parameter
+    """
+    full = download_client.get('/download/movie.bin')
+    assert full.status_code == 200 and full.data == bytes(range(100))
+    assert full.headers['Accept-Ranges'] == 'bytes'
+    assert full.headers['Content-Disposition'].startswith('inline')
+    head = download_client.head('/download/movie.bin')
+    assert head.status_code == 200 and head.data == b''
+    assert head.headers['Content-Length'] == '100'
+    assert download_client.get('/download/movie.bin?download=1').headers['Content-Disposition'].startswith('attachment')
+    assert download_client.get('/download/movie.bin?download=0').headers['Content-Disposition'].startswith('inline')
+
+
+def test_download_ranges_and_validators(download_client):
+    """
+    单段 206、不可满足 416、条件请求 304 与多段响应长度
+    Single-range 206, unsatisfiable 416, conditional 304 and the multipart length
+    """
+    partial = download_client.get('/download/movie.bin', headers={'Range': 'bytes=10-19'})
+    assert partial.status_code == 206
+    assert partial.headers['Content-Range'] == 'bytes 10-19/100'
+    assert partial.headers['Content-Length'] == '10'
+    assert partial.data == bytes(range(10, 20))
+    tail = download_client.get('/download/movie.bin', headers={'Range': 'bytes=90-'})
+    assert tail.status_code == 206 and tail.data == bytes(range(90, 100))
+
+    unsatisfiable = download_client.get('/download/movie.bin', headers={'Range': 'bytes=500-'})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers['Content-Range'] == 'bytes */100'
+
+    etag = partial.headers['ETag']
+    assert download_client.get('/download/movie.bin', headers={'If-None-Match': etag}).status_code == 304
+    stale = download_client.get('/download/movie.bin', headers={'Range': 'bytes=0-9', 'If-Range': '"old"'})
+    assert stale.status_code == 200 and len(stale.data) == 100
+
+    multi = download_client.get('/download/movie.bin', headers={'Range': 'bytes=0-4,50-54'})
+    assert multi.status_code == 206
+    assert multi.mimetype == 'multipart/byteranges'
+    assert int(multi.headers['Content-Length']) == len(multi.data)
+    assert bytes(range(5)) in multi.data and bytes(range(50, 55)) in multi.data
+    multi_head = download_client.head('/download/movie.bin', headers={'Range': 'bytes=0-4,50-54'})
+    assert multi_head.data == b''
+    assert multi_head.headers['Content-Length'] == multi.headers['Content-Length']
+
+
+def test_resource_history_served_from_ring_buffer(client):
+    """
+    history=1 时附带环形缓冲区中的近期样本，since 过滤旧样本
+    history=1 includes recent samples from the ring buffer, and since drops older ones
+    """
+    latest = client.get('/api/resource').get_json()
+    assert 'history' not in latest and 'cpu' in latest
+    history = client.get('/api/resource?history=1').get_json()['history']
+    assert history and set(history[-1]) == {'timestamp', 'cpu', 'mem_percent', 'mem_used', 'mem_total'}
+    assert [row['timestamp'] for row in history] == sorted(row['timestamp'] for row in history)
+    newer = client.get(f"/api/resource?history=1&since={history[-1]['timestamp']}").get_json()['history']
+    assert all(row['timestamp'] > history[-1]['timestamp'] for row in newer)
+    assert client.get('/api/resource?history=1&since=soon').status_code == 400
+
+
+class StampedLogs:
+    """
+    按 since（截断到微秒）过滤预设 stdout 行的容器
+    Container filtering canned stdout lines by since, truncated to microseconds
+    """
+    lines = [('00:00:10.000001100', 'a'), ('00:00:10.000001200', 'b'), ('00:00:10.000001300', 'c')]
+
+    def logs(self, **kwargs):
+        since = int(kwargs.get('since', 0) * 1e6)
+        if not kwargs['stdout']:
+            return iter([])
+        return iter([f'1970-01-01T{stamp}Z {text}\n'.encode() for stamp, text in self.lines
+                     if int(stamp[6:8]) * 10 ** 6 + int(stamp[9:15]) >= since])
+
+
+def test_log_stream_resumes_inside_a_microsecond(app_module, download_client, monkeypatch):
+    """
+    SSE 事件 ID 是游标，重连时同一微秒内已发送的行被跳过，未发送的行照常补发
+    SSE event IDs are cursors, so a reconnect skips the lines already sent in that microsecond and replays the rest
+    """
+    fake = types.SimpleNamespace(containers=types.SimpleNamespace(get=lambda cid: StampedLogs()))
+    monkeypatch.setattr(app_module, 'client', fake)
+    body = download_client.get('/api/containers/web/logs?format=sse&stream=stdout').get_data(as_text=True)
+    ids = [line[4:] for line in body.splitlines() if line.startswith('id: ')]
+    assert ids == ['10.000001:1', '10.000001:2', '10.000001:3']
+    resumed = download_client.get('/api/containers/web/logs?format=sse&stream=stdout',
+                                  headers={'Last-Event-ID': ids[0]}).get_data(as_text=True)
+    events = [json.loads(line[6:]) for line in resumed.splitlines() if line.startswith('data: ')]
+    assert [event.get('line') for event in events] == ['b', 'c', None]
+    assert download_client.get('/api/containers/web/logs/page?cursor=soon').status_code == 400
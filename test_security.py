@@ -0,0 +1,70 @@
+"""
+密码哈希线程池与登录限流测试
+Tests for the password hashing pool and login throttling.
+"""
+import threading
+
+import pytest
+
+import security
+from security import HasherBusy, PasswordHasher, RateLimiter, client_subnet
+
+
+def test_token_bucket_refills_per_key():
+    """
+    每个键独立限流，令牌按速率补充，check 不消耗令牌
+    Keys are limited independently, tokens refill at the configured rate, and check does not consume
+    """
+    now = [0.0]
+    limiter = RateLimiter(rate=0.5, burst=2, clock=lambda: now[0])
+    assert limiter.allow('1.2.3.4') == (True, 0)
+    assert limiter.allow('1.2.3.4')[0]
+    assert limiter.check('1.2.3.4') == (False, 2)
+    assert limiter.allow('1.2.3.4') == (False, 2)
+    assert limiter.allow('5.6.7.8')[0]
+    now[0] = 2.0
+    assert limiter.allow('1.2.3.4')[0]
+
+
+def test_hasher_rejects_when_saturated(monkeypatch):
+    """
+    进行中的任务达到上限时立即拒绝，任务完成后恢复
+    New work is rejected immediately once the in-flight limit is reached, and accepted again after completion
+    """
+    release = threading.Event()
+    monkeypatch.setattr(security, 'check_password_hash', lambda h, p: release.wait(2) and h == p)
+    hasher = PasswordHasher(max_workers=1, max_pending=1)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(hasher.check('x', 'x')))
+    worker.start()
+    while hasher._slots._value:
+        threading.Event().wait(0.01)
+    with pytest.raises(HasherBusy):
+        hasher.check('x', 'x')
+    release.set()
+    worker.join(2)
+    assert results == [True]
+    assert hasher.check('x', 'y') is False
+
+
+def test_generate_many_keeps_order_and_releases_slots(monkeypatch):
+    """
+    批量哈希按输入顺序返回，完成后释放全部槽位
+    Bulk hashing returns results in input order and frees every slot afterwards
+    """
+    monkeypatch.setattr(security, 'generate_password_hash', lambda p: f'hash:{p}')
+    hasher = PasswordHasher(max_workers=2, max_pending=3)
+    passwords = [str(i) for i in range(10)]
+    assert hasher.generate_many(passwords) == [f'hash:{p}' for p in passwords]
+    hasher._executor.shutdown(wait=True)
+    assert hasher._slots._value == 3
+
+
+def test_client_subnet_groups_addresses():
+    """
+    IPv4 按 /24、IPv6 按 /64 归组，无法解析的地址原样使用
+    IPv4 addresses group by /24 and IPv6 by /64; unparsable addresses are used as is
+    """
+    assert client_subnet('192.0.2.77') == '192.0.2.0/24'
+    assert client_subnet('2001:db8:1:2:3::4') == '2001:db8:1:2::/64'
+    assert client_subnet(None) == 'None'
@@ -0,0 +1,29 @@
+"""
+静态文件指纹测试
+Tests for static file fingerprinting.
+"""
+import os
+
+from static_files import StaticFingerprinter
+
+
+def test_version_follows_content(tmp_path):
+    asset = tmp_path / 'css' / 'site.css'
+    asset.parent.mkdir()
+    asset.write_bytes(b'body{}')
+    fingerprints = StaticFingerprinter(str(tmp_path))
+    first = fingerprints.version('css/site.css')
+    assert len(first) == 12
+    assert fingerprints.version('css/site.css') == first
+    asset.write_bytes(b'body{color:red}')
+    os.utime(asset, ns=(0, 10 ** 9))
+    assert fingerprints.version('css/site.css') not in (None, first)
+
+
+def test_missing_and_escaping_paths(tmp_path):
+    (tmp_path / 'static').mkdir()
+    (tmp_path / 'secret.txt').write_text('x')
+    fingerprints = StaticFingerprinter(str(tmp_path / 'static'))
+    assert fingerprints.version('nope.js') is None
+    assert fingerprints.version('../secret.txt') is None
+    assert fingerprints.version('') is None
@@ -0,0 +1,72 @@
+"""
+FileBrowser 上游连接池测试
+Tests for the FileBrowser upstream connection pool.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from upstream import UpstreamPool
+
+
+class Upstream(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = (self.headers.get('Cookie') or '-').encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'session=leaked')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope='module')
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_connections_are_reused(upstream):
+    pool = UpstreamPool(pool_size=2)
+    for _ in range(5):
+        assert pool.get(upstream).status_code == 200
+    stats = pool.stats()
+    assert stats['requests'] == 5
+    assert stats['connections_opened'] == 1
+    assert stats['connections_reused'] == 4
+    assert stats['idle_connections'] == 1
+    assert stats['waiting'] == 0
+    pool.close()
+
+
+def test_session_does_not_keep_cookies(upstream):
+    pool = UpstreamPool()
+    assert pool.get(upstream).text == '-'
+    assert pool.get(upstream).text == '-'
+    assert pool.get(upstream, headers={'Cookie': 'auth=alice'}).text == 'auth=alice'
+    assert len(pool.session.cookies) == 0
+    pool.close()
+
+
+def test_default_timeout_and_error_count(monkeypatch):
+    pool = UpstreamPool(connect_timeout=1.5, read_timeout=7)
+    seen = {}
+
+    def fake_request(method, url, **kwargs):
+        seen.update(kwargs)
+        raise requests.ConnectionError('refused')
+
+    monkeypatch.setattr(pool.session, 'request', fake_request)
+    with pytest.raises(requests.ConnectionError):
+        pool.post('http://127.0.0.1:1/api/login', json={})
+    assert seen['timeout'] == (1.5, 7)
+    stats = pool.stats()
+    assert (stats['requests'], stats['errors'], stats['waiting']) == (1, 1, 0)
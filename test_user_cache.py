@@ -0,0 +1,46 @@
+"""
+登录用户缓存测试
+Tests for the logged-in user cache.
+"""
+import types
+
+from user_cache import MISSING, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_and_lru_eviction():
+    """
+    条目过期后未命中；超出容量时淘汰最久未使用的条目
+    Entries miss after their TTL; the least recently used entry is evicted beyond maxsize
+    """
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set(1, 'a')
+    cache.set('2', None)
+    assert cache.get('1') == 'a'
+    assert cache.get(2) is None
+    cache.set(3, 'c')
+    assert cache.get(1) is MISSING and len(cache) == 2
+    clock.now = 11
+    assert cache.get(3) is MISSING
+
+
+def test_invalidation():
+    """
+    按键或按值条件失效
+    Entries can be invalidated by key or by a predicate on the value
+    """
+    cache = TTLCache()
+    cache.set(1, types.SimpleNamespace(username='alice'))
+    cache.set(2, types.SimpleNamespace(username='bob'))
+    cache.set(3, None)
+    cache.invalidate('1')
+    cache.invalidate_where(lambda user: user.username == 'bob')
+    assert cache.get(1) is MISSING and cache.get(2) is MISSING and cache.get(3) is None
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from user_io import export_users, parse_users, validate_users
+
+
+def test_parse_csv():
+    data = '\ufeffusername,password,is_admin\nalice,secret123,1\nbob,hunter22,\n'
+    rows = parse_users(data, 'csv')
+    assert rows == [
+        {'username': 'alice', 'password': 'secret123', 'password_hash': '', 'is_admin': True},
+        {'username': 'bob', 'password': 'hunter22', 'password_hash': '', 'is_admin': False},
+    ]
+
+
+def test_parse_json_list_and_object():
+    users = [{'username': 'alice', 'password_hash': 'pbkdf2:x', 'is_admin': True}]
+    assert parse_users(json.dumps(users), 'json') == parse_users(json.dumps({'users': users}), 'json')
+    assert parse_users(json.dumps(users), 'json')[0]['password_hash'] == 'pbkdf2:x'
+
+
+@pytest.mark.parametrize('data, fmt', [
+    ('not json', 'json'),
+    ('{"users": 1}', 'json'),
+    ('name,password\nalice,x\n', 'csv'),
+    ('', 'xml'),
+])
+def test_parse_invalid(data, fmt):
+    with pytest.raises(ValueError):
+        parse_users(data, fmt)
+
+
+def test_validate():
+    rows = parse_users(
+        'username,password,password_hash\n'
+        'alice,secret123,\n'
+        'alice,secret123,\n'
+        ',secret123,\n'
+        'carol,,\n'
+        'dave,short,\n'
+        'erin,,pbkdf2:x\n'
+        'admin,secret123,\n', 'csv')
+    create, skipped, errors = validate_users(rows, {'admin'}, 6)
+    assert [row['username'] for row in create] == ['alice', 'erin']
+    assert skipped == ['admin']
+    assert [(e['row'], e.get('username')) for e in errors] == [(2, 'alice'), (3, None), (4, 'carol'), (5, 'dave')]
+
+
+def test_export_csv():
+    rows = [(1, 'alice', 1, 'hash-a'), (2, 'bob', 0, 'hash-b')]
+    assert ''.join(export_users(rows, 'csv')) == 'id,username,is_admin\r\n1,alice,1\r\n2,bob,0\r\n'
+    assert 'hash-b' in ''.join(export_users(rows, 'csv', include_hashes=True))
+
+
+def test_export_json_round_trip():
+    rows = [(1, 'alice', 1, 'hash-a'), (2, 'bob', 0, 'hash-b')]
+    assert json.loads(''.join(export_users([], 'json'))) == []
+    exported = ''.join(export_users(rows, 'json', include_hashes=True))
+    parsed = parse_users(exported, 'json')
+    assert [(u['username'], u['password_hash'], u['is_admin']) for u in parsed] == [
+        ('alice', 'hash-a', True), ('bob', 'hash-b', False)]
@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+from user_query import create_user_indexes, decode_cursor, page_users, prefix_upper_bound
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        is_admin INTEGER NOT NULL DEFAULT 0
+    )''')
+    create_user_indexes(conn)
+    conn.executemany('INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)',
+                     [(f'user{i:03d}', 'x', int(i % 7 == 0)) for i in range(120)] + [('alice', 'x', 0), ('alicia', 'x', 1)])
+    yield conn
+    conn.close()
+
+
+def all_pages(db, **kwargs):
+    rows, cursor = [], None
+    while True:
+        page = page_users(db, cursor=cursor, **kwargs)
+        rows.extend(page['users'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return rows, page['total']
+
+
+@pytest.mark.parametrize('sort', ['id', 'username', 'is_admin'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_pages_cover_every_row_in_order(db, sort, order):
+    rows, total = all_pages(db, sort=sort, order=order, limit=25)
+    assert total == 122
+    assert len({row['id'] for row in rows}) == 122
+    keys = [(row[sort], row['id']) for row in rows]
+    assert keys == sorted(keys, reverse=order == 'desc')
+
+
+def test_prefix_search(db):
+    rows, total = all_pages(db, q='ali', sort='username', limit=1)
+    assert [row['username'] for row in rows] == ['alice', 'alicia']
+    assert total == 2
+    assert page_users(db, q='user11')['total'] == 10
+    assert page_users(db, q='nobody')['users'] == []
+
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound('abc') == 'abd'
+    assert prefix_upper_bound('a' + chr(0x10FFFF)) == 'b'
+    assert prefix_upper_bound(chr(0x10FFFF)) is None
+
+
+def test_queries_use_indexes(db):
+    plan = ' '.join(row[3] for row in db.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM users WHERE username >= 'a' AND username < 'b' ORDER BY username"))
+    assert 'USING' in plan and 'INDEX' in plan
+    plan = ' '.join(row[3] for row in db.execute(
+        'EXPLAIN QUERY PLAN SELECT id FROM users WHERE (is_admin, id) > (0, 5) ORDER BY is_admin, id'))
+    assert 'idx_users_is_admin' in plan
+
+
+@pytest.mark.parametrize('kwargs', [{'sort': 'password_hash'}, {'order': 'sideways'}, {'cursor': 'bogus'}])
+def test_invalid_arguments(db, kwargs):
+    with pytest.raises(ValueError):
+        page_users(db, **kwargs)
+
+
+def test_limit_is_clamped(db):
+    assert len(page_users(db, limit=10000)['users']) == 122
+    assert len(page_users(db, limit=0)['users']) == 1
+    assert decode_cursor(page_users(db, limit=1)['next_cursor']) == [1, 1]
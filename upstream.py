@@ -0,0 +1,120 @@
+# =============================================================================
+# 文件名: upstream.py
+# 功能:   FileBrowser 上游的共享 HTTP 连接池
+# 说明:   所有到 FileBrowser 的请求（反向代理与 utils 中的管理接口）共用一个
+#         requests.Session 与固定大小的 keep-alive 连接池，避免每个请求新建 TCP 连接；
+#         会话不保存 Cookie，不同用户的请求之间不会互相携带 Cookie
+# =============================================================================
+
+import threading
+from functools import partialmethod
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class _RejectCookies(DefaultCookiePolicy):
+    # 共享会话不接收任何 Cookie / The shared session never stores cookies
+    def set_ok(self, cookie, request):
+        return False
+
+
+class UpstreamPool:
+    """
+    线程安全的上游 HTTP 会话。
+    Thread-safe upstream HTTP session.
+    - 连接池最多保留 pool_size 个空闲 keep-alive 连接 / Keeps up to pool_size idle keep-alive connections
+    - 未指定 timeout 的请求使用 (connect_timeout, read_timeout) / Requests without a timeout use (connect_timeout, read_timeout)
+    - 会话不存储 Cookie，请求头与 Cookie 只来自每次调用 / The session stores no cookies; headers and cookies come from each call
+    """
+
+    def __init__(self, pool_size=16, connect_timeout=3.0, read_timeout=60.0):
+        """
+        Args:
+            pool_size: 每个上游主机保留的最大连接数
+            connect_timeout: 建立连接超时（秒）
+            read_timeout: 读取超时（秒），即两次收到数据之间的最长间隔
+        """
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # 不读取环境变量中的代理与 .netrc，访问本机上游无需 / Skip env proxies and .netrc; the upstream is local
+        self.session.trust_env = False
+        self.session.cookies.set_policy(_RejectCookies())
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._waiting = 0
+
+    def request(self, method, url, **kwargs):
+        """
+        发送请求，参数与 requests.request 相同。
+        Send a request; arguments are the same as requests.request.
+        Returns:
+            requests.Response: 响应
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self._requests += 1
+            self._waiting += 1
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    get = partialmethod(request, 'GET')
+    post = partialmethod(request, 'POST')
+    put = partialmethod(request, 'PUT')
+    delete = partialmethod(request, 'DELETE')
+
+    def _pools(self):
+        manager = self.adapter.poolmanager
+        pools = []
+        for key in manager.pools.keys():
+            try:
+                pools.append(manager.pools[key])
+            except KeyError:
+                pass
+        return pools
+
+    def stats(self):
+        """
+        连接池指标。
+        Connection pool metrics.
+        Returns:
+            dict: requests 请求总数，errors 失败数，waiting 等待响应头的请求数，
+                  connections_opened 新建连接数，connections_reused 复用连接的请求数，
+                  idle_connections 当前空闲连接数，pool_size 连接池大小
+        """
+        opened = served = idle = 0
+        for pool in self._pools():
+            opened += pool.num_connections
+            served += pool.num_requests
+            # 连接池队列中的 None 是尚未创建的空位 / None entries in the queue are unused slots
+            idle += sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'errors': self._errors,
+                'waiting': self._waiting,
+                'connections_opened': opened,
+                'connections_reused': max(0, served - opened),
+                'idle_connections': idle,
+                'pool_size': self.pool_size
+            }
+
+    def close(self):
+        """
+        关闭所有连接。
+        Close all connections.
+        """
+        self.session.close()
@@ -0,0 +1,92 @@
+# =============================================================================
+# 文件名: user_cache.py
+# 功能:   进程内 TTL + LRU 缓存，用于登录用户加载
+# 说明:   每个已认证请求只需一次字典查找；条目超过 TTL 后重新查询数据库，
+#         超过容量时淘汰最久未使用的条目；用户变更时由调用方显式失效
+# =============================================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+
+# 未命中标记（缓存值可能为 None，表示用户不存在） / Miss marker; a cached None means the user does not exist
+MISSING = object()
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存。
+    LRU cache with per-entry expiry.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic):
+        """
+        Args:
+            maxsize: 最大条目数
+            ttl: 条目存活秒数
+            clock: 单调时钟函数（便于测试）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        """
+        读取条目，过期或不存在时返回 default。
+        Get an entry, returning default when it is missing or expired.
+        """
+        key = str(key)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= self.clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        写入条目，超出容量时淘汰最久未使用的条目。
+        Store an entry, evicting the least recently used entries beyond maxsize.
+        """
+        key = str(key)
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        删除指定条目。
+        Remove one entry.
+        """
+        with self._lock:
+            self._data.pop(str(key), None)
+
+    def invalidate_where(self, predicate):
+        """
+        删除值满足条件的条目（如按用户名失效）。
+        Remove entries whose value matches a predicate, e.g. by username.
+        """
+        with self._lock:
+            for key in [k for k, (_, v) in self._data.items() if v is not None and predicate(v)]:
+                del self._data[key]
+
+    def clear(self):
+        """
+        清空缓存。
+        Remove all entries.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,121 @@
+# =============================================================================
+# 文件名: user_io.py
+# 功能:   用户批量导入/导出的格式解析与校验（CSV / JSON）
+# 说明:   导入先整体解析与校验，有错误时不写入任何数据；
+#         导出逐行生成，适合流式响应
+# =============================================================================
+
+import csv
+import io
+import json
+
+
+# 导入/导出字段 / Import and export fields
+EXPORT_FIELDS = ('id', 'username', 'is_admin')
+HASH_FIELD = 'password_hash'
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'y', 'admin')
+
+
+def parse_users(data, fmt):
+    """
+    解析导入数据。
+    Parse import data.
+    Args:
+        data (str): 文件内容
+        fmt (str): csv 或 json
+    Returns:
+        list: [{'username', 'password', 'password_hash', 'is_admin'}]
+    Raises:
+        ValueError: 格式无效
+    """
+    if fmt == 'json':
+        try:
+            rows = json.loads(data)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'Invalid JSON: {e}')
+        if isinstance(rows, dict):
+            rows = rows.get('users')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('JSON must be a list of user objects')
+    elif fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(data.lstrip('\ufeff')))
+        if not reader.fieldnames or 'username' not in reader.fieldnames:
+            raise ValueError('CSV must have a header row with a username column')
+        rows = list(reader)
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+    return [{
+        'username': str(row.get('username') or '').strip(),
+        'password': row.get('password') or '',
+        'password_hash': row.get(HASH_FIELD) or '',
+        'is_admin': _as_bool(row.get('is_admin'))
+    } for row in rows]
+
+
+def validate_users(rows, existing, min_length):
+    """
+    校验导入的用户：用户名非空且在文件内唯一，需提供密码或密码哈希，密码满足最小长度。
+    Validate imported users: usernames are non-empty and unique in the file, each row has a password or a hash, and passwords meet the minimum length.
+    已存在的用户名被跳过而不是报错。
+    Usernames that already exist are skipped rather than reported as errors.
+    Args:
+        rows: parse_users 的结果
+        existing: 已存在的用户名集合
+        min_length: 密码最小长度
+    Returns:
+        tuple: (要创建的行, 跳过的用户名, 错误列表)
+    """
+    seen, create, skipped, errors = set(), [], [], []
+    for line, row in enumerate(rows, start=1):
+        username = row['username']
+        if not username:
+            errors.append({'row': line, 'message': '缺少用户名 / missing username'})
+        elif username in seen:
+            errors.append({'row': line, 'username': username, 'message': '文件内用户名重复 / duplicate username'})
+        elif not row['password'] and not row['password_hash']:
+            errors.append({'row': line, 'username': username, 'message': '缺少密码 / missing password'})
+        elif row['password'] and len(row['password']) < min_length:
+            errors.append({'row': line, 'username': username, 'message': f'密码长度不能少于{min_length}位 / password too short'})
+        elif username in existing:
+            skipped.append(username)
+        else:
+            create.append(row)
+        seen.add(username)
+    return create, skipped, errors
+
+
+def export_users(rows, fmt, include_hashes=False):
+    """
+    逐块生成导出内容。
+    Yield export content chunk by chunk.
+    Args:
+        rows: 数据库行 (id, username, is_admin, password_hash) 的迭代器
+        fmt: csv 或 json
+        include_hashes: 是否包含密码哈希
+    Yields:
+        str: 导出内容片段
+    """
+    fields = EXPORT_FIELDS + ((HASH_FIELD,) if include_hashes else ())
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row[:len(fields)])
+            if buffer.tell() > 8192:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+        return
+    yield '['
+    for i, row in enumerate(rows):
+        item = dict(zip(fields, row))
+        item['is_admin'] = bool(item['is_admin'])
+        yield (',' if i else '') + json.dumps(item, ensure_ascii=False)
+    yield ']'
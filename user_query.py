@@ -0,0 +1,118 @@
+# =============================================================================
+# 文件名: user_query.py
+# 功能:   用户列表的分页、前缀搜索与排序查询
+# 说明:   使用键集（keyset）分页：游标记录上一页最后一行的排序值与 id，
+#         翻页代价与页码无关；前缀搜索改写为范围查询以使用 username 索引
+# =============================================================================
+
+import base64
+import json
+
+
+# 可排序的列及其是否唯一（唯一列无需 id 作为次序键）
+# Sortable columns and whether they are unique (unique columns need no id tiebreaker)
+SORT_COLUMNS = {'id': True, 'username': True, 'is_admin': False}
+
+# 用户表的辅助索引（username 已有 UNIQUE 索引） / Secondary indexes on users; username already has a UNIQUE index
+USER_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_users_is_admin ON users (is_admin, id)',
+)
+
+MAX_PAGE_SIZE = 200
+
+
+def create_user_indexes(db):
+    """
+    创建用户表索引。
+    Create the users table indexes.
+    """
+    for sql in USER_INDEXES:
+        db.execute(sql)
+
+
+def prefix_upper_bound(prefix):
+    """
+    计算前缀范围查询的上界：满足 prefix <= s < bound 的字符串恰好以 prefix 开头。
+    Compute the upper bound for a prefix range: strings with prefix <= s < bound are exactly those starting with prefix.
+    Returns:
+        str/None: 上界，None 表示无上界
+    """
+    prefix = prefix.rstrip(chr(0x10FFFF))
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解码分页游标。
+    Decode a pagination cursor.
+    Raises:
+        ValueError: 游标无效
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def page_users(db, q='', sort='id', order='asc', cursor=None, limit=50):
+    """
+    查询一页用户。
+    Fetch one page of users.
+    Args:
+        db: 数据库连接
+        q: 用户名前缀（区分大小写）
+        sort: 排序列，见 SORT_COLUMNS
+        order: asc 或 desc
+        cursor: 上一页返回的 next_cursor
+        limit: 每页条数，最多 MAX_PAGE_SIZE
+    Returns:
+        dict: {'users': [{'id', 'username', 'is_admin'}], 'next_cursor', 'total'}
+    Raises:
+        ValueError: 参数无效
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f'Unsupported sort column: {sort}')
+    if order not in ('asc', 'desc'):
+        raise ValueError(f'Unsupported order: {order}')
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    where, params = [], []
+    if q:
+        where.append('username >= ?')
+        params.append(q)
+        upper = prefix_upper_bound(q)
+        if upper is not None:
+            where.append('username < ?')
+            params.append(upper)
+    total = db.execute(f'SELECT COUNT(*) FROM users{" WHERE " + " AND ".join(where) if where else ""}',
+                       params).fetchone()[0]
+
+    op = '>' if order == 'asc' else '<'
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        if SORT_COLUMNS[sort]:
+            where.append(f'{sort} {op} ?')
+            params.append(value)
+        else:
+            where.append(f'({sort}, id) {op} (?, ?)')
+            params.extend([value, last_id])
+    order_by = f'{sort} {order.upper()}' + ('' if sort == 'id' else f', id {order.upper()}')
+    sql = (f'SELECT id, username, is_admin FROM users{" WHERE " + " AND ".join(where) if where else ""} '
+           f'ORDER BY {order_by} LIMIT ?')
+    rows = db.execute(sql, params + [limit + 1]).fetchall()
+
+    users = [{'id': r[0], 'username': r[1], 'is_admin': bool(r[2])} for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor([last[('id', 'username', 'is_admin').index(sort)], last[0]])
+    return {'users': users, 'next_cursor': next_cursor, 'total': total}
@@ -7,12 +7,15 @@
 # 说明:   包含项目中常用的工具函数和辅助功能
 # =============================================================================
 
+import concurrent.futures
 import docker
+import hashlib
 import json
 import logging
 import os
 import sqlite3
 import subprocess
+import threading
 import time
 import requests
 from flask import current_app, flash, jsonify
@@ -57,6 +60,94 @@ def safe_container_operation(app, operation, cid, success_msg, error_msg_prefix=
         return False, error_msg
 
 
+# 批量操作中单个容器超出 timeout 后再等待的时间(秒)，覆盖 Docker 强制结束与 API 往返
+# Extra seconds a bulk operation may take beyond its timeout, covering Docker's forced kill and the API round trip
+BULK_OPERATION_GRACE = 10
+
+BULK_ACTIONS = ('start', 'stop', 'restart', 'remove')
+
+
+def parse_bulk_timeout(value, maximum):
+    """
+    校验批量操作的超时参数
+    Args:
+        value: 请求中的 timeout 值
+        maximum: 允许的最大值(秒)
+    Returns:
+        int: 超时(秒)
+    Raises:
+        ValueError: 不是 0..maximum 之间的整数
+    """
+    if isinstance(value, bool):
+        raise ValueError(f'timeout 必须为整数: {value}')
+    try:
+        timeout = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'timeout 必须为整数: {value}')
+    if isinstance(value, float) and value != timeout:
+        raise ValueError(f'timeout 必须为整数: {value}')
+    if not 0 <= timeout <= maximum:
+        raise ValueError(f'timeout 必须在 0 到 {maximum} 之间: {timeout}')
+    return timeout
+
+
+def bulk_container_operation(app, client, executor, cids, action, timeout=10, max_workers=1):
+    """
+    在有界线程池上并行执行批量容器操作
+    Args:
+        client: Docker客户端实例
+        executor: 有界线程池 (concurrent.futures.ThreadPoolExecutor)
+        cids: 容器ID列表，重复的ID只执行一次
+        action: 操作名称 start/stop/restart/remove
+        timeout: 单个容器的停止超时(秒)，超时后由Docker强制结束；
+                 每个操作最多等待 timeout + BULK_OPERATION_GRACE 秒，超出记为 timeout
+        max_workers: 线程池大小，用于计算排队操作的等待期限
+    Returns:
+        list: 每个容器一项 {'id', 'status': ok/error/timeout, 'message', 'elapsed'}，顺序与去重后的 cids 一致
+    Raises:
+        ValueError: 不支持的操作
+    """
+    operations = {
+        'start': lambda c: c.start(),
+        'stop': lambda c: c.stop(timeout=timeout),
+        'restart': lambda c: c.restart(timeout=timeout),
+        'remove': lambda c: c.remove(force=True),
+    }
+    if action not in operations:
+        raise ValueError(f'不支持的操作: {action}')
+    operation = operations[action]
+    cids = list(dict.fromkeys(cids))
+
+    def run(cid):
+        started = time.monotonic()
+        try:
+            operation(client.containers.get(cid))
+            app.logger.info(f"容器 {cid} 批量{action}成功")
+            return {'id': cid, 'status': 'ok', 'message': '', 'elapsed': round(time.monotonic() - started, 2)}
+        except requests.exceptions.Timeout as e:
+            app.logger.error(f"容器 {cid} 批量{action}超时: {str(e)}")
+            return {'id': cid, 'status': 'timeout', 'message': str(e), 'elapsed': round(time.monotonic() - started, 2)}
+        except Exception as e:
+            app.logger.error(f"容器 {cid} 批量{action}失败: {str(e)}")
+            return {'id': cid, 'status': 'error', 'message': str(e), 'elapsed': round(time.monotonic() - started, 2)}
+
+    started = time.monotonic()
+    limit = timeout + BULK_OPERATION_GRACE
+    futures = [executor.submit(run, cid) for cid in cids]
+    results = []
+    for index, (cid, future) in enumerate(zip(cids, futures)):
+        # 第 index 个操作最早在第 index // max_workers 轮开始 / Operation `index` starts no earlier than wave index // max_workers
+        deadline = started + limit * (index // max(1, max_workers) + 1)
+        try:
+            results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            app.logger.error(f"容器 {cid} 批量{action}超过 {limit} 秒未完成")
+            results.append({'id': cid, 'status': 'timeout', 'message': f'操作超过 {limit} 秒未完成',
+                            'elapsed': round(time.monotonic() - started, 2)})
+    return results
+
+
 def ensure_directory_exists(path):
     """
     确保目录存在，如果不存在则创建
@@ -135,6 +226,21 @@ def retry_operation(app, operation, max_retries=3, delay=1, *args, **kwargs):
     return None
 
 
+# FileBrowser 请求使用的 HTTP 客户端：默认 requests 模块，应用启动时替换为共享连接池
+# HTTP client for FileBrowser calls: the requests module by default, replaced with the shared pool at startup
+filebrowser_http = requests
+
+
+def set_filebrowser_http(http):
+    """
+    设置FileBrowser请求使用的HTTP客户端
+    Args:
+        http: 提供 get/post/put/delete 的客户端（如 UpstreamPool）
+    """
+    global filebrowser_http
+    filebrowser_http = http
+
+
 def get_filebrowser_token(app, filebrowser_url, username, password):
     """
     获取FileBrowser的认证token
@@ -148,7 +254,7 @@ def get_filebrowser_token(app, filebrowser_url, username, password):
     url = f"{filebrowser_url}/api/login"
     data = {"username": username, "password": password}
     try:
-        resp = requests.post(url, json=data, timeout=5)
+        resp = filebrowser_http.post(url, json=data, timeout=5)
         app.logger.info(f"FileBrowser登录响应状态码: {resp.status_code}")
         app.logger.info(f"FileBrowser登录响应内容: {resp.text[:100]}")  # 只记录前100个字符
         if resp.status_code == 200:
@@ -200,9 +306,9 @@ def create_filebrowser_user(app, filebrowser_url, username, password, admin_pass
         }
     }
     try:
-        resp = requests.put(f"{filebrowser_url}/api/users/{username}", json=user_data, headers=headers, timeout=5)
+        resp = filebrowser_http.put(f"{filebrowser_url}/api/users/{username}", json=user_data, headers=headers, timeout=5)
         if resp.status_code != 200:
-            resp = requests.post(f"{filebrowser_url}/api/users", json=user_data, headers=headers, timeout=5)
+            resp = filebrowser_http.post(f"{filebrowser_url}/api/users", json=user_data, headers=headers, timeout=5)
         app.logger.info(f"FileBrowser用户 {username} 创建/更新成功")
         return resp.json()
     except Exception as e:
@@ -226,7 +332,7 @@ def delete_filebrowser_user(app, filebrowser_url, username, admin_password):
         return None
     headers = {"Authorization": f"Bearer {token}"}
     try:
-        resp = requests.delete(f"{filebrowser_url}/api/users/{username}", headers=headers, timeout=5)
+        resp = filebrowser_http.delete(f"{filebrowser_url}/api/users/{username}", headers=headers, timeout=5)
         app.logger.info(f"FileBrowser用户 {username} 删除成功")
         return resp.json()
     except Exception as e:
@@ -234,6 +340,125 @@ def delete_filebrowser_user(app, filebrowser_url, username, admin_password):
         return None
 
 
+# FileBrowser 管理员 token 缓存，批量操作共用一次登录 / FileBrowser admin token cache so bulk operations share one login
+_filebrowser_tokens = {}
+_filebrowser_tokens_lock = threading.Lock()
+
+
+def get_cached_filebrowser_token(app, filebrowser_url, username, password, ttl=600):
+    """
+    获取缓存的FileBrowser token，过期或密码变化时重新登录
+    Args:
+        filebrowser_url: FileBrowser URL
+        username: 用户名
+        password: 密码
+        ttl: token缓存秒数
+    Returns:
+        str: JWT token或None
+    """
+    key = (filebrowser_url, username, hashlib.sha256(str(password).encode()).hexdigest())
+    with _filebrowser_tokens_lock:
+        cached = _filebrowser_tokens.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+    token = get_filebrowser_token(app, filebrowser_url, username, password)
+    if token:
+        with _filebrowser_tokens_lock:
+            _filebrowser_tokens[key] = (token, time.monotonic() + ttl)
+    return token
+
+
+def upsert_filebrowser_user(app, filebrowser_url, token, username, password, scope="/srv", is_admin=False):
+    """
+    使用已有token创建或更新FileBrowser用户
+    Args:
+        filebrowser_url: FileBrowser URL
+        token: 管理员JWT token
+        username: 用户名
+        password: 用户密码
+        scope: 用户根目录
+        is_admin: 是否为管理员
+    Returns:
+        bool: 是否成功
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    user_data = {
+        "username": username,
+        "password": password,
+        "scope": scope,
+        "locale": "zh-cn",
+        "perm": {
+            "admin": is_admin,
+            "execute": True,
+            "create": True,
+            "rename": True,
+            "modify": True,
+            "delete": True,
+            "share": False,
+            "download": True
+        }
+    }
+    try:
+        resp = filebrowser_http.put(f"{filebrowser_url}/api/users/{username}", json=user_data, headers=headers, timeout=5)
+        if resp.status_code != 200:
+            resp = filebrowser_http.post(f"{filebrowser_url}/api/users", json=user_data, headers=headers, timeout=5)
+        return resp.status_code in (200, 201)
+    except Exception as e:
+        app.logger.error(f"FileBrowser用户 {username} 创建/更新失败: {str(e)}")
+        return False
+
+
+def get_filebrowser_user_scope(app, filebrowser_url, token, username):
+    """
+    查询FileBrowser用户的scope（相对于数据目录的根路径）
+    Args:
+        filebrowser_url: FileBrowser URL
+        token: 管理员JWT token
+        username: 用户名
+    Returns:
+        str: scope，用户不存在或请求失败时为None
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    try:
+        resp = filebrowser_http.get(f"{filebrowser_url}/api/users", headers=headers, timeout=5)
+        if resp.status_code != 200:
+            app.logger.error(f"查询FileBrowser用户失败，状态码: {resp.status_code}")
+            return None
+        for user in resp.json():
+            if user.get("username") == username:
+                return user.get("scope") or "/"
+    except Exception as e:
+        app.logger.error(f"查询FileBrowser用户scope出错: {str(e)}")
+    return None
+
+
+def sync_filebrowser_users(app, filebrowser_url, admin_password, users, executor, batch_size=20):
+    """
+    分批并发同步FileBrowser用户，所有请求共用一个缓存的管理员token
+    Args:
+        filebrowser_url: FileBrowser URL
+        admin_password: 管理员密码
+        users: [{'username', 'password', 'is_admin'}]
+        executor: 线程池
+        batch_size: 每批并发的用户数
+    Returns:
+        tuple: (成功的用户名列表, 失败的用户名列表)
+    """
+    token = get_cached_filebrowser_token(app, filebrowser_url, "admin", admin_password)
+    if not token:
+        app.logger.error("无法获取filebrowser token，批量同步失败")
+        return [], [u['username'] for u in users]
+    synced, failed = [], []
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        futures = [(executor.submit(upsert_filebrowser_user, app, filebrowser_url, token, u['username'], u['password'],
+                                    is_admin=u['is_admin']), u['username']) for u in batch]
+        for future, username in futures:
+            (synced if future.result() else failed).append(username)
+    app.logger.info(f"FileBrowser批量同步完成: 成功 {len(synced)}，失败 {len(failed)}")
+    return synced, failed
+
+
 def reset_filebrowser_admin_password(app, container_name, username, password):
     """
     重置FileBrowser管理员密码
@@ -323,7 +548,7 @@ def wait_filebrowser_ready(app, filebrowser_url, timeout=15):
     """
     for _ in range(timeout):
         try:
-            resp = requests.get(filebrowser_url, timeout=1)
+            resp = filebrowser_http.get(filebrowser_url, timeout=1)
             if resp.status_code == 200:
                 return True
         except Exception:
@@ -424,9 +649,8 @@ def ensure_filebrowser_container_running(app, container_name, image, port, data_
                 time.sleep(10)
                 app.logger.info("尝试验证管理员密码...")
                 # 使用curl测试登录
-                import requests
                 login_url = f"http://127.0.0.1:{port}/api/login"
-                response = requests.post(
+                response = filebrowser_http.post(
                     login_url,
                     json={"username": "admin", "password": admin_password},
                     timeout=30
@@ -531,7 +755,7 @@ def start_filebrowser_container(app, container_name, port=8080):
             admin_password = "admin"
             try:
                 login_data = {'username': admin_username, 'password': admin_password}
-                login_resp = requests.post(f"{filebrowser_url}/api/login", json=login_data, timeout=5)
+                login_resp = filebrowser_http.post(f"{filebrowser_url}/api/login", json=login_data, timeout=5)
                 if login_resp.status_code == 200:
                     app.logger.info("FileBrowser管理员登录成功")
                 else: